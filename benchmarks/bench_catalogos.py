@@ -0,0 +1,111 @@
+"""
+Benchmark de catálogos: columnas de texto frente a ids de catálogo.
+
+Carga las mismas filas en una base SQLite con clima, estado, tipo y responsable como
+texto (el esquema anterior), copia la base y la convierte con catalogos.migrar. Informa
+el tamaño de ambos archivos y el tiempo de contar actividades agrupadas por cada
+campo: sobre el texto, sobre el id del catálogo y con Actividad.contar_por (que
+además traduce los ids a nombres).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_catalogos --filas 500000
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_registros import fila_sintetica
+from src.model.catalogos import COLUMNAS_CATALOGO
+
+ESQUEMA_TEXTO = """
+    CREATE TABLE actividades (
+        id_actividad INTEGER NOT NULL PRIMARY KEY,
+        fecha DATE NOT NULL,
+        descripcion TEXT NOT NULL,
+        anexos TEXT,
+        responsable VARCHAR(100),
+        clima VARCHAR(50),
+        estado VARCHAR(50),
+        tipo VARCHAR(50),
+        supervisor VARCHAR(100)
+    )
+"""
+
+
+def cargar_texto(ruta, filas):
+    conn = sqlite3.connect(ruta)
+    conn.execute(ESQUEMA_TEXTO)
+    lote = 50000
+    for inicio in range(0, filas, lote):
+        conn.executemany(
+            "INSERT INTO actividades (id_actividad, fecha, supervisor, descripcion, anexos, "
+            "responsable, clima, estado, tipo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (fila_sintetica(i + 1) for i in range(inicio, min(inicio + lote, filas))),
+        )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def agrupar(ruta, columna):
+    def consultar():
+        conn = sqlite3.connect(ruta)
+        try:
+            return conn.execute(f"SELECT {columna}, count(*) FROM actividades GROUP BY {columna}").fetchall()
+        finally:
+            conn.close()
+    return consultar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        texto = os.path.join(directorio, "texto.db")
+        con_catalogos = os.path.join(directorio, "catalogos.db")
+        print(f"Cargando {args.filas} filas...")
+        cargar_texto(texto, args.filas)
+        shutil.copyfile(texto, con_catalogos)
+
+        from src.model import orm_model
+        orm_model.DATABASE_URL = f"sqlite:///{con_catalogos}"
+        inicio = time.perf_counter()
+        orm_model.migrar_esquema(orm_model.get_engine())
+        print(f"Migración: {time.perf_counter() - inicio:.2f} s")
+
+        antes, despues = os.path.getsize(texto), os.path.getsize(con_catalogos)
+        print(f"Tamaño con texto:     {antes / 2**20:8.1f} MB")
+        print(f"Tamaño con catálogos: {despues / 2**20:8.1f} MB ({1 - despues / antes:.0%} menos)")
+
+        from src.model.actividad import Actividad
+        actividad = Actividad()
+        print(f"\n{'agrupar por':<12} | {'texto (ms)':>10} | {'id (ms)':>8} | {'contar_por (ms)':>15}")
+        for campo in COLUMNAS_CATALOGO:
+            t_texto = medir(agrupar(texto, campo), args.repeticiones)
+            t_id = medir(agrupar(con_catalogos, f"id_{campo}"), args.repeticiones)
+            t_api = medir(lambda: actividad.contar_por(campo, "2000-01-01", "2100-12-31"), args.repeticiones)
+            print(f"{campo:<12} | {t_texto * 1000:>10.1f} | {t_id * 1000:>8.1f} | {t_api * 1000:>15.1f}")
+    finally:
+        shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
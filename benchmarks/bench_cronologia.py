@@ -0,0 +1,105 @@
+"""
+Benchmark de la cronología de un responsable o supervisor.
+
+Carga actividades sintéticas en una base SQLite y compara, para un trimestre y una
+persona, consultar_actividades del rango completo filtrando en Python contra
+Actividad.cronologia (filtro en la base sobre el índice de cobertura): la primera
+página y el recorrido completo página por página. Muestra también el plan de SQLite,
+que debe indicar COVERING INDEX.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_cronologia --filas 500000
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_registros import fila_sintetica
+from src.model.actividad_record import CAMPOS
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def cargar(filas):
+    from src.model import orm_model
+    from src.model.catalogos import asegurar_valores
+    from src.model.orm_model import ActividadORM
+
+    lote = 50000
+    with orm_model.get_engine().begin() as conn:
+        for inicio in range(0, filas, lote):
+            datos = [dict(zip(CAMPOS, fila_sintetica(i + 1))) for i in range(inicio, min(inicio + lote, filas))]
+            asegurar_valores(datos, conn)
+            conn.execute(ActividadORM.__table__.insert(), datos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--por", choices=("responsable", "supervisor"), default="responsable")
+    parser.add_argument("--pagina", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        from src.model import orm_model
+        orm_model.DATABASE_URL = f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+        orm_model.Base.metadata.create_all(orm_model.get_engine())
+        print(f"Cargando {args.filas} filas...")
+        cargar(args.filas)
+
+        from src.model.actividad import Actividad
+        actividad = Actividad()
+        persona = "Responsable 7" if args.por == "responsable" else "Supervisor 7"
+        inicio, fin = "2021-01-01", "2021-03-31"
+
+        def filtrar_en_python():
+            return [a for a in actividad.consultar_actividades(inicio, fin, compacto=True) if a[args.por] == persona]
+
+        def primera_pagina():
+            return actividad.cronologia(args.por, persona, inicio, fin, args.pagina)[0]
+
+        def todas_las_paginas():
+            filas, cursor = actividad.cronologia(args.por, persona, inicio, fin, args.pagina)
+            while cursor is not None:
+                pagina, cursor = actividad.cronologia(args.por, persona, inicio, fin, args.pagina, cursor)
+                filas += pagina
+            return filas
+
+        t_python, esperadas = medir(filtrar_en_python, args.repeticiones)
+        t_pagina, _ = medir(primera_pagina, args.repeticiones)
+        t_todas, obtenidas = medir(todas_las_paginas, args.repeticiones)
+        assert [a["id_actividad"] for a in esperadas] == [a["id_actividad"] for a in obtenidas]
+
+        print(f"\n{persona}, {inicio} a {fin}: {len(esperadas)} actividades")
+        print(f"{'filtrar en Python':<28} {t_python * 1000:>9.1f} ms")
+        print(f"{'cronologia, primera página':<28} {t_pagina * 1000:>9.1f} ms")
+        print(f"{'cronologia, todas':<28} {t_todas * 1000:>9.1f} ms")
+
+        from sqlalchemy import text
+        columna = "id_responsable" if args.por == "responsable" else "supervisor"
+        with orm_model.get_engine().connect() as conn:
+            plan = conn.execute(text(
+                f"EXPLAIN QUERY PLAN SELECT id_actividad, fecha, fecha_hora, supervisor, id_responsable, "
+                f"descripcion, id_estado, id_tipo FROM actividades WHERE {columna} = 1 "
+                f"AND fecha BETWEEN '{inicio}' AND '{fin}' ORDER BY fecha, id_actividad LIMIT {args.pagina}"
+            )).all()
+        print("\nPlan de SQLite:", " / ".join(fila[-1] for fila in plan))
+    finally:
+        shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de consultas por rango de fechas sobre actividades particionada y sin particionar.
+
+Carga filas en pasos crecientes dentro de un esquema aislado y, después de cada paso,
+mide la latencia de una consulta de una semana sobre ambas tablas. Con partición
+mensual la latencia debe mantenerse plana a medida que crece la tabla.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_particiones --pasos 1000000,10000000,30000000
+"""
+
+import argparse
+import statistics
+import time
+from datetime import date
+
+from src.model.database import get_connection
+from src.model.particiones import siguiente_mes
+
+ESQUEMA = "bench_particiones"
+INICIO = date(2015, 1, 1)
+FIN = date(2024, 12, 31)
+RANGO_CONSULTA = ("2020-06-01", "2020-06-07")
+
+COLUMNAS = """
+    id_actividad BIGSERIAL,
+    fecha DATE NOT NULL,
+    supervisor VARCHAR(100),
+    descripcion TEXT NOT NULL,
+    responsable VARCHAR(100),
+    clima VARCHAR(50)
+"""
+
+
+def preparar_esquema(cur):
+    cur.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE;")
+    cur.execute(f"CREATE SCHEMA {ESQUEMA};")
+    cur.execute(f"SET search_path TO {ESQUEMA};")
+    cur.execute(f"CREATE TABLE plana ({COLUMNAS}, PRIMARY KEY (id_actividad));")
+    cur.execute("CREATE INDEX ON plana (fecha);")
+    cur.execute(f"CREATE TABLE particionada ({COLUMNAS}, PRIMARY KEY (id_actividad, fecha)) PARTITION BY RANGE (fecha);")
+    cur.execute("CREATE INDEX ON particionada (fecha);")
+    anio, mes = INICIO.year, INICIO.month
+    while date(anio, mes, 1) <= FIN:
+        siguiente = siguiente_mes(anio, mes)
+        cur.execute(
+            f"CREATE TABLE particionada_{anio}_{mes:02d} PARTITION OF particionada "
+            "FOR VALUES FROM (%s) TO (%s);",
+            (date(anio, mes, 1), date(*siguiente, 1)),
+        )
+        anio, mes = siguiente
+
+
+def cargar(cur, filas):
+    dias = (FIN - INICIO).days + 1
+    for tabla in ("plana", "particionada"):
+        cur.execute(
+            f"""
+            INSERT INTO {tabla} (fecha, supervisor, descripcion, responsable, clima)
+            SELECT %s::date + (random() * (%s - 1))::int,
+                   'Supervisor ' || (g %% 50),
+                   'Actividad de obra ' || g,
+                   'Responsable ' || (g %% 200),
+                   (ARRAY['Soleado', 'Nublado', 'Lluvia'])[1 + g %% 3]
+            FROM generate_series(1, %s) AS g;
+            """,
+            (INICIO, dias, filas),
+        )
+        cur.execute(f"ANALYZE {tabla};")
+
+
+def medir(cur, tabla, repeticiones):
+    consulta = f"SELECT * FROM {tabla} WHERE fecha BETWEEN %s AND %s ORDER BY fecha;"
+    cur.execute(consulta, RANGO_CONSULTA)  # calentamiento
+    cur.fetchall()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        cur.execute(consulta, RANGO_CONSULTA)
+        cur.fetchall()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pasos", default="1000000,5000000,10000000,20000000",
+                        help="Tamaños totales de tabla a medir, separados por comas.")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--conservar", action="store_true", help="No eliminar el esquema al terminar.")
+    args = parser.parse_args()
+    pasos = [int(p) for p in args.pasos.split(",")]
+
+    conn = get_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            preparar_esquema(cur)
+            print(f"{'filas':>12} | {'sin particionar (ms)':>20} | {'particionada (ms)':>18}")
+            cargadas = 0
+            for total in pasos:
+                cargar(cur, total - cargadas)
+                cargadas = total
+                plana = medir(cur, "plana", args.repeticiones)
+                particionada = medir(cur, "particionada", args.repeticiones)
+                print(f"{total:>12} | {plana:>20.2f} | {particionada:>18.2f}")
+            if not args.conservar:
+                cur.execute(f"DROP SCHEMA {ESQUEMA} CASCADE;")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de las sentencias preparadas del lado del servidor.
+
+Sobre una misma conexión a PostgreSQL, mide la latencia por llamada de cada consulta
+frecuente registrada en preparadas.py ejecutada con cursor.execute (el servidor la
+analiza y planifica cada vez) contra EXECUTE de la sentencia preparada. Muestra
+también la llamada completa de obtener_usuario_por_correo abriendo una conexión nueva,
+como se hacía antes, contra la conexión persistente del hilo.
+
+Requiere el servidor configurado en database.py con el esquema creado.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_preparadas --llamadas 2000
+"""
+
+import argparse
+import statistics
+import time
+
+from src.model import database, preparadas
+
+CONSULTAS = [
+    ("usuario_por_correo", "SELECT id_usuario, nombre, correo, contraseña, fecha_creacion FROM usuarios "
+                           "WHERE correo = %s;", ("nadie@ejemplo.com",)),
+    ("actividades_por_rango", f"""
+        SELECT {preparadas.COLUMNAS_ACTIVIDADES} FROM actividades
+        WHERE fecha BETWEEN %s AND %s
+        ORDER BY fecha;
+    """, ("1990-01-01", "1990-01-07")),
+]
+
+
+def medir(funcion, llamadas):
+    """Devuelve la mediana y el percentil 95 de la latencia por llamada, en microsegundos."""
+    tiempos = []
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llamadas", type=int, default=2000)
+    args = parser.parse_args()
+
+    conn = database.conectar()
+    try:
+        with conn.cursor() as cur:
+            print(f"{'consulta':<24} {'execute':>12} {'preparada':>12} {'p95 exec':>10} {'p95 prep':>10}")
+            for nombre, consulta, params in CONSULTAS:
+                assert preparadas.nombre_de(consulta) == nombre
+
+                def directa():
+                    cur.execute(consulta, params)
+                    cur.fetchall()
+
+                def preparada():
+                    preparadas.ejecutar(cur, nombre, params)
+                    cur.fetchall()
+
+                medir(directa, 50)
+                medir(preparada, 50)
+                t_directa, p95_directa = medir(directa, args.llamadas)
+                t_preparada, p95_preparada = medir(preparada, args.llamadas)
+                print(f"{nombre:<24} {t_directa:>9.0f} µs {t_preparada:>9.0f} µs "
+                      f"{p95_directa:>7.0f} µs {p95_preparada:>7.0f} µs")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    def conexion_nueva():
+        with database.conectar() as nueva, nueva.cursor() as cur:
+            cur.execute(CONSULTAS[0][1], ("nadie@ejemplo.com",))
+            cur.fetchone()
+        nueva.close()
+
+    llamadas = max(args.llamadas // 10, 20)
+    t_nueva, _ = medir(conexion_nueva, llamadas)
+    t_persistente, _ = medir(lambda: database.obtener_usuario_por_correo("nadie@ejemplo.com"), llamadas)
+    print(f"\nobtener_usuario_por_correo: conexión nueva {t_nueva:.0f} µs, "
+          f"persistente y preparada {t_persistente:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
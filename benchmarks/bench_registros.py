@@ -0,0 +1,107 @@
+"""
+Benchmark de memoria: diccionarios por fila frente a ActividadRecord.
+
+Con --fuente sintetica (por defecto) genera filas como las entregaría el controlador
+de la base de datos (cada cadena es un objeto nuevo). Con --fuente sqlite carga las
+filas en una base SQLite temporal y compara consultar_actividades con y sin compacto.
+En ambos casos informa la memoria retenida por cada 100.000 filas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_registros --filas 100000 --fuente sqlite
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+from src.model.actividad_record import ActividadRecord
+
+CLIMAS = ["Soleado", "Nublado", "Lluvia", "Lluvia intermitente", "Viento"]
+ESTADOS = ["Pendiente", "En curso", "Terminada"]
+TIPOS = ["Inspección", "Mantenimiento", "Obra civil", "Seguridad"]
+
+
+def fila_sintetica(i):
+    # "".join crea una cadena nueva en cada llamada, igual que un controlador de BD
+    return (
+        i,
+        date(2020, 1, 1) + timedelta(days=i % 1500),
+        "".join(["Supervisor ", str(i % 50)]),
+        "".join(["Revisión de avance de obra número ", str(i)]),
+        "",
+        "".join(["Responsable ", str(i % 200)]),
+        "".join([CLIMAS[i % len(CLIMAS)]]),
+        "".join([ESTADOS[i % len(ESTADOS)]]),
+        "".join([TIPOS[i % len(TIPOS)]]),
+    )
+
+
+def medir(construir):
+    gc.collect()
+    tracemalloc.start()
+    resultado = construir()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return actual, pico
+
+
+def sintetica(filas):
+    campos = ("id_actividad", "fecha", "supervisor", "descripcion", "anexos",
+              "responsable", "clima", "estado", "tipo")
+    return {
+        "dict": lambda: [dict(zip(campos, fila_sintetica(i))) for i in range(filas)],
+        "ActividadRecord": lambda: [ActividadRecord(*fila_sintetica(i)) for i in range(filas)],
+    }
+
+
+def sqlite(filas):
+    from src.model import orm_model
+    directorio = tempfile.mkdtemp()
+    orm_model.DATABASE_URL = f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+    orm_model.Base.metadata.create_all(orm_model.get_engine())
+
+    from src.model.catalogos import asegurar_valores
+    from src.model.orm_model import ActividadORM
+    datos = [
+        dict(zip(("id_actividad", "fecha", "supervisor", "descripcion", "anexos",
+                  "responsable", "clima", "estado", "tipo"), fila_sintetica(i + 1)))
+        for i in range(filas)
+    ]
+    with orm_model.get_engine().begin() as conn:
+        asegurar_valores(datos, conn)
+        conn.execute(ActividadORM.__table__.insert(), datos)
+    del datos
+
+    from src.model.actividad import Actividad
+    actividad = Actividad()
+    rango = ("2000-01-01", "2100-12-31")
+    return {
+        "dict": lambda: actividad.consultar_actividades(*rango),
+        "ActividadRecord": lambda: actividad.consultar_actividades(*rango, compacto=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100000)
+    parser.add_argument("--fuente", choices=["sintetica", "sqlite"], default="sintetica")
+    args = parser.parse_args()
+
+    casos = sintetica(args.filas) if args.fuente == "sintetica" else sqlite(args.filas)
+    escala = 100000 / args.filas
+    print(f"{'representación':<16} | {'retenida / 100k (MB)':>20} | {'pico / 100k (MB)':>16}")
+    resultados = {}
+    for nombre, construir in casos.items():
+        actual, pico = medir(construir)
+        resultados[nombre] = actual
+        print(f"{nombre:<16} | {actual * escala / 2**20:>20.1f} | {pico * escala / 2**20:>16.1f}")
+    reduccion = 1 - resultados["ActividadRecord"] / resultados["dict"]
+    print(f"Reducción de memoria retenida: {reduccion:.0%}")
+
+
+if __name__ == "__main__":
+    main()
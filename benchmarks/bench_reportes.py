@@ -0,0 +1,90 @@
+"""
+Benchmark de los escritores de reportes: filas por segundo, pico de memoria y tamaño
+del archivo para cada formato.
+
+Con --fuente sintetica (por defecto) las filas se generan al vuelo; con --fuente sqlite
+se cargan en una base SQLite temporal y se leen con Actividad.iterar_actividades, como
+en generar_reporte. El pico de memoria se mide con tracemalloc en una segunda pasada,
+porque tracemalloc reduce el rendimiento; debe mantenerse constante al crecer --filas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_reportes --filas 1000000 --fuente sqlite
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_registros import fila_sintetica
+from src.model import reportes
+from src.model.actividad_record import ActividadRecord, CAMPOS
+
+
+def fuente_sintetica(filas):
+    return lambda: (ActividadRecord(*fila_sintetica(i)) for i in range(filas))
+
+
+def fuente_sqlite(filas, directorio):
+    from src.model import orm_model
+    orm_model.DATABASE_URL = f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+    orm_model.Base.metadata.create_all(orm_model.get_engine())
+
+    from src.model.catalogos import asegurar_valores
+    from src.model.orm_model import ActividadORM
+    lote = 50000
+    with orm_model.get_engine().begin() as conn:
+        for inicio in range(0, filas, lote):
+            datos = [dict(zip(CAMPOS, fila_sintetica(i + 1))) for i in range(inicio, min(inicio + lote, filas))]
+            asegurar_valores(datos, conn)
+            conn.execute(ActividadORM.__table__.insert(), datos)
+
+    from src.model.actividad import Actividad
+    actividad = Actividad()
+    return lambda: actividad.iterar_actividades("2000-01-01", "2100-12-31")
+
+
+def ejecutar(filas, archivo, formato):
+    return reportes.escribir_reporte(filas(), archivo, formato)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1000000)
+    parser.add_argument("--fuente", choices=["sintetica", "sqlite"], default="sintetica")
+    parser.add_argument("--formatos", default="pdf,csv,html,xlsx,txt")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir el pico de memoria")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    if args.fuente == "sintetica":
+        filas = fuente_sintetica(args.filas)
+    else:
+        print(f"Cargando {args.filas} filas en SQLite...")
+        filas = fuente_sqlite(args.filas, directorio)
+
+    print(f"{'formato':<8} | {'segundos':>9} | {'filas/s':>10} | {'pico (MB)':>9} | {'archivo (MB)':>12}")
+    for formato in args.formatos.split(","):
+        archivo = os.path.join(directorio, f"reporte.{formato}")
+        gc.collect()
+        t0 = time.perf_counter()
+        escritas = ejecutar(filas, archivo, formato)
+        segundos = time.perf_counter() - t0
+
+        pico = float("nan")
+        if not args.sin_memoria:
+            gc.collect()
+            tracemalloc.start()
+            ejecutar(filas, archivo, formato)
+            pico = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+        tamano = os.path.getsize(archivo) / 2**20
+        print(f"{formato:<8} | {segundos:>9.2f} | {escritas / segundos:>10.0f} | {pico:>9.1f} | {tamano:>12.1f}")
+        os.remove(archivo)
+
+
+if __name__ == "__main__":
+    main()
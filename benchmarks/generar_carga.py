@@ -0,0 +1,240 @@
+"""
+Generador de carga: muchos supervisores usando la aplicación a la vez.
+
+Simula supervisores virtuales (hilos, o procesos con varios hilos cada uno) que
+ejecutan una mezcla configurable de crear_cuenta, iniciar_sesion, registrar_actividad,
+consultar_actividades y generar_reporte a través de las clases del modelo (Usuario y
+Actividad). Los supervisores arrancan escalonados durante la rampa; al terminar se
+informa, por operación, el rendimiento, la latencia (p50, p95, p99 y máxima) y los
+errores, y el programa sale con código 1 si hubo alguno.
+
+Las actividades van a una base SQLite temporal precargada con --filas actividades (o
+a la base de --orm-url); las cuentas, al PostgreSQL local configurado en database.py.
+Una mezcla sin operaciones de cuentas corre solo con SQLite. Con --procesos, cada
+proceso tiene su propio registro durable, como una instancia más de la aplicación.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.generar_carga --supervisores 200 --rampa 30 --duracion 120
+    python -m benchmarks.generar_carga --procesos 4 \\
+        --mezcla registrar_actividad=6,consultar_actividades=3,generar_reporte=1
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+OPERACIONES = ("crear_cuenta", "iniciar_sesion", "registrar_actividad", "consultar_actividades", "generar_reporte")
+MEZCLA = "crear_cuenta=1,iniciar_sesion=4,registrar_actividad=10,consultar_actividades=8,generar_reporte=1"
+CONTRASENA = "carga123"
+CLIMAS = ["Soleado", "Nublado", "Lluvia", "Viento"]
+
+# Periodo de las actividades precargadas que consultan y reportan los supervisores
+INICIO_DATOS = date(2021, 1, 1)
+DIAS_DATOS = 365
+
+
+def leer_mezcla(texto):
+    """Convierte "operacion=peso,..." en un diccionario {operacion: peso}."""
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {nombre}. Use {', '.join(OPERACIONES)}.")
+        mezcla[nombre] = float(peso or 1)
+    return mezcla
+
+
+class Supervisor:
+    """Un supervisor virtual: elige operaciones según la mezcla y mide cada una."""
+
+    def __init__(self, numero, prefijo, mezcla, directorio, formato):
+        from src.model.actividad import Actividad
+        from src.model.database import Database
+        from src.model.usuario import Usuario
+
+        self.numero = numero
+        self.prefijo = prefijo
+        self.operaciones = list(mezcla)
+        self.pesos = list(mezcla.values())
+        self.directorio = directorio
+        self.formato = formato
+        self.azar = random.Random(f"{prefijo}-{numero}")
+        self.contador = itertools.count(1)
+        self.correo = f"{prefijo}-{numero}@ejemplo.com"
+        self.usuario = Usuario(Database())
+        self.actividad = Actividad()
+
+    def _dia(self, dias=0):
+        return INICIO_DATOS + timedelta(days=self.azar.randrange(DIAS_DATOS - dias))
+
+    def crear_cuenta(self, correo=None):
+        correo = correo or f"{self.prefijo}-{self.numero}-{next(self.contador)}@ejemplo.com"
+        self.usuario.crear_cuenta(f"Supervisor {self.numero}", correo, CONTRASENA)
+
+    def iniciar_sesion(self):
+        self.usuario.iniciar_sesion(self.correo, CONTRASENA)
+
+    def registrar_actividad(self):
+        self.actividad.registrar_actividad({
+            "fecha": f"{self._dia():%Y-%m-%d} {self.azar.randrange(6, 22):02d}:{self.azar.randrange(60):02d}",
+            "supervisor": f"Supervisor {self.numero}",
+            "descripcion": f"Carga {self.prefijo} {self.numero}-{next(self.contador)}",
+            "anexos": "",
+            "responsable": f"Responsable {self.azar.randrange(200)}",
+            "clima": self.azar.choice(CLIMAS),
+        })
+
+    def consultar_actividades(self):
+        inicio = self._dia(7)
+        self.actividad.consultar_actividades(str(inicio), str(inicio + timedelta(days=6)), compacto=True)
+
+    def generar_reporte(self):
+        inicio = self._dia(30)
+        archivo = os.path.join(self.directorio, f"reporte_{self.numero}.{self.formato}")
+        self.actividad.generar_reporte(str(inicio), str(inicio + timedelta(days=29)), archivo)
+
+    def medir(self, nombre, resultados, *args):
+        inicio = time.perf_counter()
+        error = None
+        try:
+            getattr(self, nombre)(*args)
+        except Exception as e:
+            error = f"{type(e).__name__}: {' '.join(str(e).split())}"
+        resultados.append((nombre, time.time(), time.perf_counter() - inicio, error))
+
+    def correr(self, hasta, pausa, resultados):
+        """
+        Ejecuta operaciones hasta el instante `hasta` (time.time()). Si la mezcla usa
+        cuentas, la primera operación crea la cuenta con la que luego inicia sesión.
+
+        :param pausa: Tiempo medio de espera entre operaciones, en segundos.
+        """
+        if {"crear_cuenta", "iniciar_sesion"} & set(self.operaciones):
+            self.medir("crear_cuenta", resultados, self.correo)
+        while time.time() < hasta:
+            self.medir(self.azar.choices(self.operaciones, self.pesos)[0], resultados)
+            if pausa:
+                time.sleep(self.azar.expovariate(1 / pausa))
+
+
+def correr_supervisores(numeros, opciones, inicio, directorio):
+    """
+    Corre un hilo por supervisor, cada uno arrancando en su turno de la rampa.
+
+    :return: Lista de (operacion, instante, latencia, error).
+    """
+    from src.model import orm_model
+
+    orm_model.DATABASE_URL = opciones["orm_url"]
+    os.makedirs(directorio, exist_ok=True)
+    os.chdir(directorio)
+    fin = inicio + opciones["rampa"] + opciones["duracion"]
+    resultados = []
+
+    def supervisor(numero):
+        time.sleep(max(0.0, inicio + opciones["rampa"] * numero / opciones["supervisores"] - time.time()))
+        Supervisor(numero, opciones["prefijo"], opciones["mezcla"], directorio, opciones["formato"]).correr(
+            fin, opciones["pausa"], resultados
+        )
+
+    hilos = [threading.Thread(target=supervisor, args=(numero,)) for numero in numeros]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def percentil(ordenadas, fraccion):
+    return ordenadas[min(len(ordenadas) - 1, int(fraccion * len(ordenadas)))]
+
+
+def informar(resultados, inicio, rampa, duracion):
+    """Imprime el resumen por operación y devuelve el número de errores."""
+    estable = inicio + rampa
+    print(f"\n{'operación':<24} {'total':>7} {'errores':>8} {'ops/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    errores = Counter()
+    for nombre in OPERACIONES + ("todas",):
+        filas = [r for r in resultados if nombre in ("todas", r[0])]
+        if not filas:
+            continue
+        latencias = sorted(r[2] * 1000 for r in filas)
+        # El rendimiento se mide después de la rampa, con todos los supervisores activos
+        por_segundo = sum(1 for r in filas if r[1] >= estable) / duracion
+        fallidas = [r[3] for r in filas if r[3]]
+        if nombre != "todas":
+            errores.update(f"{nombre}: {error}" for error in fallidas)
+        print(f"{nombre:<24} {len(filas):>7} {len(fallidas):>8} {por_segundo:>8.1f} "
+              f"{percentil(latencias, 0.5):>8.1f} {percentil(latencias, 0.95):>8.1f} "
+              f"{percentil(latencias, 0.99):>8.1f} {latencias[-1]:>8.1f}")
+    if errores:
+        print("\nErrores más frecuentes:")
+        for error, cantidad in errores.most_common(10):
+            print(f"{cantidad:>7}  {error[:150]}")
+    return sum(errores.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--supervisores", type=int, default=20)
+    parser.add_argument("--procesos", type=int, default=1, help="reparte los supervisores en varios procesos")
+    parser.add_argument("--rampa", type=float, default=10, help="segundos hasta que arrancan todos")
+    parser.add_argument("--duracion", type=float, default=30, help="segundos de carga estable tras la rampa")
+    parser.add_argument("--pausa", type=float, default=0.5, help="espera media entre operaciones, en segundos")
+    parser.add_argument("--mezcla", type=leer_mezcla, default=leer_mezcla(MEZCLA))
+    parser.add_argument("--filas", type=int, default=50000, help="actividades precargadas en SQLite")
+    parser.add_argument("--formato", default="csv", help="formato de los reportes")
+    parser.add_argument("--orm-url", help="base de las actividades; por defecto, una SQLite temporal")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    original = os.getcwd()
+    try:
+        opciones = {
+            "supervisores": args.supervisores, "rampa": args.rampa, "duracion": args.duracion,
+            "pausa": args.pausa, "mezcla": args.mezcla, "formato": args.formato,
+            "orm_url": args.orm_url or f"sqlite:///{os.path.join(directorio, 'carga.db')}",
+            "prefijo": f"carga{int(time.time())}",
+        }
+        from src.model import orm_model
+        orm_model.DATABASE_URL = opciones["orm_url"]
+        orm_model.Base.metadata.create_all(orm_model.get_engine())
+        if args.orm_url is None and args.filas:
+            from benchmarks.bench_cronologia import cargar
+            print(f"Precargando {args.filas} actividades...")
+            cargar(args.filas)
+        orm_model.get_engine().dispose()
+
+        print(f"{args.supervisores} supervisores en {args.procesos} proceso(s), "
+              f"rampa de {args.rampa:g} s y {args.duracion:g} s de carga estable...")
+        inicio = time.time() + 1
+        grupos = [range(p, args.supervisores, args.procesos) for p in range(args.procesos)]
+        if args.procesos == 1:
+            resultados = correr_supervisores(grupos[0], opciones, inicio, os.path.join(directorio, "proceso_0"))
+        else:
+            with multiprocessing.get_context("spawn").Pool(args.procesos) as pool:
+                partes = pool.starmap(correr_supervisores, [
+                    (grupo, opciones, inicio, os.path.join(directorio, f"proceso_{p}"))
+                    for p, grupo in enumerate(grupos)
+                ])
+            resultados = [r for parte in partes for r in parte]
+        os.chdir(original)
+        errores = informar(resultados, inicio, args.rampa, args.duracion)
+    finally:
+        os.chdir(original)
+        shutil.rmtree(directorio, ignore_errors=True)
+    raise SystemExit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
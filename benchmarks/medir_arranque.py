@@ -0,0 +1,63 @@
+"""
+Mide el tiempo de arranque de los puntos de entrada de la aplicación.
+
+Cada medición se hace en un proceso nuevo de Python, para que ningún módulo esté ya
+importado, e incluye el tiempo de importar el módulo de la interfaz y, para la consola,
+el de la primera consulta al modelo (que crea el engine de forma perezosa).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.medir_arranque --repeticiones 10
+
+Para ver el desglose por módulo:
+    python -X importtime -c "import src.view.console"
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+OBJETIVOS = {
+    "consola (importar)": "import src.view.console",
+    "consola (importar + consultar)": (
+        "import src.view.console as c; "
+        "c.actividad_model.consultar_actividades('2025-03-01', '2025-03-01')"
+    ),
+    "kivy (importar menu)": "import src.view.menu",
+}
+
+PLANTILLA = (
+    "import time; t0 = time.perf_counter(); {codigo}; "
+    "print((time.perf_counter() - t0) * 1000)"
+)
+
+
+def medir(codigo, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        resultado = subprocess.run(
+            [sys.executable, "-c", PLANTILLA.format(codigo=codigo)],
+            capture_output=True, text=True,
+        )
+        if resultado.returncode != 0:
+            error = resultado.stderr.strip().splitlines()
+            return None, error[-1] if error else "error desconocido"
+        tiempos.append(float(resultado.stdout.strip().splitlines()[-1]))
+    return statistics.median(tiempos), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    args = parser.parse_args()
+
+    for nombre, codigo in OBJETIVOS.items():
+        mediana, error = medir(codigo, args.repeticiones)
+        if error:
+            print(f"{nombre:<32} no disponible: {error}")
+        else:
+            print(f"{nombre:<32} {mediana:8.1f} ms (mediana de {args.repeticiones})")
+
+
+if __name__ == "__main__":
+    main()
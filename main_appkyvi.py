@@ -1,4 +1,7 @@
 from src.view.menu import BitacoraApp  
+from src.model import perfilado, trazas
 
 if __name__ == "__main__":
+    perfilado.activar_desde_entorno()  # BITACORA_PERFIL=<directorio>; ver src/model/perfilado.py
+    trazas.activar_desde_entorno()  # BITACORA_TRAZA=<directorio>; ver src/model/trazas.py
     BitacoraApp().run()  # Inicia la aplicación Kivy
@@ -1,4 +1,10 @@
-from src.view.console import main
+import sys
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Subcomandos por lotes (registrar, consultar, reporte); ver src/view/cli.py
+        from src.view.cli import main as main_cli
+        sys.exit(main_cli(sys.argv[1:]))
+
+    from src.view.console import main
     main()
@@ -1,6 +1,268 @@
-from .errores import CamposVaciosError, FechaInvalidaError, RangoFechasInvalidoError
-from datetime import datetime
-from src.model.orm_model import ActividadORM, Session
+from .errores import ActividadDuplicadaError, CamposVaciosError, FechaInvalidaError, RangoFechasInvalidoError
+from datetime import datetime, timedelta
+from src.model import archivado, cronologia, franjas, miniaturas, notificaciones, reportes
+from src.model.actividad_record import ActividadRecord, CAMPOS
+from src.model.duplicados import huella_actividad
+
+FORMATO_FECHA = "%Y-%m-%d"
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M"
+
+
+def leer_fecha(texto):
+    """
+    Convierte una fecha "YYYY-MM-DD" o una fecha con hora "YYYY-MM-DD HH:MM".
+
+    :return: Tupla (datetime, True si el texto trae hora).
+    :raises FechaInvalidaError: Si el texto no tiene ninguno de los dos formatos.
+    """
+    texto = (texto or "").strip()
+    for formato, con_hora in ((FORMATO_FECHA, False), (FORMATO_FECHA_HORA, True)):
+        try:
+            return datetime.strptime(texto, formato), con_hora
+        except ValueError:
+            pass
+    raise FechaInvalidaError()
+
+
+def validar_datos_actividad(datos_actividad):
+    """
+    Valida los datos de una actividad antes de registrarla.
+
+    :param datos_actividad: Diccionario con los campos de la actividad.
+    :return: La fecha de la actividad como datetime (con la hora si se indicó).
+    :raises CamposVaciosError: Si falta alguno de los campos obligatorios.
+    :raises FechaInvalidaError: Si la fecha tiene un formato incorrecto.
+    """
+    # Validar que los campos obligatorios estén presentes en el diccionario
+    campos_obligatorios = ['fecha', 'supervisor', 'descripcion', 'responsable']
+    for campo in campos_obligatorios:
+        if not datos_actividad.get(campo):
+            raise CamposVaciosError()
+
+    # Validar formato de la fecha: YYYY-MM-DD o YYYY-MM-DD HH:MM
+    return leer_fecha(datos_actividad['fecha'])[0]
+
+
+def validar_rango_fechas(fecha_inicio, fecha_fin):
+    """
+    Valida un rango de fechas de consulta.
+
+    :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
+    :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+    :return: Tupla (inicio, fin) como objetos date.
+    :raises FechaInvalidaError: Si alguna fecha está vacía o no es válida.
+    :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+    """
+    # Validar que ambas fechas estén presentes
+    if not fecha_inicio or not fecha_fin:
+        raise FechaInvalidaError("Las fechas no pueden estar vacías.")
+
+    # Convertir cadenas a objetos de fecha
+    try:
+        inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
+        fin = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
+    except ValueError:
+        raise FechaInvalidaError("Formato de fecha inválido.")
+
+    # Validar que el rango de fechas sea lógico
+    if inicio > fin:
+        raise RangoFechasInvalidoError("La fecha de inicio no puede ser mayor que la fecha de fin.")
+    return inicio, fin
+
+
+def validar_rangos(rangos):
+    """
+    Valida una lista de rangos de consulta, cada uno como validar_rango_fechas.
+
+    :param rangos: Iterable de tuplas (fecha_inicio, fecha_fin) en formato YYYY-MM-DD.
+    :return: Lista de tuplas (inicio, fin) como objetos date, en el mismo orden.
+    :raises FechaInvalidaError: Si no hay rangos o alguna fecha no es válida.
+    :raises RangoFechasInvalidoError: Si algún rango tiene el inicio después del fin.
+    """
+    validados = []
+    for numero, (fecha_inicio, fecha_fin) in enumerate(rangos, 1):
+        try:
+            validados.append(validar_rango_fechas(fecha_inicio, fecha_fin))
+        except (FechaInvalidaError, RangoFechasInvalidoError) as e:
+            raise type(e)(f"Rango {numero}: {e}")
+    if not validados:
+        raise FechaInvalidaError("Indique al menos un rango de fechas.")
+    return validados
+
+
+def validar_rango_horas(fecha_inicio, fecha_fin):
+    """
+    Valida un rango de consulta cuyas fechas pueden llevar hora ("YYYY-MM-DD HH:MM").
+    Una fecha de fin sin hora incluye todo ese día; con hora, el rango termina justo
+    antes de esa hora.
+
+    :return: Tupla (desde, hasta, con_hora): datetimes del rango [desde, hasta) y si
+        alguna de las fechas trae hora.
+    :raises FechaInvalidaError: Si alguna fecha está vacía o no es válida.
+    :raises RangoFechasInvalidoError: Si el inicio es posterior al fin.
+    """
+    if not fecha_inicio or not fecha_fin:
+        raise FechaInvalidaError("Las fechas no pueden estar vacías.")
+    desde, hora_inicio = leer_fecha(fecha_inicio)
+    hasta, hora_fin = leer_fecha(fecha_fin)
+    if not hora_fin:
+        hasta += timedelta(days=1)
+    if desde >= hasta:
+        raise RangoFechasInvalidoError("La fecha de inicio no puede ser mayor que la fecha de fin.")
+    return desde, hasta, hora_inicio or hora_fin
+
+
+def registro_desde_datos(datos_actividad, idempotente=False):
+    """
+    Valida los datos de una actividad y devuelve el registro que se escribe en el
+    registro durable, con la fecha en ISO, los textos sin espacios sobrantes y la
+    huella de contenido.
+
+    :param idempotente: Si es True, al aplicarse un duplicado se ignora en lugar de rechazarse.
+
+    :raises CamposVaciosError: Si falta alguno de los campos obligatorios.
+    :raises FechaInvalidaError: Si la fecha tiene un formato incorrecto.
+    """
+    fecha_obj = validar_datos_actividad(datos_actividad)
+    con_hora = leer_fecha(datos_actividad['fecha'])[1]
+    registro = {
+        "fecha": fecha_obj.date().isoformat(),
+        "fecha_hora": fecha_obj.isoformat(sep=" ", timespec="minutes") if con_hora else None,
+        "supervisor": datos_actividad['supervisor'].strip(),
+        "descripcion": datos_actividad['descripcion'].strip(),
+        "anexos": (datos_actividad.get('anexos') or '').strip(),
+        "responsable": datos_actividad['responsable'].strip(),
+        "clima": (datos_actividad.get('clima') or '').strip(),
+    }
+    registro["huella"] = huella_actividad(registro)
+    if idempotente:
+        registro["idempotente"] = True
+    return registro
+
+
+def huellas_registradas(huellas):
+    """
+    Busca por el índice único de huella las actividades ya registradas, en la base o
+    pendientes en el registro durable.
+
+    :param huellas: Lista de huellas.
+    :return: Conjunto de las huellas que ya existen. Si la base no está disponible solo
+        se ven las pendientes; un duplicado de la base se detecta al aplicar el registro.
+    """
+    from sqlalchemy.exc import OperationalError
+    from src.model.orm_model import ActividadORM, Session
+    existentes = set()
+    if _canal_durable is not None:
+        existentes.update(r.get("huella") or huella_actividad(r) for r in _canal_durable.pendientes())
+    session = Session()
+    try:
+        existentes.update(h for h, in session.query(ActividadORM.huella).filter(ActividadORM.huella.in_(huellas)))
+    except OperationalError:
+        pass
+    finally:
+        session.close()
+    return existentes & set(huellas)
+
+
+def vaciar_pendientes():
+    """Aplica las actividades que este proceso dejó en el registro durable, antes de leer."""
+    if _canal_durable is not None:
+        _canal_durable.vaciar()
+
+
+_canal_durable = None
+_tabla_registros_verificada = False
+
+
+def aplicar_registros(registros):
+    """
+    Inserta con SQLAlchemy ORM, en una transacción, registros del registro durable.
+    Los uuid ya aplicados se omiten, así que reproducir un registro dos veces no lo duplica.
+    Una actividad con la huella de otra ya registrada se rechaza, o se omite si el
+    registro es idempotente.
+
+    :param registros: Lista de diccionarios con uuid y los campos de la actividad.
+    :return: Lista de diccionarios de las actividades insertadas.
+    :raises ActividadDuplicadaError: Si algún registro no idempotente es un duplicado.
+    """
+    global _tabla_registros_verificada
+    from src.model.orm_model import ActividadORM, RegistroAplicado, Session
+    session = Session()
+    try:
+        if not _tabla_registros_verificada:
+            RegistroAplicado.__table__.create(session.get_bind(), checkfirst=True)
+            _tabla_registros_verificada = True
+        uuids = [r["uuid"] for r in registros]
+        aplicados = {
+            fila.uuid for fila in session.query(RegistroAplicado.uuid).filter(RegistroAplicado.uuid.in_(uuids))
+        }
+        # Registros anteriores a la huella no la traen
+        for registro in registros:
+            registro.setdefault("huella", huella_actividad(registro))
+        existentes = dict(
+            session.query(ActividadORM.huella, ActividadORM.id_actividad)
+            .filter(ActividadORM.huella.in_([r["huella"] for r in registros]))
+        )
+        registradas = []
+        for registro in registros:
+            if registro["uuid"] in aplicados:
+                continue
+            if registro["huella"] in existentes:
+                if not registro.get("idempotente"):
+                    raise ActividadDuplicadaError()
+                session.add(RegistroAplicado(uuid=registro["uuid"], id_actividad=existentes[registro["huella"]]))
+                continue
+            nueva_actividad = ActividadORM(
+                fecha=datetime.strptime(registro["fecha"], "%Y-%m-%d").date(),
+                # Registros anteriores a la hora no traen fecha_hora
+                fecha_hora=datetime.fromisoformat(registro["fecha_hora"]) if registro.get("fecha_hora") else None,
+                supervisor=registro["supervisor"],
+                descripcion=registro["descripcion"],
+                anexos=registro["anexos"],
+                responsable=registro["responsable"],
+                clima=registro["clima"],
+                huella=registro["huella"],
+            )
+            session.add(nueva_actividad)
+            session.flush()
+            existentes[registro["huella"]] = nueva_actividad.id_actividad
+            session.add(RegistroAplicado(uuid=registro["uuid"], id_actividad=nueva_actividad.id_actividad))
+            registradas.append(actividad_a_diccionario(nueva_actividad))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+    for registrada in registradas:
+        notificaciones.publicar_local(registrada)
+    return registradas
+
+
+def obtener_canal_durable():
+    """Devuelve el canal del registro durable hacia la base SQLAlchemy, creándolo en el primer uso."""
+    global _canal_durable
+    if _canal_durable is None:
+        from sqlalchemy.exc import OperationalError
+        from src.model.registro_durable import Canal
+        _canal_durable = Canal("orm", aplicar_registros, errores_transitorios=(OperationalError,))
+    return _canal_durable
+
+
+def actividad_a_diccionario(a):
+    """Convierte un objeto ActividadORM en el diccionario que devuelven las consultas."""
+    return {
+        "id_actividad": a.id_actividad,
+        "fecha": a.fecha,
+        "supervisor": a.supervisor,
+        "descripcion": a.descripcion,
+        "anexos": a.anexos,
+        "responsable": a.responsable,
+        "clima": a.clima,
+        "estado": a.estado,
+        "tipo": a.tipo
+    }
 
 
 class Actividad:
@@ -11,44 +273,150 @@ class Actividad:
     Clase encargada de gestionar el registro, consulta y generación de reportes de actividades.
     """
 
-    def registrar_actividad(self, datos_actividad):
+    def registrar_actividad(self, datos_actividad, idempotente=False):
         """
         Registra una nueva actividad en la base de datos usando SQLAlchemy ORM.
 
         :param datos_actividad: Diccionario con los campos:
-            - fecha
+            - fecha (YYYY-MM-DD, o YYYY-MM-DD HH:MM para guardar también la hora)
             - supervisor
             - descripcion
             - anexos
             - responsable
             - clima
+        :param idempotente: Si es True, registrar de nuevo una actividad ya registrada
+            (por ejemplo, al reintentar tras un error) no hace nada en lugar de fallar.
         :raises CamposVaciosError: Si falta alguno de los campos obligatorios.
         :raises FechaInvalidaError: Si la fecha tiene un formato incorrecto.
+        :raises ActividadDuplicadaError: Si ya existe la misma actividad y no es idempotente.
         """
-        # Validar que los campos obligatorios estén presentes en el diccionario
-        campos_obligatorios = ['fecha', 'supervisor', 'descripcion', 'responsable']
-        for campo in campos_obligatorios:
-            if not datos_actividad.get(campo):
-                raise CamposVaciosError()
+        registro = registro_desde_datos(datos_actividad, idempotente)
 
-        # Validar formato de la fecha
-        try:
-            fecha_obj = datetime.strptime(datos_actividad['fecha'].strip(), "%Y-%m-%d")
-        except ValueError:
-            raise FechaInvalidaError()
+        # Un doble clic o un reintento se detecta por el índice de huella antes de
+        # escribir en el registro durable
+        if huellas_registradas([registro["huella"]]):
+            if idempotente:
+                return
+            raise ActividadDuplicadaError()
+
+        # La actividad solo se anexa al registro durable y el hilo reproductor la aplica
+        # a la base; si la base no está disponible, queda pendiente y no se pierde.
+        obtener_canal_durable().escribir(registro)
+
+        # Las miniaturas y vistas previas de los anexos se generan en segundo plano
+        miniaturas.encolar_anexos(registro["anexos"])
 
-        # Registrar la actividad usando SQLAlchemy ORM
+    def registrar_actividades(self, actividades, tamano_lote=500, omitir_invalidas=False, idempotente=False):
+        """
+        Registra muchas actividades por lotes: cada lote se escribe en el registro
+        durable con un solo fsync y se aplica a la base en una transacción.
+
+        :param actividades: Iterable de diccionarios con los mismos campos que
+            registrar_actividad; se consume a medida que se registra.
+        :param tamano_lote: Actividades por lote.
+        :param omitir_invalidas: Si es True, las actividades inválidas o duplicadas se
+            informan y se sigue con las demás; si es False, la primera inválida
+            detiene la carga (los lotes anteriores ya quedan registrados).
+        :param idempotente: Si es True, las actividades ya registradas se omiten sin
+            contarlas como inválidas; si es False, son rechazadas por duplicadas.
+        :return: Tupla (registradas, invalidas), donde invalidas es una lista de
+            (posición desde 1, excepción).
+        :raises CamposVaciosError: Si falta algún campo obligatorio y no se omiten inválidas.
+        :raises FechaInvalidaError: Si alguna fecha es incorrecta y no se omiten inválidas.
+        """
+        registradas, invalidas, lote = 0, [], []
+        for posicion, datos in enumerate(actividades, 1):
+            try:
+                lote.append((posicion, registro_desde_datos(datos, idempotente)))
+            except (CamposVaciosError, FechaInvalidaError) as e:
+                if not omitir_invalidas:
+                    if lote:
+                        registradas += self._registrar_lote(lote, invalidas)
+                    raise
+                invalidas.append((posicion, e))
+                continue
+            if len(lote) >= tamano_lote:
+                registradas += self._registrar_lote(lote, invalidas)
+                lote = []
+        if lote:
+            registradas += self._registrar_lote(lote, invalidas)
+        return registradas, invalidas
+
+    @staticmethod
+    def _registrar_lote(lote, invalidas):
+        # Los duplicados (en la base, pendientes o dentro del mismo lote) se descartan
+        # antes de escribir, porque el reproductor los aplica después de responder
+        vistas = huellas_registradas([registro["huella"] for _, registro in lote])
+        nuevos = []
+        for posicion, registro in lote:
+            if registro["huella"] in vistas:
+                if not registro.get("idempotente"):
+                    invalidas.append((posicion, ActividadDuplicadaError()))
+                continue
+            vistas.add(registro["huella"])
+            nuevos.append(registro)
+        if not nuevos:
+            return 0
+        for registro in obtener_canal_durable().escribir_lote(nuevos):
+            miniaturas.encolar_anexos(registro["anexos"])
+        return len(nuevos)
+
+    def registrar_recurrente(self, datos_actividad, frecuencia, hasta, intervalo=1, idempotente=False):
+        """
+        Registra una actividad repetida según una regla. La base genera las fechas y
+        las inserta con una sola sentencia (ver recurrencias.py), sin una ida y vuelta
+        por ocurrencia. No pasa por el registro durable: la sentencia es atómica y, si
+        la base no está disponible, no se registra ninguna.
+
+        :param datos_actividad: Actividad modelo, con los mismos campos que
+            registrar_actividad; su fecha es la primera ocurrencia posible.
+        :param frecuencia: "diaria", "laborables" (lunes a viernes) o "semanal".
+        :param hasta: Última fecha posible, incluida (YYYY-MM-DD).
+        :param intervalo: Cada cuántos días o semanas se repite.
+        :param idempotente: Si es True, las ocurrencias ya registradas se omiten; si es
+            False, que exista alguna rechaza toda la serie.
+        :return: Número de actividades registradas.
+        :raises CamposVaciosError: Si falta alguno de los campos obligatorios.
+        :raises FechaInvalidaError: Si alguna fecha tiene un formato incorrecto.
+        :raises RangoFechasInvalidoError: Si hasta es anterior a la fecha o la serie es demasiado larga.
+        :raises ValueError: Si la frecuencia o el intervalo no son válidos.
+        :raises ActividadDuplicadaError: Si alguna ocurrencia ya existe y no es idempotente.
+        """
+        from sqlalchemy import text
+        from src.model import recurrencias
+        from src.model.catalogos import COLUMNAS_CATALOGO, obtener_catalogo
+        from src.model.duplicados import sufijo_huella
+        from src.model.orm_model import Session
+
+        registro = registro_desde_datos(datos_actividad)
+        inicio, fin = validar_rango_fechas(registro["fecha"], hasta)
+        recurrencias.validar_regla(inicio, fin, frecuencia, intervalo)
+        esperadas = recurrencias.contar_ocurrencias(inicio, fin, frecuencia, intervalo)
+
+        vaciar_pendientes()
         session = Session()
         try:
-            nueva_actividad = ActividadORM(
-                fecha=fecha_obj.date(),
-                supervisor=datos_actividad['supervisor'].strip(),
-                descripcion=datos_actividad['descripcion'].strip(),
-                anexos=datos_actividad.get('anexos', '').strip(),
-                responsable=datos_actividad['responsable'].strip(),
-                clima=datos_actividad.get('clima', '').strip()
-            )
-            session.add(nueva_actividad)
+            conexion = session.connection()
+            recurrencias.registrar_funcion_huella(conexion)
+            ids = {
+                campo: obtener_catalogo(COLUMNAS_CATALOGO[campo]).asegurar(registro[campo], conexion)
+                for campo in ("responsable", "clima")
+            }
+            insertadas = conexion.execute(text(recurrencias.SQL_INSERTAR[conexion.dialect.name]), {
+                "inicio": inicio.isoformat(),
+                "hasta": fin.isoformat(),
+                "paso": recurrencias.paso_en_dias(frecuencia, intervalo),
+                "laborables": int(frecuencia == "laborables"),
+                "hora": registro["fecha_hora"][11:16] + ":00" if registro["fecha_hora"] else None,
+                "descripcion": registro["descripcion"],
+                "anexos": registro["anexos"],
+                "id_responsable": ids["responsable"],
+                "id_clima": ids["clima"],
+                "supervisor": registro["supervisor"],
+                "sufijo": sufijo_huella(registro),
+            }).rowcount
+            if insertadas < esperadas and not idempotente:
+                raise ActividadDuplicadaError()
             session.commit()
         except Exception as e:
             session.rollback()
@@ -56,72 +424,309 @@ class Actividad:
         finally:
             session.close()
 
-    def consultar_actividades(self, fecha_inicio, fecha_fin):
+        miniaturas.encolar_anexos(registro["anexos"])
+        return insertadas
+
+    def consultar_actividades(self, fecha_inicio, fecha_fin, compacto=False):
         """
         Consulta las actividades registradas en un rango de fechas usando SQLAlchemy ORM
         y devuelve los resultados como una lista de diccionarios.
 
         :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
         :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+        :param compacto: Si es True, devuelve ActividadRecord en lugar de diccionarios;
+            ocupan mucha menos memoria en rangos grandes y admiten el mismo acceso por clave.
         :return: Lista de diccionarios con los datos de las actividades.
         :raises FechaInvalidaError: Si alguna fecha no es válida.
         :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
         """
-    # Validar que ambas fechas estén presentes
-        if not fecha_inicio or not fecha_fin:
-            raise FechaInvalidaError("Las fechas no pueden estar vacías.")
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
 
-    # Convertir cadenas a objetos de fecha
+    # Crear sesión y consultar actividades dentro del rango
+        from src.model.orm_model import ActividadORM, Session
+        vaciar_pendientes()
+        session = Session()
         try:
-            inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
-            fin = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
-        except ValueError:
-            raise FechaInvalidaError("Formato de fecha inválido.")
+            if compacto:
+                # Se leen solo las columnas, sin construir objetos ORM ni diccionarios
+                columnas = [getattr(ActividadORM, campo) for campo in CAMPOS]
+                filas = (
+                    session.query(*columnas)
+                    .filter(ActividadORM.fecha >= inicio, ActividadORM.fecha <= fin)
+                    .order_by(ActividadORM.fecha, ActividadORM.id_actividad)
+                )
+                actividades_dict = [ActividadRecord(*fila) for fila in filas]
+            else:
+                actividades = (
+                    session.query(ActividadORM)
+                    .filter(ActividadORM.fecha >= inicio, ActividadORM.fecha <= fin)
+                    .order_by(ActividadORM.fecha, ActividadORM.id_actividad)
+                    .all()
+                )
 
-    # Validar que el rango de fechas sea lógico
-        if inicio > fin:
-            raise RangoFechasInvalidoError("La fecha de inicio no puede ser mayor que la fecha de fin.")
+                # Convertir cada objeto ORM en un diccionario para facilitar el acceso en tests
+                actividades_dict = [actividad_a_diccionario(a) for a in actividades]
+        finally:
+            session.close()
 
-    # Crear sesión y consultar actividades dentro del rango
+        # Los meses movidos al archivo frío solo se leen si el rango los incluye
+        archivo = archivado.obtener_archivo("orm")
+        if archivo.solapa(inicio, fin):
+            archivadas = archivo.leer(inicio, fin)
+            if compacto:
+                archivadas = (ActividadRecord.desde_fila(fila) for fila in archivadas)
+            actividades_dict = list(archivado.combinar(actividades_dict, archivadas))
+        return actividades_dict
+
+    def consultar_rangos(self, rangos, compacto=False):
+        """
+        Consulta varios rangos de fechas a la vez (por ejemplo, esta semana y la misma
+        semana del mes anterior) con una sola consulta: los rangos van en una tabla
+        derivada unida con actividades, así que hay un solo viaje a la base sin importar
+        cuántos sean.
+
+        :param rangos: Lista de tuplas (fecha_inicio, fecha_fin) en formato YYYY-MM-DD.
+        :param compacto: Si es True, devuelve ActividadRecord en lugar de diccionarios.
+        :return: Una lista de actividades por rango, en el orden de `rangos`; una
+            actividad aparece en cada rango que la contiene.
+        :raises FechaInvalidaError: Si no hay rangos o alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si algún rango tiene el inicio después del fin.
+        """
+        validados = validar_rangos(rangos)
+        from sqlalchemy import Date, Integer, literal, select, union_all
+        from src.model.orm_model import ActividadORM, Session
+
+        # UNION ALL de filas literales: a diferencia de VALUES con alias de columnas,
+        # lo admiten tanto SQLite como PostgreSQL
+        filas_rangos = [
+            select(literal(n, Integer).label("n"), literal(inicio, Date).label("inicio"),
+                   literal(fin, Date).label("fin"))
+            for n, (inicio, fin) in enumerate(validados)
+        ]
+        tabla = (union_all(*filas_rangos) if len(filas_rangos) > 1 else filas_rangos[0]).cte("rangos")
+
+        resultado = [[] for _ in validados]
+        vaciar_pendientes()
+        session = Session()
+        try:
+            if compacto:
+                consulta = session.query(tabla.c.n, *[getattr(ActividadORM, campo) for campo in CAMPOS])
+            else:
+                consulta = session.query(tabla.c.n, ActividadORM)
+            filas = (
+                consulta.select_from(tabla)
+                .join(ActividadORM, ActividadORM.fecha.between(tabla.c.inicio, tabla.c.fin))
+                .order_by(tabla.c.n, ActividadORM.fecha, ActividadORM.id_actividad)
+            )
+            for n, *fila in filas:
+                resultado[n].append(ActividadRecord(*fila) if compacto else actividad_a_diccionario(fila[0]))
+        finally:
+            session.close()
+
+        archivo = archivado.obtener_archivo("orm")
+        for n, (inicio, fin) in enumerate(validados):
+            if archivo.solapa(inicio, fin):
+                archivadas = archivo.leer(inicio, fin)
+                if compacto:
+                    archivadas = (ActividadRecord.desde_fila(fila) for fila in archivadas)
+                resultado[n] = list(archivado.combinar(resultado[n], archivadas))
+        return resultado
+
+    def iterar_actividades(self, fecha_inicio, fecha_fin, tamano_lote=1000):
+        """
+        Genera las actividades de un rango de fechas leyendo la base por lotes, para
+        recorrer rangos grandes con memoria acotada.
+
+        :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
+        :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+        :param tamano_lote: Filas que se traen de la base en cada lote.
+        :return: Generador de ActividadRecord, en orden de fecha.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        return self._iterar_rango(inicio, fin, tamano_lote)
+
+    def _iterar_rango(self, inicio, fin, tamano_lote):
+        from src.model.orm_model import ActividadORM, Session
+        vaciar_pendientes()
+        session = Session()
+        try:
+            columnas = [getattr(ActividadORM, campo) for campo in CAMPOS]
+            filas = (
+                session.query(*columnas)
+                .filter(ActividadORM.fecha >= inicio, ActividadORM.fecha <= fin)
+                .order_by(ActividadORM.fecha, ActividadORM.id_actividad)
+                .yield_per(tamano_lote)
+            )
+            calientes = (ActividadRecord(*fila) for fila in filas)
+            archivo = archivado.obtener_archivo("orm")
+            if archivo.solapa(inicio, fin):
+                archivadas = (ActividadRecord.desde_fila(fila) for fila in archivo.leer(inicio, fin))
+                calientes = archivado.combinar(calientes, archivadas)
+            yield from calientes
+        finally:
+            session.close()
+
+    def contar_actividades(self, fecha_inicio, fecha_fin):
+        """
+        Cuenta las actividades de un rango de fechas.
+
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        from sqlalchemy import func
+        from src.model.orm_model import ActividadORM, Session
+        vaciar_pendientes()
+        session = Session()
+        try:
+            return (
+                session.query(func.count(ActividadORM.id_actividad))
+                .filter(ActividadORM.fecha >= inicio, ActividadORM.fecha <= fin)
+                .scalar()
+            ) + archivado.obtener_archivo("orm").contar(inicio, fin)
+        finally:
+            session.close()
+
+    def contar_por(self, campo, fecha_inicio, fecha_fin):
+        """
+        Cuenta las actividades de un rango agrupadas por clima, estado, tipo o
+        responsable. La agrupación se hace sobre el id del catálogo, no sobre el texto.
+
+        :param campo: "clima", "estado", "tipo" o "responsable".
+        :return: Diccionario {valor: cantidad}, de mayor a menor cantidad.
+        :raises ValueError: Si el campo no tiene catálogo.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        from sqlalchemy import func
+        from src.model.catalogos import COLUMNAS_CATALOGO
+        from src.model.orm_model import ActividadORM, Session
+        if campo not in COLUMNAS_CATALOGO:
+            raise ValueError(f"No se puede agrupar por {campo}.")
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+
+        columna = getattr(ActividadORM, campo)
+        vaciar_pendientes()
         session = Session()
         try:
-            actividades = (
-                session.query(ActividadORM)
+            conteo = dict(
+                session.query(columna, func.count(ActividadORM.id_actividad))
                 .filter(ActividadORM.fecha >= inicio, ActividadORM.fecha <= fin)
-                .order_by(ActividadORM.fecha)
-                .all()
+                .group_by(columna)
             )
+        finally:
+            session.close()
+
+        archivo = archivado.obtener_archivo("orm")
+        if archivo.solapa(inicio, fin):
+            for fila in archivo.leer(inicio, fin):
+                conteo[fila[campo]] = conteo.get(fila[campo], 0) + 1
+        return dict(sorted(conteo.items(), key=lambda par: -par[1]))
+
+    def contar_por_franja(self, fecha_inicio, fecha_fin, franja="hora"):
+        """
+        Cuenta las actividades de un rango por hora, por turno o por día. La franja se
+        calcula en la base sobre el índice de fecha_hora.
+
+        Con las franjas hora y turno solo cuentan las actividades registradas con hora.
+        Con la franja dia cuentan todas, salvo que el rango tenga hora.
+
+        :param fecha_inicio: YYYY-MM-DD o YYYY-MM-DD HH:MM.
+        :param fecha_fin: YYYY-MM-DD (incluye todo el día) o YYYY-MM-DD HH:MM (excluye esa hora).
+        :param franja: "hora", "turno" o "dia".
+        :return: Diccionario {inicio de la franja (datetime): cantidad}, en orden cronológico.
+        :raises ValueError: Si la franja no existe.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        from sqlalchemy import func, literal_column
+        from src.model.orm_model import ActividadORM, Session
+        franjas.validar_franja(franja)
+        desde, hasta, con_hora = validar_rango_horas(fecha_inicio, fecha_fin)
+        con_hora = con_hora or franja != "dia"
 
-        # Convertir cada objeto ORM en un diccionario para facilitar el acceso en tests
-            actividades_dict = [
-                {
-                    "id_actividad": a.id_actividad,
-                    "fecha": a.fecha,
-                    "descripcion": a.descripcion,
-                    "anexos": a.anexos,
-                    "responsable": a.responsable,
-                    "clima": a.clima,
-                    "estado": a.estado,
-                    "tipo": a.tipo
-                }
-                for a in actividades
+        vaciar_pendientes()
+        session = Session()
+        try:
+            inicio_franja = literal_column(franjas.SQL_FRANJA[session.get_bind().dialect.name][franja])
+            if con_hora:
+                filtro = (ActividadORM.fecha_hora >= desde, ActividadORM.fecha_hora < hasta)
+            else:
+                filtro = (ActividadORM.fecha >= desde.date(), ActividadORM.fecha < hasta.date())
+            conteo = {
+                franjas.como_datetime(inicio): cantidad
+                for inicio, cantidad in session.query(inicio_franja, func.count(ActividadORM.id_actividad))
+                .filter(*filtro)
+                .group_by(inicio_franja)
+            }
+        finally:
+            session.close()
+
+        franjas.contar_archivadas(archivado.obtener_archivo("orm"), desde, hasta, franja, con_hora, conteo)
+        return dict(sorted(conteo.items()))
+
+    def cronologia(self, por, valor, fecha_inicio, fecha_fin, limite=cronologia.TAMANO_PAGINA, despues=None):
+        """
+        Devuelve una página de la cronología de un responsable o de un supervisor: sus
+        actividades del rango en orden de (fecha, id_actividad), leídas del índice de
+        cobertura de esa persona.
+
+        :param por: "responsable" o "supervisor".
+        :param valor: Nombre del responsable o del supervisor.
+        :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
+        :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+        :param limite: Actividades por página.
+        :param despues: Cursor devuelto por la página anterior; None para la primera.
+        :return: Tupla (actividades, cursor): diccionarios con cronologia.COLUMNAS y el
+            cursor de la página siguiente, o None si no hay más.
+        :raises ValueError: Si el filtro no es responsable ni supervisor o el nombre está vacío.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        from itertools import islice
+        from sqlalchemy import tuple_
+        from src.model.orm_model import ActividadORM, Session
+        cronologia.validar_filtro(por, valor)
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        valor = valor.strip()
+
+        columnas = [getattr(ActividadORM, columna) for columna in cronologia.COLUMNAS]
+        vaciar_pendientes()
+        session = Session()
+        try:
+            consulta = session.query(*columnas).filter(
+                getattr(ActividadORM, por) == valor, ActividadORM.fecha >= inicio, ActividadORM.fecha <= fin
+            )
+            if despues is not None:
+                consulta = consulta.filter(tuple_(ActividadORM.fecha, ActividadORM.id_actividad) > tuple(despues))
+            calientes = [
+                fila._asdict()
+                for fila in consulta.order_by(ActividadORM.fecha, ActividadORM.id_actividad).limit(limite)
             ]
-            return actividades_dict
         finally:
             session.close()
 
+        archivadas = cronologia.archivadas(archivado.obtener_archivo("orm"), por, valor, inicio, fin, despues)
+        filas = list(islice(archivado.combinar(calientes, archivadas), limite))
+        return filas, cronologia.siguiente_cursor(filas, limite)
 
-    def generar_reporte(self, fecha_inicio, fecha_fin, archivo_pdf="reporte.pdf"):
+    def generar_reporte(self, fecha_inicio, fecha_fin, archivo_pdf="reporte.pdf", formato=None, progreso=None):
         """
-        Genera un archivo PDF con las actividades entre dos fechas.
+        Genera un reporte con las actividades entre dos fechas. Las actividades se leen
+        y escriben por lotes, así que la memoria no depende del tamaño del rango.
 
         :param fecha_inicio: Fecha de inicio del reporte (YYYY-MM-DD).
         :param fecha_fin: Fecha de fin del reporte (YYYY-MM-DD).
-        :param archivo_pdf: Nombre del archivo PDF de salida.
+        :param archivo_pdf: Nombre del archivo de salida.
+        :param formato: "pdf", "csv", "html", "xlsx" o "txt"; si no se indica, se usa la
+            extensión del archivo.
+        :param progreso: Función opcional que recibe el número de actividades escritas.
         :return: True si el reporte se generó correctamente.
         :raises FechaInvalidaError: Si las fechas no son válidas.
         :raises RangoFechasInvalidoError: Si la fecha de inicio es mayor a la de fin.
-        :raises ValueError: Si el archivo no se puede crear.
+        :raises ValueError: Si el archivo no se puede crear o el formato no está soportado.
         """
         if not fecha_inicio or not fecha_fin:
             raise FechaInvalidaError("Las fechas no pueden estar vacías.")
@@ -129,29 +734,10 @@ class Actividad:
         if not archivo_pdf:
             raise ValueError("El nombre del archivo no puede estar vacío.")
 
-        try:
-            inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d")
-            fin = datetime.strptime(fecha_fin, "%Y-%m-%d")
-        except ValueError:
-            raise FechaInvalidaError()
-
-        if inicio > fin:
-            raise RangoFechasInvalidoError("La fecha de inicio no puede ser mayor que la fecha de fin.")
-
-        # Obtener actividades con ORM
-        actividades = self.consultar_actividades(fecha_inicio, fecha_fin)
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
 
-        # Generar el archivo PDF simulando escritura a archivo de texto
         try:
-            with open(archivo_pdf, 'w', encoding='utf-8') as f:
-                f.write("Reporte de actividades\n")
-                if not actividades:
-                    f.write("No hay actividades registradas en este rango de fechas.\n")
-                else:
-                    for act in actividades:
-                        f.write(
-                            f"{act.fecha} | {act.supervisor} | {act.descripcion} | {act.anexos or ''} | {act.responsable} | {act.clima or ''}\n"
-                        )
+            reportes.escribir_reporte(self._iterar_rango(inicio, fin, 1000), archivo_pdf, formato, progreso)
         except Exception as e:
             raise ValueError(f"Error al generar el reporte: {str(e)}")
 
@@ -0,0 +1,86 @@
+"""
+Representación compacta de una actividad para consultas de muchos registros.
+
+ActividadRecord guarda los campos en __slots__ en lugar de un diccionario por fila, e
+interna los campos de baja cardinalidad (supervisor, responsable, clima, estado, tipo)
+para que miles de filas compartan la misma cadena. Implementa Mapping, por lo que el
+código que usa actividad["campo"], .get(), .items() o compara con un diccionario
+sigue funcionando.
+"""
+
+import sys
+from collections.abc import Mapping
+
+CAMPOS = (
+    "id_actividad", "fecha", "supervisor", "descripcion", "anexos",
+    "responsable", "clima", "estado", "tipo",
+)
+CAMPOS_INTERNADOS = frozenset(("supervisor", "responsable", "clima", "estado", "tipo"))
+
+
+def _internar(valor):
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+class ActividadRecord(Mapping):
+    """
+    Actividad de solo lectura con acceso por atributo y por clave.
+    """
+
+    __slots__ = CAMPOS
+
+    def __init__(self, id_actividad, fecha, supervisor, descripcion, anexos,
+                 responsable, clima, estado, tipo):
+        self.id_actividad = id_actividad
+        self.fecha = fecha
+        self.supervisor = _internar(supervisor)
+        self.descripcion = descripcion
+        self.anexos = anexos
+        self.responsable = _internar(responsable)
+        self.clima = _internar(clima)
+        self.estado = _internar(estado)
+        self.tipo = _internar(tipo)
+
+    @classmethod
+    def desde_fila(cls, fila):
+        """
+        Crea un registro a partir de un diccionario o de una fila con claves
+        (RealDictRow, Row de SQLAlchemy con ._mapping). Las claves extra se ignoran.
+        """
+        fila = getattr(fila, "_mapping", fila)
+        return cls(*(fila.get(campo) for campo in CAMPOS))
+
+    @classmethod
+    def fabrica(cls, columnas):
+        """
+        Devuelve una función que convierte tuplas con las columnas indicadas en registros,
+        sin crear un diccionario intermedio por fila.
+
+        :param columnas: Nombres de las columnas en el orden de la tupla.
+        """
+        posiciones = [columnas.index(c) if c in columnas else None for c in CAMPOS]
+
+        def crear(fila):
+            return cls(*(fila[p] if p is not None else None for p in posiciones))
+        return crear
+
+    def __getitem__(self, clave):
+        if clave not in CAMPOS:
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, campo) for campo in CAMPOS))
+
+    def a_diccionario(self):
+        """Devuelve la actividad como diccionario."""
+        return dict(self)
@@ -0,0 +1,312 @@
+"""
+Archivo frío de actividades antiguas.
+
+Las actividades anteriores a un horizonte (HORIZONTE_DIAS) se mueven de la tabla
+actividades a segmentos comprimidos, uno por mes (JSON por línea con gzip), descritos
+en un manifiesto. Así los recorridos por rango y el mantenimiento de índices de la
+tabla caliente no pagan por años de obras terminadas.
+
+Las consultas de Actividad y el motor de reportes leen el archivo solo cuando el rango
+pedido se solapa con algún mes archivado, y combinan ambas fuentes en orden de
+(fecha, id_actividad).
+
+Uso (desde la raíz del proyecto):
+    python -m src.model.archivado --horizonte-dias 730            # base SQLAlchemy
+    python -m src.model.archivado --horizonte-dias 730 --postgres # PostgreSQL
+"""
+
+import argparse
+import gzip
+import heapq
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+DIRECTORIO_ARCHIVO = "archivo_frio"
+HORIZONTE_DIAS = 730
+
+# Ids por sentencia al borrar las actividades archivadas (SQLite admite 999 parámetros)
+_LOTE_BORRADO = 500
+
+
+def _mes_siguiente(primero):
+    return (primero + timedelta(days=32)).replace(day=1)
+
+
+def _clave_orden(fila):
+    return (fila["fecha"], fila["id_actividad"])
+
+
+def _anotar_ids(filas, ids):
+    # Solo se borran las filas que llegaron al segmento, no las insertadas mientras tanto
+    for fila in filas:
+        ids.append(fila["id_actividad"])
+        yield fila
+
+
+def combinar(calientes, archivadas):
+    """
+    Combina dos secuencias de actividades ordenadas por (fecha, id_actividad). Si una
+    actividad aparece en ambas (archivado interrumpido antes de borrar), se entrega una vez.
+    """
+    anterior = None
+    for fila in heapq.merge(calientes, archivadas, key=_clave_orden):
+        clave = _clave_orden(fila)
+        if clave == anterior:
+            continue
+        anterior = clave
+        yield fila
+
+
+class ArchivoFrio:
+    """
+    Segmentos mensuales comprimidos y su manifiesto.
+    """
+
+    def __init__(self, directorio):
+        """
+        :param directorio: Carpeta de los segmentos y de manifiesto.json.
+        """
+        self.directorio = directorio
+        self._manifiesto = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _ruta_manifiesto(self):
+        return os.path.join(self.directorio, "manifiesto.json")
+
+    def manifiesto(self):
+        """Devuelve {mes "YYYY-MM": {"archivo", "filas"}}; se relee solo si cambió en disco."""
+        ruta = self._ruta_manifiesto()
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._mtime:
+                with open(ruta, encoding="utf-8") as f:
+                    self._manifiesto = json.load(f)["segmentos"]
+                self._mtime = mtime
+            return self._manifiesto
+
+    def _guardar_manifiesto(self, segmentos):
+        temporal = self._ruta_manifiesto() + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"segmentos": segmentos}, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta_manifiesto())
+
+    def meses_en_rango(self, inicio, fin):
+        """Devuelve, en orden, los meses archivados que se solapan con [inicio, fin]."""
+        desde, hasta = inicio.strftime("%Y-%m"), fin.strftime("%Y-%m")
+        return sorted(mes for mes in self.manifiesto() if desde <= mes <= hasta)
+
+    def solapa(self, inicio, fin):
+        """Indica si algún mes archivado se solapa con el rango."""
+        return bool(self.meses_en_rango(inicio, fin))
+
+    def leer(self, inicio, fin, filtro=None):
+        """
+        Genera las actividades archivadas del rango, en orden de (fecha, id_actividad),
+        con la fecha como objeto date.
+
+        :param filtro: Función opcional que recibe cada fila y decide si se incluye.
+        """
+        segmentos = self.manifiesto()
+        for mes in self.meses_en_rango(inicio, fin):
+            ruta = os.path.join(self.directorio, segmentos[mes]["archivo"])
+            with gzip.open(ruta, "rt", encoding="utf-8") as f:
+                for linea in f:
+                    fila = json.loads(linea)
+                    fila["fecha"] = date.fromisoformat(fila["fecha"])
+                    if inicio <= fila["fecha"] <= fin and (filtro is None or filtro(fila)):
+                        yield fila
+
+    def contar(self, inicio, fin, filtro=None):
+        """Cuenta las actividades archivadas del rango."""
+        return sum(1 for _ in self.leer(inicio, fin, filtro))
+
+    def escribir_mes(self, mes, filas):
+        """
+        Guarda las actividades de un mes en su segmento. Si el mes ya estaba archivado,
+        las filas se agregan a las existentes sin duplicar ids.
+
+        :param mes: Mes en formato YYYY-MM.
+        :param filas: Iterable de diccionarios de actividades de ese mes.
+        :return: Número de filas del segmento.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        segmentos = dict(self.manifiesto())
+        nombre = f"{mes}.jsonl.gz"
+        ruta = os.path.join(self.directorio, nombre)
+
+        if mes in segmentos:
+            # Actividades registradas tarde para un mes ya archivado: se combinan
+            primero = date.fromisoformat(f"{mes}-01")
+            existentes = list(self.leer(primero, _mes_siguiente(primero) - timedelta(days=1)))
+            filas = list(combinar(sorted(filas, key=_clave_orden), existentes))
+
+        temporal = ruta + ".tmp"
+        total = 0
+        with open(temporal, "wb") as crudo:
+            with gzip.open(crudo, "wt", encoding="utf-8") as f:
+                for fila in filas:
+                    f.write(json.dumps(dict(fila), ensure_ascii=False, default=str) + "\n")
+                    total += 1
+            crudo.flush()
+            os.fsync(crudo.fileno())
+        if not total:
+            os.remove(temporal)
+            return 0
+        os.replace(temporal, ruta)
+
+        segmentos[mes] = {"archivo": nombre, "filas": total}
+        self._guardar_manifiesto(segmentos)
+        return total
+
+
+_archivos = {}
+
+
+def obtener_archivo(nombre):
+    """Devuelve el archivo frío de una base ("orm" o "postgres"), creándolo en el primer uso."""
+    if nombre not in _archivos:
+        _archivos[nombre] = ArchivoFrio(os.path.join(DIRECTORIO_ARCHIVO, nombre))
+    return _archivos[nombre]
+
+
+def meses_a_archivar(mas_antigua, horizonte_dias=HORIZONTE_DIAS, hoy=None):
+    """
+    Devuelve los primeros días de los meses completos anteriores al horizonte.
+
+    :param mas_antigua: Fecha de la actividad más antigua de la tabla caliente, o None.
+    """
+    if mas_antigua is None:
+        return []
+    corte = ((hoy or date.today()) - timedelta(days=horizonte_dias)).replace(day=1)
+    mes, meses = mas_antigua.replace(day=1), []
+    while mes < corte:
+        meses.append(mes)
+        mes = _mes_siguiente(mes)
+    return meses
+
+
+def archivar_orm(horizonte_dias=HORIZONTE_DIAS, hoy=None):
+    """
+    Mueve al archivo frío las actividades de la base SQLAlchemy anteriores al horizonte.
+    Cada mes se escribe y sincroniza a disco antes de borrar de la tabla las
+    actividades escritas.
+
+    :return: Diccionario {mes: filas archivadas}.
+    """
+    from sqlalchemy import func
+    from src.model.actividad_record import CAMPOS
+    from src.model.orm_model import ActividadORM, Session
+
+    archivo = obtener_archivo("orm")
+    session = Session()
+    archivados = {}
+    try:
+        mas_antigua = session.query(func.min(ActividadORM.fecha)).scalar()
+        for primero in meses_a_archivar(mas_antigua, horizonte_dias, hoy):
+            siguiente = _mes_siguiente(primero)
+            rango = (ActividadORM.fecha >= primero, ActividadORM.fecha < siguiente)
+            if session.query(ActividadORM.id_actividad).filter(*rango).first() is None:
+                continue
+            columnas = CAMPOS + ("fecha_hora",)
+            filas = (
+                dict(zip(columnas, fila)) for fila in
+                session.query(*[getattr(ActividadORM, c) for c in columnas])
+                .filter(*rango)
+                .order_by(ActividadORM.fecha, ActividadORM.id_actividad)
+                .yield_per(1000)
+            )
+            ids = []
+            total = archivo.escribir_mes(primero.strftime("%Y-%m"), _anotar_ids(filas, ids))
+            for inicio in range(0, len(ids), _LOTE_BORRADO):
+                lote = ids[inicio:inicio + _LOTE_BORRADO]
+                session.query(ActividadORM).filter(ActividadORM.id_actividad.in_(lote)).delete(
+                    synchronize_session=False
+                )
+            session.commit()
+            archivados[primero.strftime("%Y-%m")] = total
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return archivados
+
+
+def archivar_postgres(horizonte_dias=HORIZONTE_DIAS, hoy=None):
+    """
+    Mueve al archivo frío las actividades de PostgreSQL anteriores al horizonte. Si el
+    mes tiene partición propia, se bloquea contra escrituras mientras se copia y se
+    elimina (operación de catálogo) en la misma transacción; si no, se borran las filas
+    copiadas.
+
+    :return: Diccionario {mes: filas archivadas}.
+    """
+    from src.model import database
+    from src.model.particiones import TABLA, desprender_particion, nombre_particion
+
+    archivo = obtener_archivo("postgres")
+    consultas = database.Database()
+    mas_antigua = consultas.fetch_query(f"SELECT min(fecha) AS fecha FROM {TABLA};")[0]["fecha"]
+    archivados = {}
+    for primero in meses_a_archivar(mas_antigua, horizonte_dias, hoy):
+        siguiente = _mes_siguiente(primero)
+        hay_filas = consultas.fetch_query(
+            f"SELECT EXISTS (SELECT 1 FROM {TABLA} WHERE fecha >= %s AND fecha < %s) AS hay;",
+            (primero, siguiente),
+        )[0]["hay"]
+        if not hay_filas:
+            continue
+        particion = nombre_particion(primero.year, primero.month)
+        ids = []
+        with database.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (particion,))
+                propia = cur.fetchone()[0]
+                if propia:
+                    # Las lecturas siguen; las escrituras en el mes esperan a que se elimine
+                    cur.execute(f"LOCK TABLE {particion} IN SHARE MODE;")
+            with database.cursor_dict(conn, "archivar_mes") as cur:
+                cur.itersize = 2000
+                cur.execute(
+                    f"SELECT * FROM {TABLA} WHERE fecha >= %s AND fecha < %s ORDER BY fecha, id_actividad;",
+                    (primero, siguiente),
+                )
+                total = archivo.escribir_mes(primero.strftime("%Y-%m"), _anotar_ids(cur, ids))
+            if propia:
+                desprender_particion(primero.year, primero.month, eliminar=True, conn=conn)
+            else:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"DELETE FROM {TABLA} WHERE fecha >= %s AND fecha < %s AND id_actividad = ANY(%s);",
+                        (primero, siguiente, ids),
+                    )
+            conn.commit()
+        database.marcar_escritura()
+        archivados[primero.strftime("%Y-%m")] = total
+    return archivados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mueve las actividades antiguas al archivo frío.")
+    parser.add_argument("--horizonte-dias", type=int, default=HORIZONTE_DIAS)
+    parser.add_argument("--postgres", action="store_true", help="archivar PostgreSQL en lugar de SQLAlchemy")
+    args = parser.parse_args()
+
+    archivar = archivar_postgres if args.postgres else archivar_orm
+    archivados = archivar(args.horizonte_dias)
+    for mes, filas in archivados.items():
+        print(f"{mes}: {filas} actividades archivadas")
+    if not archivados:
+        print("No hay actividades anteriores al horizonte.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,18 @@ from .errores import (
     FechaInvalidaError,
     RangoFechasInvalidoError,
     ReporteError,
-    CamposVaciosError
+    CamposVaciosError,
+    ActividadDuplicadaError
 )
 import re
-from .actividad import Actividad
+from .actividad import Actividad, validar_rango_fechas, validar_rango_horas, validar_rangos
+from . import archivado, cronologia, franjas, reportes
+from .actividad_record import ActividadRecord
+from .duplicados import huella_actividad
+
+
+# Solo letras, números, guiones, espacios y extensión de 3 o 4 letras
+PATRON_ARCHIVO_REPORTE = r"^[\w,\s-]+\.[A-Za-z]{3,4}$"
 
 
 class Bitacora:
@@ -22,7 +30,7 @@ class Bitacora:
         """
         self.db = db
 
-    def agregar_entrada(self, actividad):
+    def agregar_entrada(self, actividad, idempotente=False):
         """
         Agrega una entrada de actividad a la bitácora.
 
@@ -33,9 +41,15 @@ class Bitacora:
             - anexos
             - responsable
             - clima
+            - id_bitacora (opcional)
+        :param idempotente: Si es True, una entrada ya registrada se ignora en lugar de fallar.
+        :return: id_actividad de la entrada, o None si ya estaba registrada (idempotente).
         :raises CamposVaciosError: Si alguno de los campos obligatorios está vacío.
         :raises FechaInvalidaError: Si la fecha tiene formato incorrecto.
+        :raises ActividadDuplicadaError: Si la entrada ya existe y no es idempotente.
         """
+        from src.model.database import insertar_entrada
+
         campos_requeridos = [actividad.fecha, actividad.supervisor, actividad.descripcion, actividad.responsable]
         if not all(campos_requeridos):
             raise CamposVaciosError()
@@ -45,26 +59,30 @@ class Bitacora:
         except ValueError:
             raise FechaInvalidaError()
 
-        query = """
-            INSERT INTO bitacora (fecha, supervisor, descripcion, anexos, responsable, clima)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """
-        params = (
-            actividad.fecha,
-            actividad.supervisor,
-            actividad.descripcion,
-            actividad.anexos,
-            actividad.responsable,
-            actividad.clima
-        )
-        self.db.execute_query(query, params)
+        entrada = {
+            "fecha": actividad.fecha,
+            "supervisor": actividad.supervisor,
+            "descripcion": actividad.descripcion,
+            "anexos": actividad.anexos,
+            "responsable": actividad.responsable,
+            "clima": actividad.clima,
+            "id_bitacora": getattr(actividad, "id_bitacora", None),
+        }
+        entrada["huella"] = huella_actividad(entrada)
+        # La comprobación del duplicado y la inserción son una sola sentencia sobre el
+        # índice único de huella, así que dos escritores a la vez no pueden duplicarla
+        id_actividad = insertar_entrada(entrada)
+        if id_actividad is None and not idempotente:
+            raise ActividadDuplicadaError()
+        return id_actividad
 
-    def obtener_entradas(self, fecha_inicio, fecha_fin):
+    def obtener_entradas(self, fecha_inicio, fecha_fin, compacto=False):
         """
         Obtiene las entradas de la bitácora dentro de un rango de fechas.
 
         :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
         :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+        :param compacto: Si es True, devuelve ActividadRecord en lugar de diccionarios.
         :return: Lista de registros obtenidos.
         :raises FechaInvalidaError: Si alguna fecha tiene formato incorrecto o está vacía.
         :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la de fin.
@@ -83,22 +101,204 @@ class Bitacora:
 
         query = "SELECT * FROM actividades WHERE fecha BETWEEN %s AND %s"
         params = (fecha_inicio, fecha_fin)
-        return self.db.fetch_query(query, params)
+        entradas = self.db.fetch_query(query, params)
+        if compacto:
+            return [ActividadRecord.desde_fila(entrada) for entrada in entradas]
+        return entradas
+
+    def consultar_rangos(self, rangos, compacto=False, id_bitacora=None):
+        """
+        Obtiene las entradas de varios rangos de fechas con una sola consulta, como
+        Actividad.consultar_rangos: los rangos se envían como dos arreglos que unnest
+        convierte en una tabla unida con actividades.
+
+        :param rangos: Lista de tuplas (fecha_inicio, fecha_fin) en formato YYYY-MM-DD.
+        :param compacto: Si es True, devuelve ActividadRecord en lugar de diccionarios.
+        :param id_bitacora: Si se indica, solo las entradas de esa bitácora.
+        :return: Una lista de entradas por rango, en el orden de `rangos`.
+        :raises FechaInvalidaError: Si no hay rangos o alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si algún rango tiene el inicio después del fin.
+        """
+        validados = validar_rangos(rangos)
+        query = """
+            SELECT r.n AS n_rango, a.*
+            FROM unnest(%s::date[], %s::date[]) WITH ORDINALITY AS r (inicio, fin, n)
+            JOIN actividades a ON a.fecha BETWEEN r.inicio AND r.fin
+        """
+        params = ([inicio for inicio, _ in validados], [fin for _, fin in validados])
+        if id_bitacora is not None:
+            query += " WHERE a.id_bitacora = %s"
+            params += (id_bitacora,)
+        query += " ORDER BY r.n, a.fecha, a.id_actividad"
+
+        resultado = [[] for _ in validados]
+        for entrada in self.db.fetch_query(query, params):
+            resultado[entrada.pop("n_rango") - 1].append(entrada)
+
+        archivo = archivado.obtener_archivo("postgres")
+        for n, (inicio, fin) in enumerate(validados):
+            if archivo.solapa(inicio, fin):
+                archivadas = archivo.leer(inicio, fin, self._filtro_bitacora(id_bitacora))
+                resultado[n] = list(archivado.combinar(resultado[n], archivadas))
+        if compacto:
+            return [[ActividadRecord.desde_fila(entrada) for entrada in entradas] for entradas in resultado]
+        return resultado
+
+    @staticmethod
+    def _filtro(fecha_inicio, fecha_fin, id_bitacora=None):
+        """Devuelve la condición WHERE y sus parámetros para un rango y, opcionalmente, una bitácora."""
+        condicion = "fecha BETWEEN %s AND %s"
+        params = (fecha_inicio, fecha_fin)
+        if id_bitacora is not None:
+            condicion += " AND id_bitacora = %s"
+            params += (id_bitacora,)
+        return condicion, params
+
+    def iterar_entradas(self, fecha_inicio, fecha_fin, tamano_lote=2000, id_bitacora=None):
+        """
+        Genera las entradas de un rango de fechas por lotes, con un cursor del lado del
+        servidor si la base lo admite.
+
+        :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
+        :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+        :param tamano_lote: Filas que se traen de la base en cada lote.
+        :param id_bitacora: Si se indica, solo las entradas de esa bitácora.
+        :return: Iterable de filas, en orden de fecha.
+        :raises FechaInvalidaError: Si alguna fecha está vacía o no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la de fin.
+        """
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        condicion, params = self._filtro(inicio, fin, id_bitacora)
+        query = f"SELECT * FROM actividades WHERE {condicion} ORDER BY fecha, id_actividad"
+        if hasattr(self.db, "stream_query"):
+            entradas = self.db.stream_query(query, params, tamano_lote)
+        else:
+            entradas = self.db.fetch_query(query, params)
+
+        # Los meses movidos al archivo frío solo se leen si el rango los incluye
+        archivo = archivado.obtener_archivo("postgres")
+        if archivo.solapa(inicio, fin):
+            archivadas = archivo.leer(inicio, fin, self._filtro_bitacora(id_bitacora))
+            return archivado.combinar(entradas, archivadas)
+        return entradas
+
+    @staticmethod
+    def _filtro_bitacora(id_bitacora):
+        if id_bitacora is None:
+            return None
+        return lambda fila: fila.get("id_bitacora") == id_bitacora
+
+    def contar_entradas(self, fecha_inicio, fecha_fin, id_bitacora=None):
+        """
+        Cuenta las entradas de la bitácora en un rango de fechas.
+
+        :raises FechaInvalidaError: Si alguna fecha está vacía o no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la de fin.
+        """
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        condicion, params = self._filtro(inicio, fin, id_bitacora)
+        query = f"SELECT count(*) AS total FROM actividades WHERE {condicion}"
+        total = self.db.fetch_query(query, params)[0]["total"]
+        return total + archivado.obtener_archivo("postgres").contar(inicio, fin, self._filtro_bitacora(id_bitacora))
+
+    def contar_por_franja(self, fecha_inicio, fecha_fin, franja="hora", id_bitacora=None):
+        """
+        Cuenta las entradas de un rango por hora, por turno o por día, igual que
+        Actividad.contar_por_franja. El filtro por fecha descarta particiones y el de
+        fecha_hora usa el índice BRIN.
+
+        :param fecha_inicio: YYYY-MM-DD o YYYY-MM-DD HH:MM.
+        :param fecha_fin: YYYY-MM-DD (incluye todo el día) o YYYY-MM-DD HH:MM (excluye esa hora).
+        :param franja: "hora", "turno" o "dia".
+        :param id_bitacora: Si se indica, solo las entradas de esa bitácora.
+        :return: Diccionario {inicio de la franja (datetime): cantidad}, en orden cronológico.
+        """
+        franjas.validar_franja(franja)
+        desde, hasta, con_hora = validar_rango_horas(fecha_inicio, fecha_fin)
+        con_hora = con_hora or franja != "dia"
+
+        condicion, params = self._filtro(desde.date(), hasta.date(), id_bitacora)
+        if con_hora:
+            condicion += " AND fecha_hora >= %s AND fecha_hora < %s"
+            params += (desde, hasta)
+        else:
+            condicion += " AND fecha < %s"
+            params += (hasta.date(),)
+        inicio_franja = franjas.SQL_FRANJA["postgresql"][franja]
+        query = f"""
+            SELECT {inicio_franja} AS inicio, count(*) AS total
+            FROM actividades WHERE {condicion}
+            GROUP BY 1
+        """
+        conteo = {franjas.como_datetime(fila["inicio"]): fila["total"] for fila in self.db.fetch_query(query, params)}
+        franjas.contar_archivadas(archivado.obtener_archivo("postgres"), desde, hasta, franja, con_hora, conteo,
+                                  self._filtro_bitacora(id_bitacora))
+        return dict(sorted(conteo.items()))
+
+    def cronologia(self, por, valor, fecha_inicio, fecha_fin, limite=cronologia.TAMANO_PAGINA, despues=None):
+        """
+        Devuelve una página de la cronología de un responsable o de un supervisor, igual
+        que Actividad.cronologia, con un recorrido solo de índice sobre
+        idx_actividades_responsable_fecha o idx_actividades_supervisor_fecha.
+
+        :return: Tupla (entradas, cursor de la página siguiente o None).
+        """
+        from itertools import islice
+        cronologia.validar_filtro(por, valor)
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        valor = valor.strip()
+
+        condicion, params = self._filtro(inicio, fin)
+        condicion += f" AND {por} = %s"
+        params += (valor,)
+        if despues is not None:
+            condicion += " AND (fecha, id_actividad) > (%s, %s)"
+            params += tuple(despues)
+        query = f"""
+            SELECT {", ".join(cronologia.COLUMNAS)} FROM actividades
+            WHERE {condicion}
+            ORDER BY fecha, id_actividad
+            LIMIT %s
+        """
+        calientes = self.db.fetch_query(query, params + (limite,))
+        archivadas = cronologia.archivadas(archivado.obtener_archivo("postgres"), por, valor, inicio, fin, despues)
+        filas = list(islice(archivado.combinar(calientes, archivadas), limite))
+        return filas, cronologia.siguiente_cursor(filas, limite)
+
+    def huella_entradas(self, fecha_inicio, fecha_fin, id_bitacora=None):
+        """
+        Devuelve una huella de las entradas de un rango: cambia si se agrega, elimina o
+        modifica alguna. Sirve para saber si un reporte ya generado sigue vigente.
+        """
+        condicion, params = self._filtro(fecha_inicio, fecha_fin, id_bitacora)
+        query = f"""
+            SELECT count(*) AS total, max(id_actividad) AS ultimo, max(modificado) AS modificado
+            FROM actividades WHERE {condicion}
+        """
+        fila = self.db.fetch_query(query, params)[0]
+        return f"{fila['total']}|{fila['ultimo']}|{fila['modificado']}"
 
-    def generar_reporte(self, fecha_inicio, fecha_fin, archivo_pdf="reporte.pdf"):
+    def generar_reporte(self, fecha_inicio, fecha_fin, archivo_pdf="reporte.pdf", formato=None, progreso=None,
+                        id_bitacora=None):
         """
-        Genera un reporte en PDF con las entradas de la bitácora entre dos fechas.
+        Genera un reporte con las entradas de la bitácora entre dos fechas, escribiendo
+        las filas a medida que llegan de la base.
 
         :param fecha_inicio: Fecha de inicio (YYYY-MM-DD).
         :param fecha_fin: Fecha de fin (YYYY-MM-DD).
-        :param archivo_pdf: Nombre del archivo PDF a generar.
+        :param archivo_pdf: Nombre del archivo a generar.
+        :param formato: "pdf", "csv", "html", "xlsx" o "txt"; si no se indica, se usa la
+            extensión del archivo.
+        :param progreso: Función opcional que recibe el número de entradas escritas.
+        :param id_bitacora: Si se indica, el reporte incluye solo esa bitácora.
         :return: True si se generó correctamente.
         :raises FechaInvalidaError: Si alguna fecha es inválida.
         :raises RangoFechasInvalidoError: Si las fechas están invertidas.
-        :raises ReporteError: Si ocurre un error al escribir el archivo o si el nombre del archivo es inválido.
+        :raises ReporteError: Si ocurre un error al escribir el archivo, si el nombre del archivo es inválido
+            o si el formato no está soportado.
         """
         # Validar el nombre del archivo usando una expresión regular
-        if not re.match(r"^[\w,\s-]+\.[A-Za-z]{3}$", archivo_pdf):  # Solo letras, números, guiones, espacios y extensión .pdf
+        if not re.match(PATRON_ARCHIVO_REPORTE, archivo_pdf):
             raise ReporteError("El nombre del archivo es inválido.")
 
         # Validar fechas
@@ -117,16 +317,13 @@ class Bitacora:
         if inicio > fin:
             raise RangoFechasInvalidoError("La fecha de inicio no puede ser mayor que la fecha de fin.")
 
-        actividades = self.obtener_entradas(fecha_inicio, fecha_fin)
+        escritor = reportes.obtener_escritor(archivo_pdf, formato)
 
         try:
-            with open(archivo_pdf, 'w', encoding='utf-8') as f:
-                f.write("Reporte de actividades\n")
-                if not actividades:
-                    f.write("No hay actividades registradas en este rango de fechas.\n")
-                else:
-                    for actividad in actividades:
-                        f.write(f"{actividad}\n")
+            with escritor:
+                for actividad in reportes.con_progreso(
+                        self.iterar_entradas(fecha_inicio, fecha_fin, id_bitacora=id_bitacora), progreso):
+                    escritor.escribir_fila(actividad)
         except Exception as e:
             raise ReporteError(f"No se pudo generar el reporte: {str(e)}")
 
@@ -0,0 +1,324 @@
+"""
+Catálogos para los valores repetidos de las actividades.
+
+clima, estado, tipo y responsable se guardan en la tabla actividades como enteros
+pequeños (id_clima, id_estado, id_tipo, id_responsable) que apuntan a tablas de
+catálogo (climas, estados, tipos, responsables). Cada catálogo tiene en memoria un
+caché en ambos sentidos, nombre → id e id → nombre, y el tipo de columna
+ValorCatalogo traduce al escribir y al leer, así que ActividadORM sigue exponiendo
+cadenas y las consultas no necesitan joins.
+
+Los valores nuevos se agregan al catálogo antes de cada flush de la sesión, en la
+misma transacción, y hasta el commit solo los ve esa conexión: pasan al caché
+compartido al confirmarse y se olvidan si la transacción se revierte. Un valor que no
+está en el caché se busca solo, por su clave, en la conexión que se está usando; los
+que no existen se recuerdan como ausentes durante TTL_AUSENTES segundos.
+
+Para convertir una base existente (columnas de texto) se usa migrar(), que se ejecuta
+junto con las demás actualizaciones del esquema con python -m src.model.orm_model.
+"""
+
+import threading
+import time
+from itertools import chain
+
+from sqlalchemy import Integer, SmallInteger, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+# Atributo de ActividadORM → tabla de catálogo
+COLUMNAS_CATALOGO = {
+    "clima": "climas",
+    "estado": "estados",
+    "tipo": "tipos",
+    "responsable": "responsables",
+}
+
+# Segundos durante los que un valor que no está en el catálogo no se vuelve a buscar
+TTL_AUSENTES = 5.0
+
+_CLAVE_PENDIENTES = "catalogos_pendientes"
+
+# Última conexión de SQLAlchemy que ejecutó una sentencia en cada hilo: la que está
+# traduciendo parámetros o filas cuando ValorCatalogo no encuentra un valor en el caché
+_locales = threading.local()
+
+
+class Catalogo:
+    """
+    Caché bidireccional de una tabla de catálogo (id, nombre).
+    """
+
+    def __init__(self, tabla):
+        """
+        :param tabla: Nombre de la tabla de catálogo.
+        """
+        self.tabla = tabla
+        self._ids = {}
+        self._nombres = {}
+        self._ausentes = {}     # ("id" o "nombre", valor) -> time.monotonic() de vencimiento
+        self._lock = threading.Lock()
+
+    def cargar(self, conexion=None):
+        """
+        Lee el catálogo de la base y lo agrega al caché.
+
+        :param conexion: Connection de SQLAlchemy; por defecto una del engine.
+        """
+        if conexion is None:
+            from src.model.orm_model import get_engine
+            with get_engine().connect() as conexion:
+                return self.cargar(conexion)
+        filas = conexion.execute(text(f"SELECT id, nombre FROM {self.tabla}")).all()
+        self.agregar(filas)
+
+    def agregar(self, filas):
+        """
+        Agrega al caché valores ya confirmados en la base.
+
+        :param filas: Iterable de pares (id, nombre).
+        """
+        with self._lock:
+            for id_valor, nombre in filas:
+                self._ids[nombre] = id_valor
+                self._nombres[id_valor] = nombre
+                self._ausentes.pop(("id", id_valor), None)
+                self._ausentes.pop(("nombre", nombre), None)
+
+    def invalidar(self):
+        """Descarta el caché; se vuelve a leer en el siguiente uso."""
+        with self._lock:
+            self._ids = {}
+            self._nombres = {}
+            self._ausentes = {}
+
+    def id_de(self, nombre, conexion=None):
+        """
+        Devuelve el id de un nombre, o None si el catálogo no lo tiene (una consulta
+        por un valor desconocido no encuentra filas).
+
+        :param conexion: Connection de SQLAlchemy donde buscarlo si no está en el caché;
+            por defecto la que está ejecutando en este hilo.
+        """
+        if nombre is None:
+            return None
+        id_valor = self._ids.get(nombre)
+        if id_valor is None:
+            # Pudo agregarlo otro proceso, o esta transacción sin confirmar
+            fila = self._buscar("nombre", nombre, conexion)
+            id_valor = fila[0] if fila is not None else None
+        return id_valor
+
+    def nombre_de(self, id_valor, conexion=None):
+        """
+        Devuelve el nombre de un id del catálogo.
+
+        :param conexion: Como en id_de.
+        """
+        if id_valor is None:
+            return None
+        nombre = self._nombres.get(id_valor)
+        if nombre is None:
+            fila = self._buscar("id", id_valor, conexion)
+            nombre = fila[1] if fila is not None else None
+        return nombre
+
+    def _buscar(self, columna, valor, conexion):
+        conexion = conexion or _conexion_en_uso()
+        pendientes = conexion.info.get(_CLAVE_PENDIENTES, {}).get(self.tabla, {}) if conexion is not None else {}
+        for nombre, id_valor in pendientes.items():
+            if (columna == "nombre" and nombre == valor) or (columna == "id" and id_valor == valor):
+                return id_valor, nombre
+        clave = (columna, valor)
+        if time.monotonic() < self._ausentes.get(clave, 0):
+            return None
+        consulta = text(f"SELECT id, nombre FROM {self.tabla} WHERE {columna} = :valor")
+        if conexion is None:
+            from src.model.orm_model import get_engine
+            with get_engine().connect() as conexion:
+                fila = conexion.execute(consulta, {"valor": valor}).first()
+        else:
+            fila = conexion.execute(consulta, {"valor": valor}).first()
+        if fila is None:
+            with self._lock:
+                self._ausentes[clave] = time.monotonic() + TTL_AUSENTES
+            return None
+        # Una fila sin confirmar de esta conexión está en pendientes: la encontrada es de todos
+        self.agregar([tuple(fila)])
+        return tuple(fila)
+
+    def asegurar(self, nombre, conexion):
+        """
+        Devuelve el id de un nombre, agregándolo al catálogo dentro de la transacción
+        de `conexion` si todavía no existe.
+        """
+        id_valor = self._ids.get(nombre)
+        if id_valor is not None:
+            return id_valor
+        pendientes = conexion.info.setdefault(_CLAVE_PENDIENTES, {}).setdefault(self.tabla, {})
+        if nombre in pendientes:
+            return pendientes[nombre]
+        insertado = conexion.execute(
+            text(f"INSERT INTO {self.tabla} (nombre) VALUES (:nombre) ON CONFLICT (nombre) DO NOTHING"),
+            {"nombre": nombre},
+        ).rowcount
+        id_valor = conexion.execute(
+            text(f"SELECT id FROM {self.tabla} WHERE nombre = :nombre"), {"nombre": nombre}
+        ).scalar_one()
+        if insertado:
+            # Hasta el commit el valor solo existe en esta transacción
+            pendientes[nombre] = id_valor
+        else:
+            self.agregar([(id_valor, nombre)])
+        return id_valor
+
+
+_catalogos = {tabla: Catalogo(tabla) for tabla in COLUMNAS_CATALOGO.values()}
+
+
+def _conexion_en_uso():
+    conexion = getattr(_locales, "conexion", None)
+    if conexion is None or conexion.closed or conexion.invalidated:
+        return None
+    return conexion
+
+
+def obtener_catalogo(tabla):
+    """Devuelve el catálogo (con su caché) de una tabla."""
+    return _catalogos[tabla]
+
+
+def asegurar_valores(filas, conexion):
+    """
+    Agrega a los catálogos los valores de una carga masiva que no pasa por el flush de
+    la sesión (por ejemplo, insert(ActividadORM) con una lista de diccionarios).
+
+    :param filas: Iterable de diccionarios con las claves de COLUMNAS_CATALOGO.
+    :param conexion: Connection de SQLAlchemy de la carga.
+    """
+    valores = {campo: set() for campo in COLUMNAS_CATALOGO}
+    for fila in filas:
+        for campo, distintos in valores.items():
+            if fila.get(campo) is not None:
+                distintos.add(fila[campo])
+    for campo, distintos in valores.items():
+        catalogo = obtener_catalogo(COLUMNAS_CATALOGO[campo])
+        for nombre in distintos:
+            catalogo.asegurar(nombre, conexion)
+
+
+class ValorCatalogo(TypeDecorator):
+    """
+    Columna entera que la aplicación ve como el nombre de su catálogo.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, tabla, entero=SmallInteger):
+        """
+        :param tabla: Tabla de catálogo a la que apunta la columna.
+        :param entero: Tipo entero de la columna en la base.
+        """
+        super().__init__()
+        self.tabla = tabla
+        self.entero = entero
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(self.entero())
+
+    def process_bind_param(self, valor, dialect):
+        if valor is None or isinstance(valor, int):
+            return valor
+        return obtener_catalogo(self.tabla).id_de(valor)
+
+    def process_result_value(self, valor, dialect):
+        return obtener_catalogo(self.tabla).nombre_de(valor)
+
+
+@event.listens_for(Session, "before_flush")
+def _agregar_valores_nuevos(session, contexto, instancias):
+    from src.model.orm_model import ActividadORM
+
+    actividades = [o for o in chain(session.new, session.dirty) if isinstance(o, ActividadORM)]
+    if not actividades:
+        return
+    conexion = session.connection()
+    for actividad in actividades:
+        for campo, tabla in COLUMNAS_CATALOGO.items():
+            valor = getattr(actividad, campo)
+            if valor is not None:
+                obtener_catalogo(tabla).asegurar(valor, conexion)
+
+
+@event.listens_for(Engine, "before_execute")
+def _recordar_conexion(conexion, *args):
+    _locales.conexion = conexion
+
+
+@event.listens_for(Engine, "commit")
+def _confirmar_pendientes(conexion):
+    for tabla, pendientes in conexion.info.pop(_CLAVE_PENDIENTES, {}).items():
+        obtener_catalogo(tabla).agregar((id_valor, nombre) for nombre, id_valor in pendientes.items())
+
+
+@event.listens_for(Engine, "rollback")
+def _descartar_pendientes(conexion):
+    # Solo la transacción completa: la aplicación no revierte savepoints con valores
+    # nuevos, y las pruebas revierten al final la transacción que los contiene.
+    conexion.info.pop(_CLAVE_PENDIENTES, None)
+
+
+# ---- Migración de columnas de texto a catálogos ----
+
+def necesita_migracion(conexion):
+    """Indica si la tabla actividades todavía guarda clima, estado, tipo y responsable como texto."""
+    inspector = inspect(conexion)
+    if not inspector.has_table("actividades"):
+        return False
+    columnas = {columna["name"] for columna in inspector.get_columns("actividades")}
+    return "clima" in columnas and "id_clima" not in columnas
+
+
+def migrar(engine):
+    """
+    Convierte una tabla actividades con columnas de texto al esquema con catálogos:
+    llena los catálogos con los valores distintos, reconstruye la tabla con los ids y
+    elimina la anterior, en una transacción. En SQLite compacta el archivo al final.
+
+    :param engine: Engine de la base a migrar.
+    :return: True si se migró; False si ya estaba migrada.
+    """
+    from src.model.orm_model import ActividadORM, Base
+
+    with engine.begin() as conexion:
+        if not necesita_migracion(conexion):
+            return False
+        for tabla in COLUMNAS_CATALOGO.values():
+            Base.metadata.tables[tabla].create(conexion, checkfirst=True)
+            obtener_catalogo(tabla).invalidar()
+        for campo, tabla in COLUMNAS_CATALOGO.items():
+            conexion.execute(text(
+                f"INSERT INTO {tabla} (nombre) SELECT DISTINCT {campo} FROM actividades "
+                f"WHERE {campo} IS NOT NULL ON CONFLICT (nombre) DO NOTHING"
+            ))
+
+        conexion.execute(text("ALTER TABLE actividades RENAME TO actividades_texto"))
+        ActividadORM.__table__.create(conexion)
+        uniones = " ".join(
+            f"LEFT JOIN {tabla} ON {tabla}.nombre = a.{campo}" for campo, tabla in COLUMNAS_CATALOGO.items()
+        )
+        conexion.execute(text(f"""
+            INSERT INTO actividades (id_actividad, fecha, descripcion, anexos, supervisor,
+                                     id_clima, id_estado, id_tipo, id_responsable)
+            SELECT a.id_actividad, a.fecha, a.descripcion, a.anexos, a.supervisor,
+                   climas.id, estados.id, tipos.id, responsables.id
+            FROM actividades_texto a {uniones}
+        """))
+        conexion.execute(text("DROP TABLE actividades_texto"))
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+            conexion.execute(text("VACUUM"))
+    return True
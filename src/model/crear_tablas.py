@@ -1,17 +1,7 @@
-import psycopg2
-
-conn = psycopg2.connect(
-    dbname="bitacorina_db",
-    user="postgres",
-    password="maxelo31hd",
-    host="localhost",
-    port="5432"
-)
-
-cur = conn.cursor()
+from src.model.particiones import SENTENCIAS_TABLA_PARTICIONADA, asegurar_particiones_futuras
 
 # Lista de sentencias SQL
-sentencias_sql = [
+SENTENCIAS_ESQUEMA = [
     """
     CREATE TABLE usuarios (
         id_usuario SERIAL PRIMARY KEY,
@@ -32,31 +22,33 @@ sentencias_sql = [
             REFERENCES usuarios(id_usuario)
             ON DELETE CASCADE
     );
-    """,
-    """
-    CREATE TABLE actividades (
-        id_actividad SERIAL PRIMARY KEY,
-        id_bitacora INT NOT NULL,
-        fecha DATE NOT NULL,
-        descripcion TEXT NOT NULL,
-        anexos TEXT,
-        responsable VARCHAR(100),
-        clima VARCHAR(50),
-        estado VARCHAR(50),
-        tipo VARCHAR(50),
-        CONSTRAINT fk_actividades_bitacora FOREIGN KEY (id_bitacora)
-            REFERENCES bitacoras(id_bitacora)
-            ON DELETE CASCADE
-    );
     """
 ]
 
-# Ejecutar cada sentencia por separado
-for sentencia in sentencias_sql:
-    cur.execute(sentencia)
+# actividades se crea particionada por mes sobre fecha
+SENTENCIAS_ESQUEMA += SENTENCIAS_TABLA_PARTICIONADA
+
+
+def crear_tablas(conn):
+    """
+    Crea las tablas en la conexión indicada (en el esquema de su search_path), sin
+    confirmar la transacción. Las pruebas lo usan para armar un esquema por proceso.
+    """
+    with conn.cursor() as cur:
+        # Ejecutar cada sentencia por separado
+        for sentencia in SENTENCIAS_ESQUEMA:
+            cur.execute(sentencia)
+
+
+if __name__ == "__main__":
+    from src.model.database import conectar
+
+    conn = conectar()
+    crear_tablas(conn)
+    conn.commit()
+    conn.close()
 
-conn.commit()
-cur.close()
-conn.close()
+    # Particiones del mes actual y de los próximos meses
+    asegurar_particiones_futuras()
 
-print("Tablas creadas correctamente.")
+    print("Tablas creadas correctamente.")
@@ -0,0 +1,61 @@
+"""
+Cronología de las actividades de un responsable o de un supervisor.
+
+Las consultas filtran por la persona y el rango de fechas en la base, en lugar de traer
+todo el rango y filtrar en Python, y se sirven desde índices de cobertura
+(persona, fecha, id_actividad) que además contienen las columnas del listado: la base
+recorre solo la porción del índice de esa persona, en orden, sin leer la tabla. En
+PostgreSQL las columnas del listado van en INCLUDE; SQLite no lo admite y las agrega al
+final de la clave.
+
+La paginación es por conjunto de claves (keyset): cada página devuelve un cursor
+(fecha, id_actividad) de su última fila y la siguiente empieza después de él, así que
+pedir la página 100 cuesta lo mismo que la primera.
+"""
+
+from src.model.franjas import como_datetime
+
+FILTROS = ("responsable", "supervisor")
+COLUMNAS = ("id_actividad", "fecha", "fecha_hora", "supervisor", "responsable", "descripcion", "estado", "tipo")
+TAMANO_PAGINA = 50
+
+SENTENCIAS_POSTGRES = [
+    f"""
+    CREATE INDEX IF NOT EXISTS idx_actividades_{por}_fecha ON actividades ({por}, fecha, id_actividad)
+        INCLUDE ({", ".join(c for c in COLUMNAS if c not in (por, "fecha", "id_actividad"))});
+    """
+    for por in FILTROS
+]
+
+
+def validar_filtro(por, valor):
+    """
+    :raises ValueError: Si no se filtra por responsable o supervisor, o el nombre está vacío.
+    """
+    if por not in FILTROS:
+        raise ValueError(f"No se puede filtrar por {por}. Use {' o '.join(FILTROS)}.")
+    if not (valor or "").strip():
+        raise ValueError(f"Indique el {por}.")
+
+
+def siguiente_cursor(filas, limite):
+    """Devuelve el cursor de la página siguiente, o None si esta fue la última."""
+    if len(filas) < limite:
+        return None
+    return filas[-1]["fecha"], filas[-1]["id_actividad"]
+
+
+def archivadas(archivo, por, valor, inicio, fin, despues=None):
+    """
+    Genera las actividades archivadas de una persona, en orden de (fecha, id_actividad),
+    con las columnas del listado.
+
+    :param despues: Cursor (fecha, id_actividad); solo las posteriores a él.
+    """
+    if not archivo.solapa(inicio, fin):
+        return
+    for fila in archivo.leer(inicio, fin, lambda f: f.get(por) == valor):
+        if despues is None or (fila["fecha"], fila["id_actividad"]) > despues:
+            fila = {columna: fila.get(columna) for columna in COLUMNAS}
+            fila["fecha_hora"] = como_datetime(fila["fecha_hora"])
+            yield fila
@@ -1,36 +1,197 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import itertools
 from datetime import datetime
 
+from src.model.actividad_record import ActividadRecord
+from src.model import preparadas, trazas
+from src.model.notificaciones import notificar_postgres
+from src.model.replicas import EnrutadorConexiones
+
 # Configuración de conexión a PostgreSQL
 DB_HOST = "localhost"
 DB_PORT = "5432"
 DB_NAME = "bitacorina_db"
 DB_USER = "postgres"
 DB_PASSWORD = "maxelo31hd"
+# Segundos máximos para abrir una conexión: si el servidor no responde, registrar y el
+# reproductor del registro durable fallan pronto en lugar de quedar esperando
+DB_TIEMPO_CONEXION = 3
 
-def get_connection():
+# Réplicas de lectura, por ejemplo [{"host": "localhost", "port": "5433"}].
+# Los parámetros que falten se toman del primario. Vacía: todo va al primario.
+DB_REPLICAS = []
+
+_enrutador = None
+_canal_durable = None
+_conexion_compartida = None
+_savepoints = itertools.count(1)
+
+
+class ConexionAnidada:
+    """
+    Envoltorio de una conexión abierta que se entrega en lugar de una conexión nueva
+    (ver usar_conexion). Cada envoltorio trabaja en su propio savepoint: commit lo
+    libera, rollback lo revierte y close no cierra la conexión, así que el código que
+    hace commit queda dentro de la transacción externa.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._savepoint = f"anidada_{next(_savepoints)}"
+        self._abierto = False
+        self._abrir()
+
+    def _ejecutar(self, sentencia):
+        with self._conn.cursor() as cur:
+            cur.execute(sentencia)
+
+    def _abrir(self):
+        self._ejecutar(f"SAVEPOINT {self._savepoint};")
+        self._abierto = True
+
+    def commit(self):
+        if self._abierto:
+            self._ejecutar(f"RELEASE SAVEPOINT {self._savepoint};")
+            self._abierto = False
+
+    def rollback(self):
+        if self._abierto:
+            self._ejecutar(f"ROLLBACK TO SAVEPOINT {self._savepoint};")
+            self._ejecutar(f"RELEASE SAVEPOINT {self._savepoint};")
+            self._abierto = False
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        if not self._abierto:
+            self._abrir()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        # Igual que una conexión de psycopg2: commit si no hubo error, rollback si lo hubo
+        if tipo is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+def usar_conexion(conn):
+    """
+    Hace que get_connection y get_read_connection entreguen una conexión ya abierta,
+    envuelta en ConexionAnidada. Las pruebas la usan para correr cada caso dentro de una
+    transacción que se revierte al terminar.
+
+    :param conn: Conexión de psycopg2, o None para volver a abrir conexiones nuevas.
+    """
+    global _conexion_compartida
+    _conexion_compartida = conn
+
+
+def conectar(**opciones):
+    """Abre una conexión nueva al primario con los parámetros del módulo."""
+    import psycopg2  # se importa en la primera conexión para no retrasar el arranque
+    opciones.setdefault("connect_timeout", DB_TIEMPO_CONEXION)
     return psycopg2.connect(
         host=DB_HOST,
         port=DB_PORT,
         dbname=DB_NAME,
         user=DB_USER,
-        password=DB_PASSWORD
+        password=DB_PASSWORD,
+        **opciones,
+        **trazas.opciones_postgres()
     )
 
+def get_connection():
+    if _conexion_compartida is not None:
+        return ConexionAnidada(_conexion_compartida)
+    return conectar()
+
+def cursor_dict(conn, nombre=None):
+    """
+    Abre un cursor que devuelve cada fila como diccionario.
+
+    :param nombre: Si se indica, el cursor es del lado del servidor y trae las filas por lotes.
+    """
+    from psycopg2.extras import RealDictCursor
+    return conn.cursor(name=nombre, cursor_factory=RealDictCursor)
+
+def obtener_enrutador():
+    """Devuelve el enrutador entre primario y réplicas, creándolo en el primer uso."""
+    global _enrutador
+    if _enrutador is None:
+        _enrutador = EnrutadorConexiones(
+            {"host": DB_HOST, "port": DB_PORT, "dbname": DB_NAME, "user": DB_USER, "password": DB_PASSWORD},
+            DB_REPLICAS,
+            tiempo_conexion=DB_TIEMPO_CONEXION,
+        )
+    return _enrutador
+
+def vaciar_pendientes():
+    """Aplica las actividades que este proceso dejó en el registro durable, antes de leer."""
+    if _canal_durable is not None:
+        _canal_durable.vaciar()
+
+def get_read_connection():
+    """Conexión para consultas: una réplica sana o el primario tras una escritura reciente."""
+    vaciar_pendientes()
+    if _conexion_compartida is not None:
+        return ConexionAnidada(_conexion_compartida)
+    return obtener_enrutador().conexion_lectura()
+
+def conexion_frecuente(lectura=True):
+    """
+    Conexión persistente del hilo para las consultas frecuentes, que se ejecutan como
+    sentencias preparadas (ver preparadas.py). No se debe cerrar.
+
+    :param lectura: Si es False, la conexión es al primario.
+    """
+    if lectura:
+        vaciar_pendientes()
+    if _conexion_compartida is not None:
+        return ConexionAnidada(_conexion_compartida)
+    if lectura:
+        return obtener_enrutador().conexion_lectura(persistente=True)
+    return obtener_enrutador().conexion_escritura(persistente=True)
+
+def marcar_escritura():
+    """Registra una escritura para que las lecturas siguientes vean el cambio."""
+    obtener_enrutador().registrar_escritura()
+
 # Clase para operaciones genéricas en base de datos
 class Database:
+    # Las consultas registradas en preparadas.py se ejecutan preparadas, en la conexión persistente
     def execute_query(self, query, params=None):
-        with get_connection() as conn:
+        frecuente = preparadas.nombre_de(query) is not None
+        with conexion_frecuente(lectura=False) if frecuente else get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(query, params or ())
+                preparadas.ejecutar_consulta(cur, query, params)
                 conn.commit()
+        marcar_escritura()
 
     def fetch_query(self, query, params=None):
-        with get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, params or ())
+        frecuente = preparadas.nombre_de(query) is not None
+        with conexion_frecuente() if frecuente else get_read_connection() as conn:
+            with cursor_dict(conn) as cur:
+                preparadas.ejecutar_consulta(cur, query, params)
                 return cur.fetchall()
+
+    def stream_query(self, query, params=None, tamano_lote=2000):
+        """
+        Genera las filas de una consulta con un cursor del lado del servidor, trayendo
+        `tamano_lote` filas por viaje, sin cargar el resultado completo en memoria.
+        """
+        conn = get_read_connection()
+        try:
+            with cursor_dict(conn, "consulta_streaming") as cur:
+                cur.itersize = tamano_lote
+                cur.execute(query, params or ())
+                yield from cur
+            conn.commit()
+        finally:
+            conn.close()
     
     def clear_tables(self):
         with get_connection() as conn:
@@ -40,16 +201,15 @@ class Database:
                 RESTART IDENTITY CASCADE;
             """)
             conn.commit()
+        marcar_escritura()
 
 
 
 # Funciones específicas para gestión de usuarios
 def obtener_usuario_por_correo(correo):
-    with get_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT * FROM usuarios WHERE correo = %s;
-            """, (correo,))
+    with conexion_frecuente() as conn:
+        with cursor_dict(conn) as cur:
+            preparadas.ejecutar(cur, preparadas.USUARIO_POR_CORREO, (correo,))
             return cur.fetchone()
 
 def crear_usuario(nombre, correo, contrasena):
@@ -60,11 +220,13 @@ def crear_usuario(nombre, correo, contrasena):
                 VALUES (%s, %s, %s)
                 RETURNING id;
             """, (nombre, correo, contrasena))
-            return cur.fetchone()[0]
+            id_usuario = cur.fetchone()[0]
+    marcar_escritura()
+    return id_usuario
 
 def autenticar_usuario(correo, contrasena):
-    with get_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with get_read_connection() as conn:
+        with cursor_dict(conn) as cur:
             cur.execute("""
                 SELECT * FROM usuarios
                 WHERE correo = %s AND contrasena = %s;
@@ -77,6 +239,7 @@ def actualizar_contrasena(correo, nueva_contrasena):
             cur.execute("""
                 UPDATE usuarios SET contrasena = %s WHERE correo = %s;
             """, (nueva_contrasena, correo))
+    marcar_escritura()
 
 # Funciones específicas para actividades
 def registrar_actividad(usuario_id, descripcion):
@@ -86,10 +249,11 @@ def registrar_actividad(usuario_id, descripcion):
                 INSERT INTO actividades (usuario_id, descripcion, fecha)
                 VALUES (%s, %s, %s);
             """, (usuario_id, descripcion, datetime.now()))
+    marcar_escritura()
 
 def obtener_actividades(usuario_id):
-    with get_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with get_read_connection() as conn:
+        with cursor_dict(conn) as cur:
             cur.execute("""
                 SELECT * FROM actividades
                 WHERE usuario_id = %s
@@ -105,10 +269,11 @@ def registrar_transaccion(usuario_id, cantidad, categoria, tipo):
                 INSERT INTO transacciones (usuario_id, cantidad, categoria, tipo, fecha)
                 VALUES (%s, %s, %s, %s, %s);
             """, (usuario_id, cantidad, categoria, tipo, datetime.now()))
+    marcar_escritura()
 
 def obtener_transacciones(usuario_id):
-    with get_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with get_read_connection() as conn:
+        with cursor_dict(conn) as cur:
             cur.execute("""
                 SELECT * FROM transacciones
                 WHERE usuario_id = %s
@@ -116,22 +281,139 @@ def obtener_transacciones(usuario_id):
             """, (usuario_id,))
             return cur.fetchall()
 
-def insertar_actividad(fecha, supervisor, descripcion, anexos, responsable, clima):
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO actividades (fecha, supervisor, descripcion, anexos, responsable, clima)
-                VALUES (%s, %s, %s, %s, %s, %s);
-            """, (fecha, supervisor, descripcion, anexos, responsable, clima))
+def insertar_actividad(fecha, supervisor, descripcion, anexos, responsable, clima, fecha_hora=None):
+    """
+    Registra una actividad. Se guarda en el registro durable local y la inserta el hilo
+    reproductor, de modo que no espera a PostgreSQL ni se pierde si no está disponible.
+
+    :param fecha_hora: Fecha y hora de la actividad (datetime o texto ISO), si se conoce.
+    :return: El registro guardado, con el uuid de la actividad.
+    """
+    return obtener_canal_durable().escribir({
+        "fecha": str(fecha), "supervisor": supervisor, "descripcion": descripcion,
+        "anexos": anexos, "responsable": responsable, "clima": clima,
+        "fecha_hora": str(fecha_hora) if fecha_hora else None,
+    })
+
+def obtener_canal_durable():
+    """Devuelve el canal del registro durable hacia PostgreSQL, creándolo en el primer uso."""
+    global _canal_durable
+    if _canal_durable is None:
+        import psycopg2
+        from src.model.registro_durable import Canal
+        _canal_durable = Canal(
+            "postgres", insertar_actividades_lote,
+            errores_transitorios=(psycopg2.OperationalError, psycopg2.InterfaceError),
+        )
+    return _canal_durable
+
+def insertar_actividades_lote(actividades):
+    """
+    Inserta un lote de actividades identificadas por uuid. Es idempotente: reenviar un
+    lote ya aplicado (por ejemplo, tras perder la respuesta) no duplica actividades, y
+    una actividad con la huella de otra ya registrada (la misma actividad enviada dos
+    veces con distinto uuid) se asocia a la existente.
+
+    :param actividades: Lista de diccionarios con uuid, fecha (YYYY-MM-DD), supervisor,
+        descripcion, anexos, responsable y clima; huella y fecha_hora son opcionales.
+    :return: Diccionario {uuid: id_actividad} con todas las actividades del lote.
+    """
+    from src.model.duplicados import huella_actividad
+    from src.model.particiones import asegurar_particion
+    for mes in {a["fecha"][:7] for a in actividades}:
+        asegurar_particion(f"{mes}-01")
+    huellas = {a["uuid"]: a.get("huella") or huella_actividad(a) for a in actividades}
+    columnas = [
+        [a["uuid"] for a in actividades],
+        [a["fecha"] for a in actividades],
+        [a.get("fecha_hora") for a in actividades],
+    ] + [[a[campo] for a in actividades] for campo in ("supervisor", "descripcion", "anexos", "responsable", "clima")]
+    columnas.append([huellas[a["uuid"]] for a in actividades])
+    with conexion_frecuente(lectura=False) as conn:
+        with cursor_dict(conn) as cur:
+            # Sin destino: se omite el conflicto con el índice de uuid o con el de huella
+            preparadas.ejecutar(cur, preparadas.INSERTAR_ACTIVIDADES, columnas)
+            for fila in cur.fetchall():
+                notificar_postgres(cur, fila)
+            preparadas.ejecutar(cur, preparadas.IDS_POR_UUID, (columnas[0],))
+            ids = {fila["uuid"]: fila["id_actividad"] for fila in cur.fetchall()}
+            duplicadas = [clave for clave in huellas if clave not in ids]
+            if duplicadas:
+                cur.execute("""
+                    SELECT huella, id_actividad FROM actividades WHERE huella = ANY(%s);
+                """, ([huellas[clave] for clave in duplicadas],))
+                por_huella = {fila["huella"]: fila["id_actividad"] for fila in cur.fetchall()}
+                ids.update({clave: por_huella[huellas[clave]] for clave in duplicadas})
             conn.commit()
+    marcar_escritura()
+    return ids
 
-def obtener_actividades_por_rango(fecha_inicio, fecha_fin):
+def insertar_entrada(entrada):
+    """
+    Inserta una entrada de bitácora en actividades, salvo que ya exista otra con la
+    misma huella (índice único duplicados.INDICE_POSTGRES).
+
+    :param entrada: Diccionario con fecha, supervisor, descripcion, anexos, responsable,
+        clima, id_bitacora y huella.
+    :return: id_actividad de la entrada insertada, o None si ya existía.
+    """
+    from src.model.particiones import asegurar_particion
+    asegurar_particion(entrada["fecha"])
     with get_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with cursor_dict(conn) as cur:
             cur.execute("""
-                SELECT * FROM actividades
-                WHERE fecha BETWEEN %s AND %s
-                ORDER BY fecha;
-            """, (fecha_inicio, fecha_fin))
+                INSERT INTO actividades (fecha, supervisor, descripcion, anexos, responsable, clima,
+                                         id_bitacora, huella)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (huella, fecha) DO NOTHING
+                RETURNING id_actividad, id_bitacora, fecha, supervisor, descripcion, anexos,
+                          responsable, clima;
+            """, tuple(entrada[campo] for campo in (
+                "fecha", "supervisor", "descripcion", "anexos", "responsable", "clima", "id_bitacora", "huella",
+            )))
+            fila = cur.fetchone()
+            if fila is not None:
+                notificar_postgres(cur, fila)
+        conn.commit()
+    marcar_escritura()
+    return fila["id_actividad"] if fila is not None else None
+
+def obtener_actividades_modificadas_desde(modificado, id_actividad, limite=500):
+    """
+    Devuelve las actividades posteriores a la marca (modificado, id_actividad), en orden.
+
+    :param modificado: Marca de tiempo de la última actividad recibida, o None para todas.
+    :param id_actividad: Identificador de la última actividad recibida (desempate).
+    :param limite: Número máximo de filas.
+    """
+    with get_read_connection() as conn:
+        with cursor_dict(conn) as cur:
+            cur.execute("""
+                SELECT id_actividad, uuid::text AS uuid, fecha, fecha_hora, supervisor, descripcion, anexos,
+                       responsable, clima, estado, tipo, modificado
+                FROM actividades
+                WHERE (modificado, id_actividad) > (COALESCE(%s, '-infinity'::timestamptz), %s)
+                ORDER BY modificado, id_actividad
+                LIMIT %s;
+            """, (modificado, id_actividad, limite))
             return cur.fetchall()
-        
+
+def obtener_actividad_por_id(id_actividad):
+    with get_read_connection() as conn:
+        with cursor_dict(conn) as cur:
+            cur.execute("""
+                SELECT * FROM actividades WHERE id_actividad = %s;
+            """, (id_actividad,))
+            return cur.fetchone()
+
+def obtener_actividades_por_rango(fecha_inicio, fecha_fin, compacto=False):
+    """
+    :param compacto: Si es True, devuelve ActividadRecord en lugar de RealDictRow.
+    """
+    with conexion_frecuente() as conn:
+        with (conn.cursor() if compacto else cursor_dict(conn)) as cur:
+            preparadas.ejecutar(cur, preparadas.ACTIVIDADES_POR_RANGO, (fecha_inicio, fecha_fin))
+            if not compacto:
+                return cur.fetchall()
+            crear = ActividadRecord.fabrica([columna.name for columna in cur.description])
+            return [crear(fila) for fila in cur]
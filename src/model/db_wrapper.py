@@ -1,8 +1,16 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from src.model import preparadas
+from src.model.replicas import EnrutadorConexiones
 
 class DB:
-    def __init__(self, host, port, dbname, user, password):
+    def __init__(self, host, port, dbname, user, password, replicas=None, ventana_lectura_propia=5.0,
+                 retraso_maximo=10.0):
+        """
+        :param replicas: Lista opcional de réplicas de lectura, cada una un diccionario con
+            host y port (y los parámetros que difieran del primario).
+        :param ventana_lectura_propia: Segundos durante los que las lecturas van al primario
+            después de una escritura.
+        :param retraso_maximo: Retraso de replicación máximo aceptado para leer de una réplica.
+        """
         self.conn_params = {
             "host": host,
             "port": port,
@@ -10,18 +18,55 @@ class DB:
             "user": user,
             "password": password
         }
+        self.enrutador = EnrutadorConexiones(
+            self.conn_params,
+            replicas,
+            ventana_lectura_propia=ventana_lectura_propia,
+            retraso_maximo=retraso_maximo
+        )
 
     def _get_connection(self):
-        return psycopg2.connect(**self.conn_params)
+        return self.enrutador.conexion_escritura()
+
+    def _get_read_connection(self):
+        return self.enrutador.conexion_lectura()
+
+    # Las consultas registradas en preparadas.py se ejecutan preparadas, en la conexión
+    # persistente del hilo; el resto abre una conexión como siempre
+    def _conexion_para(self, query, lectura):
+        persistente = preparadas.nombre_de(query) is not None
+        if lectura:
+            return self.enrutador.conexion_lectura(persistente=persistente)
+        return self.enrutador.conexion_escritura(persistente)
 
     def fetch_query(self, query, params=None):
-        with self._get_connection() as conn:
+        from psycopg2.extras import RealDictCursor  # se importa en la primera consulta para no retrasar el arranque
+
+        with self._conexion_para(query, lectura=True) as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, params or ())
+                preparadas.ejecutar_consulta(cur, query, params)
                 return cur.fetchall()
 
+    def stream_query(self, query, params=None, tamano_lote=2000):
+        """Genera las filas de una consulta por lotes con un cursor del lado del servidor."""
+        from psycopg2.extras import RealDictCursor
+
+        conn = self._get_read_connection()
+        try:
+            with conn.cursor(name="consulta_streaming", cursor_factory=RealDictCursor) as cur:
+                cur.itersize = tamano_lote
+                cur.execute(query, params or ())
+                yield from cur
+            conn.commit()
+        finally:
+            conn.close()
+
     def execute_query(self, query, params=None):
-        with self._get_connection() as conn:
+        with self._conexion_para(query, lectura=False) as conn:
             with conn.cursor() as cur:
-                cur.execute(query, params or ())
+                preparadas.ejecutar_consulta(cur, query, params)
                 conn.commit()
+        self.enrutador.registrar_escritura()
+
+    def estado_replicas(self):
+        return self.enrutador.estado_replicas()
@@ -0,0 +1,195 @@
+"""
+Detección de actividades duplicadas por huella de contenido.
+
+Una actividad se identifica por su fecha, supervisor, descripción y responsable,
+normalizados: no cuentan mayúsculas, espacios repetidos ni formas Unicode distintas
+del mismo carácter. La huella es el SHA-256 de esa forma normalizada y se guarda en
+la columna huella, con índice único, así que saber si una actividad ya existe es una
+búsqueda por índice sin importar el tamaño de la tabla.
+
+Para bases con actividades anteriores a la huella hay un trabajo de una sola vez que
+recorre la tabla día por día, completa las huellas y elimina los duplicados
+(conserva la actividad más antigua de cada grupo):
+    python -m src.model.duplicados              # base SQLAlchemy
+    python -m src.model.duplicados --postgres   # PostgreSQL
+"""
+
+import argparse
+import hashlib
+import unicodedata
+
+CAMPOS_HUELLA = ("supervisor", "descripcion", "responsable")
+
+# Columna e índice en PostgreSQL; el índice único se crea después de depurar, porque
+# las filas existentes pueden estar duplicadas. En una tabla particionada la clave
+# única debe incluir fecha, que ya forma parte de la huella.
+MIGRACION_POSTGRES = [
+    "ALTER TABLE actividades ADD COLUMN IF NOT EXISTS huella CHAR(64);",
+]
+INDICE_POSTGRES = "CREATE UNIQUE INDEX IF NOT EXISTS idx_actividades_huella ON actividades (huella, fecha);"
+
+
+def normalizar(texto):
+    """Devuelve el texto sin diferencias de mayúsculas, espacios ni composición Unicode."""
+    return " ".join(unicodedata.normalize("NFKC", str(texto or "")).casefold().split())
+
+
+def huella_actividad(datos):
+    """
+    Calcula la huella de una actividad.
+
+    :param datos: Diccionario (o Mapping) con fecha, supervisor, descripcion y responsable.
+    :return: SHA-256 en hexadecimal (64 caracteres).
+    """
+    return hashlib.sha256((str(datos["fecha"])[:10] + sufijo_huella(datos)).encode("utf-8")).hexdigest()
+
+
+def sufijo_huella(datos):
+    """
+    Devuelve la parte de la huella que sigue a la fecha. Con ella la base puede calcular
+    la huella de una misma actividad en muchas fechas: SHA-256 de "YYYY-MM-DD" + sufijo.
+    """
+    return "".join("\x1f" + normalizar(datos.get(campo)) for campo in CAMPOS_HUELLA)
+
+
+def depurar_dia(filas):
+    """
+    Decide qué hacer con las actividades de un mismo día: de cada grupo con la misma
+    huella se conserva la que ya tiene la huella guardada o, si ninguna, la de menor id.
+
+    :param filas: Diccionarios con id_actividad, fecha, supervisor, descripcion,
+        responsable y huella (None si no se ha calculado).
+    :return: Tupla (ids a eliminar, lista de (id_actividad, huella) a guardar).
+    """
+    conservadas, eliminar, actualizar = set(), [], []
+    for fila in sorted(filas, key=lambda f: (f["huella"] is None, f["id_actividad"])):
+        huella = huella_actividad(fila)
+        if huella in conservadas:
+            eliminar.append(fila["id_actividad"])
+            continue
+        conservadas.add(huella)
+        if (fila["huella"] or "").strip() != huella:
+            actualizar.append((fila["id_actividad"], huella))
+    return eliminar, actualizar
+
+
+# ---- Base SQLAlchemy ----
+
+def agregar_columna_huella(engine):
+    """
+    Agrega la columna huella y su índice único a una tabla actividades creada antes de
+    la huella. Las filas existentes quedan con huella NULL hasta depurar_orm.
+
+    :return: True si se agregó la columna.
+    """
+    from sqlalchemy import inspect, text
+
+    with engine.begin() as conexion:
+        inspector = inspect(conexion)
+        if not inspector.has_table("actividades"):
+            return False
+        if "huella" in {columna["name"] for columna in inspector.get_columns("actividades")}:
+            return False
+        conexion.execute(text("ALTER TABLE actividades ADD COLUMN huella VARCHAR(64)"))
+        conexion.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_actividades_huella ON actividades (huella)"))
+    return True
+
+
+def depurar_orm(lote=500):
+    """
+    Completa las huellas y elimina los duplicados de la base SQLAlchemy, un día a la vez.
+
+    :param lote: Filas por sentencia de borrado o actualización.
+    :return: Tupla (revisadas, eliminadas).
+    """
+    from sqlalchemy import update
+    from src.model.orm_model import ActividadORM, Session
+
+    columnas = [ActividadORM.id_actividad, ActividadORM.fecha, ActividadORM.huella] + [
+        getattr(ActividadORM, campo) for campo in CAMPOS_HUELLA
+    ]
+    session = Session()
+    revisadas = eliminadas = 0
+    try:
+        dias = [dia for (dia,) in session.query(ActividadORM.fecha).distinct().order_by(ActividadORM.fecha)]
+        for dia in dias:
+            filas = [fila._asdict() for fila in session.query(*columnas).filter(ActividadORM.fecha == dia)]
+            eliminar, actualizar = depurar_dia(filas)
+            for inicio in range(0, len(eliminar), lote):
+                session.query(ActividadORM).filter(
+                    ActividadORM.id_actividad.in_(eliminar[inicio:inicio + lote])
+                ).delete(synchronize_session=False)
+            for inicio in range(0, len(actualizar), lote):
+                session.execute(update(ActividadORM), [
+                    {"id_actividad": id_actividad, "huella": huella}
+                    for id_actividad, huella in actualizar[inicio:inicio + lote]
+                ])
+            session.commit()
+            revisadas += len(filas)
+            eliminadas += len(eliminar)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return revisadas, eliminadas
+
+
+# ---- PostgreSQL ----
+
+def depurar_postgres():
+    """
+    Agrega la columna huella si falta, completa las huellas, elimina los duplicados
+    día por día y crea el índice único.
+
+    :return: Tupla (revisadas, eliminadas).
+    """
+    from psycopg2.extras import execute_values
+    from src.model.database import cursor_dict, get_connection, marcar_escritura
+
+    revisadas = eliminadas = 0
+    with get_connection() as conn:
+        with cursor_dict(conn) as cur:
+            for sentencia in MIGRACION_POSTGRES:
+                cur.execute(sentencia)
+            conn.commit()
+            cur.execute("SELECT DISTINCT fecha FROM actividades ORDER BY fecha;")
+            dias = [fila["fecha"] for fila in cur.fetchall()]
+            for dia in dias:
+                cur.execute(
+                    "SELECT id_actividad, fecha, supervisor, descripcion, responsable, huella "
+                    "FROM actividades WHERE fecha = %s;",
+                    (dia,),
+                )
+                filas = cur.fetchall()
+                eliminar, actualizar = depurar_dia(filas)
+                if eliminar:
+                    cur.execute(
+                        "DELETE FROM actividades WHERE fecha = %s AND id_actividad = ANY(%s);", (dia, eliminar)
+                    )
+                if actualizar:
+                    execute_values(cur, """
+                        UPDATE actividades a SET huella = v.huella
+                        FROM (VALUES %s) AS v (id_actividad, fecha, huella)
+                        WHERE a.fecha = v.fecha AND a.id_actividad = v.id_actividad;
+                    """, [(id_actividad, dia, huella) for id_actividad, huella in actualizar])
+                conn.commit()
+                revisadas += len(filas)
+                eliminadas += len(eliminar)
+            cur.execute(INDICE_POSTGRES)
+            conn.commit()
+    marcar_escritura()
+    return revisadas, eliminadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Completa las huellas y elimina las actividades duplicadas.")
+    parser.add_argument("--postgres", action="store_true", help="depurar PostgreSQL en lugar de SQLAlchemy")
+    args = parser.parse_args()
+
+    revisadas, eliminadas = depurar_postgres() if args.postgres else depurar_orm()
+    print(f"{revisadas} actividades revisadas, {eliminadas} duplicadas eliminadas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -64,3 +64,33 @@ class ReporteError(BaseError):
     """
     def __init__(self, mensaje="No se pudo generar el reporte."):
         super().__init__(mensaje)
+
+class RegistroCorruptoError(BaseError):
+    """
+    Se genera cuando un segmento del registro durable tiene un registro dañado
+    que no está al final del último segmento.
+
+    :param mensaje: Mensaje personalizado del error.
+    """
+    def __init__(self, mensaje="El registro durable está dañado."):
+        super().__init__(mensaje)
+
+class ArchivoEntradaError(BaseError):
+    """
+    Se genera cuando un archivo de entrada para la carga masiva no se puede leer
+    o está mal formado.
+
+    :param mensaje: Mensaje personalizado del error.
+    """
+    def __init__(self, mensaje="El archivo de entrada no es válido."):
+        super().__init__(mensaje)
+
+class ActividadDuplicadaError(BaseError):
+    """
+    Se genera cuando se registra una actividad con la misma fecha, supervisor,
+    descripción y responsable que otra ya registrada.
+
+    :param mensaje: Mensaje personalizado del error.
+    """
+    def __init__(self, mensaje="La actividad ya fue registrada."):
+        super().__init__(mensaje)
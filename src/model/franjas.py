@@ -0,0 +1,118 @@
+"""
+Hora de las actividades y conteos por franja de tiempo (hora, turno o día).
+
+Además de fecha, la tabla actividades tiene la columna fecha_hora (TIMESTAMP), que se
+llena cuando la actividad se registra con hora ("YYYY-MM-DD HH:MM"). En PostgreSQL la
+columna tiene un índice BRIN: las actividades llegan en orden de tiempo, así que un
+resumen mínimo/máximo por bloque de páginas, de unos pocos kB aunque la tabla tenga
+millones de filas, basta para descartar casi toda la tabla en una consulta por horas.
+SQLite no tiene BRIN y usa un índice normal.
+
+La franja de cada actividad se calcula en la base y solo viajan los conteos. Los
+turnos son de 8 horas y empiezan a las 06:00, 14:00 y 22:00; el de noche pertenece al
+día en que empieza.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+FRANJAS = ("hora", "turno", "dia")
+HORA_PRIMER_TURNO = 6
+HORAS_TURNO = 8
+NOMBRES_TURNO = {6: "mañana", 14: "tarde", 22: "noche"}
+
+MIGRACION_POSTGRES = [
+    "ALTER TABLE actividades ADD COLUMN IF NOT EXISTS fecha_hora TIMESTAMP;",
+    "CREATE INDEX IF NOT EXISTS idx_actividades_fecha_hora ON actividades USING BRIN (fecha_hora);",
+]
+
+# Inicio de la franja de cada actividad, por dialecto
+SQL_FRANJA = {
+    "postgresql": {
+        "hora": "date_trunc('hour', fecha_hora)",
+        "turno": f"date_bin('{HORAS_TURNO} hours', fecha_hora, TIMESTAMP '2000-01-01 {HORA_PRIMER_TURNO:02d}:00')",
+        "dia": "fecha",
+    },
+    "sqlite": {
+        "hora": "strftime('%Y-%m-%d %H:00:00', fecha_hora)",
+        "turno": (
+            f"datetime((CAST(strftime('%s', fecha_hora) AS INTEGER) - {HORA_PRIMER_TURNO * 3600})"
+            f" / {HORAS_TURNO * 3600} * {HORAS_TURNO * 3600} + {HORA_PRIMER_TURNO * 3600}, 'unixepoch')"
+        ),
+        "dia": "fecha",
+    },
+}
+
+
+def validar_franja(franja):
+    """:raises ValueError: Si la franja no es hora, turno ni dia."""
+    if franja not in FRANJAS:
+        raise ValueError(f"Franja desconocida: {franja}. Use {', '.join(FRANJAS)}.")
+
+
+def inicio_franja(momento, franja):
+    """
+    Devuelve el inicio de la franja que contiene un momento, igual que SQL_FRANJA.
+
+    :param momento: datetime (o date para la franja dia).
+    """
+    if franja == "dia":
+        return datetime.combine(momento if type(momento) is date else momento.date(), time())
+    if franja == "hora":
+        return momento.replace(minute=0, second=0, microsecond=0)
+    desplazado = momento - timedelta(hours=HORA_PRIMER_TURNO)
+    inicio = desplazado.replace(hour=desplazado.hour - desplazado.hour % HORAS_TURNO,
+                                minute=0, second=0, microsecond=0)
+    return inicio + timedelta(hours=HORA_PRIMER_TURNO)
+
+
+def como_datetime(valor):
+    """Convierte el inicio de franja que devuelve la base (datetime, date o texto ISO) en datetime."""
+    if isinstance(valor, str):
+        return datetime.fromisoformat(valor)
+    if type(valor) is date:
+        return datetime.combine(valor, time())
+    return valor
+
+
+def contar_archivadas(archivo, desde, hasta, franja, con_hora, conteo, filtro=None):
+    """
+    Suma al conteo las actividades del archivo frío del rango [desde, hasta).
+
+    :param con_hora: Si es True, solo cuentan las actividades con fecha_hora en el
+        rango; si es False (solo con la franja dia), todas las de esos días.
+    :param conteo: Diccionario {inicio de franja: cantidad} que se actualiza.
+    """
+    ultimo_dia = (hasta - timedelta(microseconds=1)).date()
+    if not archivo.solapa(desde.date(), ultimo_dia):
+        return
+    for fila in archivo.leer(desde.date(), ultimo_dia, filtro):
+        if con_hora:
+            momento = como_datetime(fila.get("fecha_hora"))
+            if momento is None or not desde <= momento < hasta:
+                continue
+        clave = inicio_franja(fila["fecha"] if franja == "dia" else momento, franja)
+        conteo[clave] = conteo.get(clave, 0) + 1
+
+
+def agregar_columna_fecha_hora(engine):
+    """
+    Agrega la columna fecha_hora y su índice a una tabla actividades creada antes de la
+    hora. Las actividades existentes quedan con fecha_hora NULL.
+
+    :return: True si se agregó la columna.
+    """
+    from sqlalchemy import inspect, text
+
+    with engine.begin() as conexion:
+        inspector = inspect(conexion)
+        if not inspector.has_table("actividades"):
+            return False
+        if "fecha_hora" in {columna["name"] for columna in inspector.get_columns("actividades")}:
+            return False
+        if conexion.dialect.name == "postgresql":
+            for sentencia in MIGRACION_POSTGRES:
+                conexion.execute(text(sentencia))
+        else:
+            conexion.execute(text("ALTER TABLE actividades ADD COLUMN fecha_hora DATETIME"))
+            conexion.execute(text("CREATE INDEX IF NOT EXISTS idx_actividades_fecha_hora ON actividades (fecha_hora)"))
+    return True
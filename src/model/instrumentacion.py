@@ -0,0 +1,73 @@
+"""
+Envoltura de los métodos públicos de las clases del modelo para instrumentarlos.
+
+El perfilado (perfilado.py) y las trazas (trazas.py) envuelven los mismos métodos de
+Actividad, Bitacora y Usuario. Las envolturas de cada uno se apilan sobre el método
+original y se registran por dueño, de modo que ambos pueden estar activos a la vez y
+desactivarse en cualquier orden: al quitar las de un dueño, el método se rearma desde
+el original con las envolturas que quedan, en el orden en que se pusieron.
+
+No se envuelven los nombres que empiezan con "_", lo que no es función ni los métodos
+que devuelven generadores: su trabajo ocurre al recorrerlos, fuera de la llamada.
+"""
+
+import inspect
+import threading
+
+_capas = {}            # (clase, nombre) -> (método original, [(dueño, envolver), ...])
+_lock = threading.Lock()
+
+
+def clases_instrumentadas():
+    from src.model.actividad import Actividad
+    from src.model.bitacora import Bitacora
+    from src.model.usuario import Usuario
+    return Actividad, Bitacora, Usuario
+
+
+def _se_envuelve(nombre, metodo):
+    return not nombre.startswith("_") and inspect.isfunction(metodo) and not inspect.isgeneratorfunction(metodo)
+
+
+def envolver_metodos(dueno, envolver):
+    """
+    Envuelve los métodos públicos de las clases del modelo, encima de las envolturas
+    que ya tengan. Llamarla de nuevo con el mismo dueño no los vuelve a envolver.
+
+    :param dueno: Nombre de quien envuelve, por ejemplo "perfilado".
+    :param envolver: Función (método, "Clase.metodo") que devuelve el método envuelto.
+    """
+    with _lock:
+        for clase in clases_instrumentadas():
+            for nombre, metodo in list(vars(clase).items()):
+                clave = (clase, nombre)
+                if clave not in _capas:
+                    if not _se_envuelve(nombre, metodo):
+                        continue
+                    _capas[clave] = (metodo, [])
+                capas = _capas[clave][1]
+                if any(otro == dueno for otro, _ in capas):
+                    continue
+                capas.append((dueno, envolver))
+                setattr(clase, nombre, envolver(metodo, f"{clase.__name__}.{nombre}"))
+
+
+def restaurar_metodos(dueno):
+    """
+    Quita las envolturas de un dueño y deja las de los demás.
+
+    :param dueno: El mismo nombre usado en envolver_metodos.
+    """
+    with _lock:
+        for (clase, nombre), (original, capas) in list(_capas.items()):
+            restantes = [(otro, envolver) for otro, envolver in capas if otro != dueno]
+            if len(restantes) == len(capas):
+                continue
+            metodo = original
+            for _, envolver in restantes:
+                metodo = envolver(metodo, f"{clase.__name__}.{nombre}")
+            setattr(clase, nombre, metodo)
+            if restantes:
+                capas[:] = restantes
+            else:
+                del _capas[clase, nombre]
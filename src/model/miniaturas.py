@@ -0,0 +1,204 @@
+"""
+Generación en segundo plano de miniaturas y vistas previas para los anexos de imagen.
+
+Cuando se registra una actividad, sus anexos de imagen se envían a un grupo de hilos
+que produce una miniatura (para la aplicación Kivy) y una vista previa de resolución
+de reporte. Los resultados se guardan en disco con el hash del contenido como clave,
+de modo que la misma foto adjunta a varias actividades se procesa una sola vez.
+Si una variante no está en caché al momento de pedirla, se genera en el acto.
+"""
+
+import hashlib
+import os
+import threading
+
+from src.model import trazas
+
+DIRECTORIO_CACHE = "cache_anexos"
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# Tamaño máximo (ancho, alto) de cada variante
+VARIANTES = {
+    "miniatura": (256, 256),
+    "vista_previa": (1280, 1280),
+}
+
+_TAMANO_BLOQUE = 1024 * 1024
+
+
+def separar_anexos(anexos):
+    """
+    Convierte el campo de anexos de una actividad en una lista de rutas.
+
+    :param anexos: Texto con las rutas separadas por comas o punto y coma.
+    :return: Lista de rutas sin espacios sobrantes.
+    """
+    if not anexos:
+        return []
+    return [ruta.strip() for ruta in anexos.replace(";", ",").split(",") if ruta.strip()]
+
+
+def es_imagen(ruta):
+    """Indica si la ruta corresponde a un anexo de imagen existente."""
+    return ruta.lower().endswith(EXTENSIONES_IMAGEN) and os.path.isfile(ruta)
+
+
+def huella_contenido(ruta):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyéndolo por bloques.
+
+    :param ruta: Ruta del archivo.
+    :return: Hash en hexadecimal.
+    """
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(_TAMANO_BLOQUE), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class GeneradorMiniaturas:
+    """
+    Grupo de hilos que genera y almacena en caché las variantes reducidas de los anexos.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE, max_hilos=2):
+        """
+        :param directorio: Carpeta donde se guardan las variantes generadas.
+        :param max_hilos: Número de hilos de trabajo.
+        """
+        self.directorio = directorio
+        self.max_hilos = max_hilos
+        self._executor = None
+        self._pendientes = {}
+        self._lock = threading.Lock()
+
+    def _obtener_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_hilos, thread_name_prefix="miniaturas"
+                )
+            return self._executor
+
+    def ruta_en_cache(self, huella, variante):
+        """Devuelve la ruta en disco de una variante a partir del hash del contenido."""
+        return os.path.join(self.directorio, huella[:2], f"{huella}_{variante}.jpg")
+
+    def encolar(self, anexos):
+        """
+        Envía al grupo de hilos los anexos de imagen de una actividad.
+
+        :param anexos: Campo de anexos de la actividad.
+        :return: Lista de futuros, uno por cada imagen encolada.
+        """
+        futuros = []
+        for ruta in separar_anexos(anexos):
+            if not es_imagen(ruta):
+                continue
+            with self._lock:
+                futuro = self._pendientes.get(ruta)
+            if futuro is None:
+                futuro = self._obtener_executor().submit(trazas.propagar(self._procesar), ruta)
+                with self._lock:
+                    self._pendientes[ruta] = futuro
+                futuro.add_done_callback(lambda _, r=ruta: self._liberar(r))
+            futuros.append(futuro)
+        return futuros
+
+    def _liberar(self, ruta):
+        with self._lock:
+            self._pendientes.pop(ruta, None)
+
+    def obtener(self, ruta, variante="miniatura"):
+        """
+        Devuelve la ruta de una variante del anexo, generándola si no está en caché.
+
+        :param ruta: Ruta del anexo original.
+        :param variante: "miniatura" o "vista_previa".
+        :return: Ruta de la variante, o None si el anexo no es una imagen utilizable.
+        """
+        if variante not in VARIANTES:
+            raise ValueError(f"Variante desconocida: {variante}")
+        if not es_imagen(ruta):
+            return None
+
+        with self._lock:
+            futuro = self._pendientes.get(ruta)
+        if futuro is not None:
+            generadas = futuro.result()
+        else:
+            generadas = self._procesar(ruta)
+        return generadas.get(variante)
+
+    @trazas.trazado("miniaturas")
+    def _procesar(self, ruta):
+        """Genera las variantes que falten para un anexo y devuelve sus rutas."""
+        try:
+            huella = huella_contenido(ruta)
+        except OSError:
+            return {}
+
+        rutas = {v: self.ruta_en_cache(huella, v) for v in VARIANTES}
+        faltantes = [v for v, destino in rutas.items() if not os.path.exists(destino)]
+        if faltantes and not self._generar(ruta, {v: rutas[v] for v in faltantes}):
+            return {v: destino for v, destino in rutas.items() if os.path.exists(destino)}
+        return rutas
+
+    def _generar(self, ruta, destinos):
+        try:
+            from PIL import Image
+        except ImportError:
+            return False
+
+        try:
+            # Se procesan de mayor a menor para reducir a partir de la imagen ya escalada
+            orden = sorted(destinos, key=lambda v: VARIANTES[v], reverse=True)
+            with Image.open(ruta) as original:
+                # draft() permite al decodificador JPEG leer directamente a escala reducida
+                original.draft("RGB", VARIANTES[orden[0]])
+                imagen = original.convert("RGB")
+            for variante in orden:
+                imagen.thumbnail(VARIANTES[variante])
+                destino = destinos[variante]
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                temporal = f"{destino}.{threading.get_ident()}.tmp"
+                imagen.save(temporal, "JPEG", quality=85)
+                os.replace(temporal, destino)
+        except OSError:
+            return False
+        return True
+
+
+generador = GeneradorMiniaturas()
+
+
+def encolar_anexos(anexos):
+    """Encola la generación de variantes para los anexos de una actividad recién registrada."""
+    return generador.encolar(anexos)
+
+
+def obtener_miniatura(ruta):
+    """Devuelve la ruta de la miniatura de un anexo de imagen, o None."""
+    return generador.obtener(ruta, "miniatura")
+
+
+def obtener_vista_previa(ruta):
+    """Devuelve la ruta de la vista previa de un anexo de imagen, o None."""
+    return generador.obtener(ruta, "vista_previa")
+
+
+def describir_anexos(anexos):
+    """
+    Construye el texto de anexos para un reporte, referenciando la vista previa
+    de cada imagen en lugar del original a resolución completa.
+
+    :param anexos: Campo de anexos de la actividad.
+    :return: Texto con los anexos y sus vistas previas.
+    """
+    partes = []
+    for ruta in separar_anexos(anexos):
+        vista_previa = obtener_vista_previa(ruta)
+        partes.append(f"{ruta} (vista previa: {vista_previa})" if vista_previa else ruta)
+    return ", ".join(partes)
@@ -0,0 +1,167 @@
+"""
+Canal de notificación de actividades nuevas.
+
+Las vistas abiertas se suscriben al notificador local y reciben cada actividad
+registrada, en lugar de volver a consultar todo el rango. En el motor SQLite la
+publicación es directa dentro del proceso. En PostgreSQL, insertar_actividad emite
+un NOTIFY en la misma transacción y EscuchaPostgres lo reenvía al notificador local
+de cada cliente que esté escuchando.
+"""
+
+import json
+import select
+import threading
+from datetime import date
+
+CANAL = "actividades_nuevas"
+
+# Si es True, la aplicación Kivy escucha las notificaciones de PostgreSQL al iniciar
+ESCUCHAR_POSTGRES = False
+
+# Límite de carga útil de NOTIFY en PostgreSQL (8000 bytes), con margen
+_MAX_CARGA = 7900
+
+
+class NotificadorLocal:
+    """
+    Publicador/suscriptor en memoria para actividades nuevas.
+    """
+
+    def __init__(self):
+        self._suscriptores = []
+        self._lock = threading.Lock()
+
+    def suscribir(self, callback):
+        """
+        Registra una función que recibirá cada actividad nueva como diccionario.
+
+        :param callback: Función de un argumento; puede ejecutarse en otro hilo.
+        :return: Función sin argumentos que cancela la suscripción.
+        """
+        with self._lock:
+            self._suscriptores.append(callback)
+
+        def cancelar():
+            with self._lock:
+                if callback in self._suscriptores:
+                    self._suscriptores.remove(callback)
+        return cancelar
+
+    def publicar(self, actividad):
+        """
+        Entrega una actividad a todos los suscriptores. Un suscriptor que falla no
+        impide la entrega a los demás.
+
+        :param actividad: Diccionario con los datos de la actividad.
+        """
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for callback in suscriptores:
+            try:
+                callback(actividad)
+            except Exception:
+                pass
+
+
+notificador_local = NotificadorLocal()
+
+
+def publicar_local(actividad):
+    """Publica una actividad nueva a los suscriptores del proceso."""
+    notificador_local.publicar(actividad)
+
+
+def suscribir(callback):
+    """Suscribe una función a las actividades nuevas; devuelve la función para cancelar."""
+    return notificador_local.suscribir(callback)
+
+
+def notificar_postgres(cur, actividad):
+    """
+    Emite un NOTIFY con la actividad. Se entrega a los clientes al confirmar la
+    transacción del cursor, de modo que nunca se anuncia una inserción revertida.
+
+    :param cur: Cursor de la transacción que insertó la actividad.
+    :param actividad: Diccionario con los datos de la actividad.
+    """
+    carga = json.dumps(actividad, default=str)
+    if len(carga.encode("utf-8")) > _MAX_CARGA:
+        # Para actividades muy grandes se envía solo la clave; el receptor la consulta
+        carga = json.dumps({
+            "id_actividad": actividad["id_actividad"],
+            "fecha": str(actividad["fecha"]),
+            "incompleta": True,
+        })
+    cur.execute("SELECT pg_notify(%s, %s);", (CANAL, carga))
+
+
+def fecha_de(actividad):
+    """Devuelve la fecha de una actividad notificada como objeto date."""
+    fecha = actividad["fecha"]
+    if isinstance(fecha, str):
+        return date.fromisoformat(fecha[:10])
+    return fecha
+
+
+class EscuchaPostgres(threading.Thread):
+    """
+    Hilo que escucha el canal de PostgreSQL y reenvía cada actividad al notificador local.
+    Si la conexión se pierde, vuelve a conectarse; si el servidor no responde, reintenta
+    con espera exponencial.
+    """
+
+    def __init__(self, notificador=None, intervalo=1.0, espera_maxima=60.0):
+        """
+        :param notificador: Notificador al que se reenvían las actividades.
+        :param intervalo: Segundos de espera máxima entre comprobaciones de parada.
+        :param espera_maxima: Espera máxima entre reintentos de conexión, en segundos.
+        """
+        super().__init__(name="escucha-actividades", daemon=True)
+        self.notificador = notificador or notificador_local
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self.ultimo_error = None
+        self._escuchando = False
+        self._detener = threading.Event()
+
+    def detener(self):
+        self._detener.set()
+
+    def run(self):
+        from src.model import database
+
+        espera = self.intervalo
+        while not self._detener.is_set():
+            try:
+                conn = database.get_connection()
+                try:
+                    self._escuchar(conn)
+                finally:
+                    conn.close()
+            except Exception as e:
+                # Lo notificado mientras no hay conexión se pierde; lo trae la sincronización
+                self.ultimo_error = str(e)
+                espera = self.intervalo if self._escuchando else min(espera * 2, self.espera_maxima)
+                self._escuchando = False
+                self._detener.wait(espera)
+
+    def _escuchar(self, conn):
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CANAL};")
+        self._escuchando = True
+        self.ultimo_error = None
+        while not self._detener.is_set():
+            if select.select([conn], [], [], self.intervalo) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                aviso = conn.notifies.pop(0)
+                self.notificador.publicar(self._completar(json.loads(aviso.payload)))
+
+    def _completar(self, actividad):
+        if not actividad.pop("incompleta", False):
+            return actividad
+        from src.model import database
+        fila = database.obtener_actividad_por_id(actividad["id_actividad"])
+        return dict(fila) if fila else actividad
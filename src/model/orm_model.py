@@ -1,7 +1,16 @@
-from sqlalchemy import Column, Integer, String, Date, Text, create_engine
+import argparse
+
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Date, DateTime, Text, create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from src.model.catalogos import ValorCatalogo, migrar
+from src.model.cronologia import COLUMNAS as COLUMNAS_CRONOLOGIA
+from src.model.duplicados import agregar_columna_huella
+from src.model.franjas import agregar_columna_fecha_hora
+
+DATABASE_URL = "sqlite:///actividades.db"  # o el de PostgreSQL
+
 Base = declarative_base()
 
 class Usuario(Base):
@@ -11,18 +20,148 @@ class Usuario(Base):
     correo = Column(String(150), nullable=False, unique=True)
     contraseña = Column(String(255), nullable=False)
 
+# Catálogos de los valores repetidos de actividades; ver catalogos.py
+class Clima(Base):
+    __tablename__ = 'climas'
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String(50), nullable=False, unique=True)
+
+class Estado(Base):
+    __tablename__ = 'estados'
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String(50), nullable=False, unique=True)
+
+class Tipo(Base):
+    __tablename__ = 'tipos'
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String(50), nullable=False, unique=True)
+
+class Responsable(Base):
+    __tablename__ = 'responsables'
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String(100), nullable=False, unique=True)
+
+def indices_cronologia(por):
+    """Índices de cobertura de la cronología de un responsable o supervisor (ver cronologia.py)."""
+    clave = (por, "fecha", "id_actividad")
+    listado = [columna for columna in COLUMNAS_CRONOLOGIA if columna not in clave]
+    nombre = f"idx_actividades_{por}_fecha"
+    return (
+        # SQLite no tiene INCLUDE: las columnas del listado van al final de la clave
+        Index(nombre, *clave, *listado).ddl_if(dialect="sqlite"),
+        Index(nombre, *clave, postgresql_include=listado).ddl_if(dialect="postgresql"),
+    )
+
 class ActividadORM(Base):  # <- nombre corregido aquí
     __tablename__ = 'actividades'
     id_actividad = Column(Integer, primary_key=True)
     fecha = Column(Date, nullable=False)
+    # Solo si la actividad se registró con hora; ver franjas.py
+    fecha_hora = Column(DateTime)
     descripcion = Column(Text, nullable=False)
     anexos = Column(Text)
-    responsable = Column(String(100))
-    clima = Column(String(50))
-    estado = Column(String(50))
-    tipo = Column(String(50))
-    supervisor = Column(String(100))  
-
-# Crear engine y sesión
-engine = create_engine("sqlite:///actividades.db")  # o el de PostgreSQL
-Session = sessionmaker(bind=engine)
+    # Se guardan como id de su catálogo y se leen y escriben como texto
+    responsable = Column("id_responsable", ValorCatalogo("responsables", Integer), ForeignKey("responsables.id"), key="responsable")
+    clima = Column("id_clima", ValorCatalogo("climas"), ForeignKey("climas.id"), key="clima")
+    estado = Column("id_estado", ValorCatalogo("estados"), ForeignKey("estados.id"), key="estado")
+    tipo = Column("id_tipo", ValorCatalogo("tipos"), ForeignKey("tipos.id"), key="tipo")
+    supervisor = Column(String(100))
+    # Huella de fecha, supervisor, descripción y responsable; ver duplicados.py
+    huella = Column(String(64))
+
+    __table_args__ = (
+        Index("idx_actividades_huella", "huella", unique=True),
+        # BRIN en PostgreSQL; SQLite no lo tiene y usa un índice normal
+        Index("idx_actividades_fecha_hora", "fecha_hora", postgresql_using="brin"),
+    ) + indices_cronologia("responsable") + indices_cronologia("supervisor")
+
+class RegistroAplicado(Base):
+    # uuid de cada registro durable ya aplicado, para no insertarlo dos veces al reproducir
+    __tablename__ = 'registros_aplicados'
+    uuid = Column(String(36), primary_key=True)
+    id_actividad = Column(Integer, nullable=False)
+
+
+def get_engine():
+    """Devuelve el engine de la base de datos, creándolo en el primer uso."""
+    global engine
+    if "engine" not in globals():
+        engine = create_engine(DATABASE_URL)
+    return engine
+
+
+def migrar_esquema(engine):
+    """
+    Actualiza una base creada con una versión anterior: convierte las columnas de texto
+    a catálogos, agrega la huella y la hora, y crea los índices que falten. No se hace
+    al abrir la base porque reescribe la tabla; se ejecuta con python -m src.model.orm_model.
+
+    :param engine: Engine de la base a actualizar.
+    :return: Lista con los cambios aplicados; vacía si el esquema ya estaba al día.
+    """
+    cambios = []
+    if migrar(engine):
+        cambios.append("catálogos")
+    if agregar_columna_huella(engine):
+        cambios.append("huella")
+    if agregar_columna_fecha_hora(engine):
+        cambios.append("fecha_hora")
+    if inspect(engine).has_table("actividades"):
+        antes = {indice["name"] for indice in inspect(engine).get_indexes("actividades")}
+        for indice in ActividadORM.__table__.indexes:
+            indice.create(engine, checkfirst=True)
+        despues = {indice["name"] for indice in inspect(engine).get_indexes("actividades")}
+        cambios += sorted(despues - antes)
+    return cambios
+
+
+def usar_engine(nuevo):
+    """
+    Reemplaza el engine y la fábrica de sesiones, por ejemplo por una base de pruebas.
+
+    :param nuevo: Engine de SQLAlchemy.
+    """
+    global engine, Session
+    engine = nuevo
+    Session = sessionmaker(bind=nuevo)
+
+
+def usar_conexion(conexion):
+    """
+    Hace que las sesiones se unan a la transacción abierta de una conexión: sus commit
+    quedan en savepoints y revertir la transacción de la conexión deshace todo. Sirve
+    para correr cada prueba en una transacción que se revierte al terminar.
+
+    :param conexion: Connection de SQLAlchemy con una transacción iniciada, o None para
+        volver a crear sesiones sobre el engine.
+    """
+    global Session
+    if conexion is None:
+        Session = sessionmaker(bind=get_engine())
+    else:
+        Session = sessionmaker(bind=conexion, join_transaction_mode="create_savepoint")
+
+
+def __getattr__(nombre):
+    # El engine y la fábrica de sesiones se crean la primera vez que se piden
+    # (from src.model.orm_model import engine, Session), no al importar el módulo.
+    global Session
+    if nombre == "engine":
+        return get_engine()
+    if nombre == "Session":
+        Session = sessionmaker(bind=get_engine())
+        return Session
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actualiza el esquema de una base creada con una versión anterior.")
+    parser.add_argument("--url", default=DATABASE_URL, help="URL de SQLAlchemy de la base a actualizar")
+    args = parser.parse_args()
+
+    cambios = migrar_esquema(create_engine(args.url))
+    print(f"Aplicado: {', '.join(cambios)}." if cambios else "El esquema ya está al día.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Particionamiento mensual de la tabla actividades en PostgreSQL.
+
+La tabla actividades está particionada por rango sobre fecha, con una partición por
+mes (actividades_AAAA_MM) y una partición por defecto para fechas sin partición.
+Las consultas existentes filtran por fecha, por lo que PostgreSQL descarta las
+particiones fuera del rango sin cambios en el código.
+"""
+
+from datetime import date
+
+from src.model.cronologia import SENTENCIAS_POSTGRES as SENTENCIAS_CRONOLOGIA
+from src.model.database import get_connection
+
+TABLA = "actividades"
+PARTICION_DEFECTO = "actividades_default"
+MESES_ADELANTE = 3
+
+COLUMNAS = (
+    "id_actividad", "id_bitacora", "fecha", "supervisor", "descripcion",
+    "anexos", "responsable", "clima", "estado", "tipo", "uuid", "modificado", "huella",
+    "fecha_hora",
+)
+
+SENTENCIAS_TABLA_PARTICIONADA = [
+    f"""
+    CREATE TABLE {TABLA} (
+        id_actividad SERIAL,
+        -- Las actividades registradas desde la aplicación no pertenecen a una bitácora
+        id_bitacora INT,
+        fecha DATE NOT NULL,
+        fecha_hora TIMESTAMP,
+        supervisor VARCHAR(100),
+        descripcion TEXT NOT NULL,
+        anexos TEXT,
+        responsable VARCHAR(100),
+        clima VARCHAR(50),
+        estado VARCHAR(50),
+        tipo VARCHAR(50),
+        uuid UUID NOT NULL DEFAULT gen_random_uuid(),
+        modificado TIMESTAMPTZ NOT NULL DEFAULT now(),
+        huella CHAR(64),
+        PRIMARY KEY (id_actividad, fecha),
+        CONSTRAINT fk_actividades_bitacora FOREIGN KEY (id_bitacora)
+            REFERENCES bitacoras(id_bitacora)
+            ON DELETE CASCADE
+    ) PARTITION BY RANGE (fecha);
+    """,
+    f"CREATE INDEX idx_actividades_fecha ON {TABLA} (fecha);",
+    # Clave de idempotencia y marca de cambios para la sincronización de clientes
+    f"CREATE UNIQUE INDEX idx_actividades_uuid ON {TABLA} (uuid, fecha);",
+    f"CREATE INDEX idx_actividades_modificado ON {TABLA} (modificado, id_actividad);",
+    # Detección de duplicados; la huella incluye la fecha (ver duplicados.py)
+    f"CREATE UNIQUE INDEX idx_actividades_huella ON {TABLA} (huella, fecha);",
+    # Las actividades llegan en orden de tiempo: un índice BRIN ocupa unos pocos kB
+    f"CREATE INDEX idx_actividades_fecha_hora ON {TABLA} USING BRIN (fecha_hora);",
+    # Índices de cobertura de la cronología por responsable y por supervisor
+    *SENTENCIAS_CRONOLOGIA,
+    f"CREATE TABLE {PARTICION_DEFECTO} PARTITION OF {TABLA} DEFAULT;",
+]
+
+# Meses cuya partición ya se verificó en este proceso
+_meses_asegurados = set()
+
+
+def siguiente_mes(anio, mes):
+    """Devuelve el (año, mes) siguiente."""
+    return (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def nombre_particion(anio, mes):
+    """Devuelve el nombre de la partición de un mes, por ejemplo actividades_2025_03."""
+    return f"{TABLA}_{anio:04d}_{mes:02d}"
+
+
+def crear_particion_mes(cur, anio, mes):
+    """
+    Crea la partición de un mes si no existe.
+
+    Si la partición por defecto ya contiene filas de ese mes, se desprende, se crea
+    la partición nueva, se trasladan las filas y se vuelve a adjuntar, como exige
+    PostgreSQL para no violar la restricción de la partición por defecto.
+
+    :param cur: Cursor de una conexión abierta; el llamador confirma la transacción.
+    :param anio: Año de la partición.
+    :param mes: Mes de la partición (1-12).
+    """
+    nombre = nombre_particion(anio, mes)
+    desde = date(anio, mes, 1)
+    hasta = date(*siguiente_mes(anio, mes), 1)
+
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (nombre,))
+    if cur.fetchone()[0]:
+        return
+
+    cur.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {PARTICION_DEFECTO} WHERE fecha >= %s AND fecha < %s);",
+        (desde, hasta),
+    )
+    if cur.fetchone()[0]:
+        cur.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {PARTICION_DEFECTO};")
+        cur.execute(
+            f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s);",
+            (desde, hasta),
+        )
+        cur.execute(
+            f"""
+            WITH movidas AS (
+                DELETE FROM {PARTICION_DEFECTO} WHERE fecha >= %s AND fecha < %s RETURNING *
+            )
+            INSERT INTO {nombre} SELECT * FROM movidas;
+            """,
+            (desde, hasta),
+        )
+        cur.execute(f"ALTER TABLE {TABLA} ATTACH PARTITION {PARTICION_DEFECTO} DEFAULT;")
+    else:
+        cur.execute(
+            f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s);",
+            (desde, hasta),
+        )
+
+
+def asegurar_particion(fecha):
+    """
+    Garantiza que exista la partición del mes de una fecha.
+
+    Se llama antes de cada inserción; tras la primera verificación de un mes en el
+    proceso no vuelve a consultar la base de datos.
+
+    :param fecha: Fecha (date, datetime o texto YYYY-MM-DD) de la actividad.
+    """
+    if isinstance(fecha, str):
+        fecha = date.fromisoformat(fecha.strip()[:10])
+    clave = (fecha.year, fecha.month)
+    if clave in _meses_asegurados:
+        return
+
+    from psycopg2 import errors  # se importa en el primer uso para no retrasar el arranque
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                crear_particion_mes(cur, *clave)
+                conn.commit()
+            except errors.DuplicateTable:
+                # Otro proceso la creó al mismo tiempo
+                conn.rollback()
+    _meses_asegurados.add(clave)
+
+
+def asegurar_particiones_futuras(meses=MESES_ADELANTE, hoy=None):
+    """
+    Crea las particiones del mes actual y de los siguientes meses.
+
+    :param meses: Cantidad de meses futuros a crear además del actual.
+    :param hoy: Fecha de referencia; por defecto la fecha actual.
+    :return: Lista de nombres de las particiones aseguradas.
+    """
+    hoy = hoy or date.today()
+    anio, mes = hoy.year, hoy.month
+    nombres = []
+    for _ in range(meses + 1):
+        asegurar_particion(date(anio, mes, 1))
+        nombres.append(nombre_particion(anio, mes))
+        anio, mes = siguiente_mes(anio, mes)
+    return nombres
+
+
+def listar_particiones():
+    """
+    Lista las particiones de actividades con sus límites.
+
+    :return: Lista de tuplas (nombre, expresión de límites).
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                ORDER BY c.relname;
+                """,
+                (TABLA,),
+            )
+            return cur.fetchall()
+
+
+def desprender_particion(anio, mes, eliminar=False, conn=None):
+    """
+    Desprende la partición de un mes de la tabla actividades.
+
+    Desprender es una operación de catálogo: no recorre ni copia filas. La tabla
+    desprendida queda como tabla independiente para archivarla, salvo que se elimine.
+
+    :param anio: Año de la partición.
+    :param mes: Mes de la partición.
+    :param eliminar: Si es True, elimina la tabla después de desprenderla.
+    :param conn: Conexión con una transacción abierta en la que desprenderla (quien la
+        pasa hace el commit); por defecto una nueva.
+    :return: Nombre de la partición desprendida.
+    """
+    if conn is None:
+        with get_connection() as conn:
+            nombre = desprender_particion(anio, mes, eliminar, conn)
+            conn.commit()
+        return nombre
+    nombre = nombre_particion(anio, mes)
+    with conn.cursor() as cur:
+        cur.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre};")
+        if eliminar:
+            cur.execute(f"DROP TABLE {nombre};")
+    _meses_asegurados.discard((anio, mes))
+    return nombre
+
+
+def migrar_a_particiones():
+    """
+    Convierte una tabla actividades sin particionar en una tabla particionada.
+
+    La tabla original se renombra a actividades_sin_particionar y se conserva para
+    poder verificar la migración antes de eliminarla manualmente.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"ALTER TABLE {TABLA} RENAME TO {TABLA}_sin_particionar;")
+            cur.execute(f"ALTER TABLE {TABLA}_sin_particionar RENAME CONSTRAINT {TABLA}_pkey TO {TABLA}_sin_particionar_pkey;")
+            for sentencia in SENTENCIAS_TABLA_PARTICIONADA:
+                cur.execute(sentencia)
+
+            cur.execute(f"SELECT min(fecha), max(fecha) FROM {TABLA}_sin_particionar;")
+            minima, maxima = cur.fetchone()
+            if minima is not None:
+                anio, mes = minima.year, minima.month
+                while (anio, mes) <= (maxima.year, maxima.month):
+                    crear_particion_mes(cur, anio, mes)
+                    anio, mes = siguiente_mes(anio, mes)
+
+            # Solo se copian las columnas que la tabla original realmente tiene
+            cur.execute(
+                """
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name = %s AND table_schema = current_schema()
+                ORDER BY ordinal_position;
+                """,
+                (f"{TABLA}_sin_particionar",),
+            )
+            columnas = ", ".join(c for (c,) in cur.fetchall() if c in COLUMNAS)
+            cur.execute(
+                f"INSERT INTO {TABLA} ({columnas}) SELECT {columnas} FROM {TABLA}_sin_particionar;"
+            )
+            cur.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id_actividad'), "
+                f"COALESCE((SELECT max(id_actividad) FROM {TABLA}), 1));",
+                (TABLA,),
+            )
+        conn.commit()
@@ -0,0 +1,186 @@
+"""
+Perfilado opcional de CPU y memoria de las operaciones del modelo.
+
+Se activa con la variable de entorno BITACORA_PERFIL=<directorio> (consola, aplicación
+Kivy y procesos de reportes en segundo plano) o con `main_console.py --perfil
+<directorio> ...`. Entonces cada llamada a un método público de Actividad, Bitacora y
+Usuario se ejecuta con cProfile y tracemalloc, y deja en el directorio:
+
+    <Clase.metodo>-<fecha>-<n>.prof   perfil de cProfile (pstats, snakeviz, ...)
+    <Clase.metodo>-<fecha>-<n>.txt    duración, pico de memoria, sitios que más
+                                      memoria asignaron y funciones más costosas
+
+Un hilo muestrea la memoria durante la llamada y guarda la instantánea de tracemalloc
+del momento de mayor uso, así que los sitios informados son los del pico y no solo lo
+que sigue vivo al terminar. Con BITACORA_PERFIL_UMBRAL=<segundos> solo se guardan las
+llamadas más lentas que el umbral.
+
+Sin la variable no se envuelve nada y no hay costo. Las llamadas anidadas (un método
+perfilado que llama a otro) quedan dentro del perfil de la exterior, y mientras un
+hilo perfila una llamada las de otros hilos corren sin perfilar, porque tracemalloc
+es global al proceso. Los métodos que devuelven generadores no se perfilan: su trabajo
+ocurre al recorrerlos, dentro de la operación que los consume.
+"""
+
+import functools
+import itertools
+import os
+import threading
+import time
+from datetime import datetime
+
+from src.model import instrumentacion
+
+VARIABLE = "BITACORA_PERFIL"
+VARIABLE_UMBRAL = "BITACORA_PERFIL_UMBRAL"
+MARCOS = 10            # marcos de pila guardados por asignación
+SITIOS = 15            # sitios de asignación en el resumen
+FUNCIONES = 25         # funciones en el resumen de cProfile
+INTERVALO_MUESTREO = 0.2
+
+_activo = None
+_lock = threading.Lock()
+_lock_llamada = threading.Lock()
+_locales = threading.local()
+_contador = itertools.count(1)
+
+
+def activar(directorio, umbral=0.0):
+    """
+    Envuelve los métodos públicos de las clases del modelo para perfilarlos. Llamarla
+    de nuevo no los vuelve a envolver.
+
+    :param directorio: Carpeta donde se guardan los perfiles; se crea si no existe.
+    :param umbral: Duración mínima, en segundos, de las llamadas que se guardan.
+    """
+    global _activo
+    os.makedirs(directorio, exist_ok=True)
+    # Los procesos hijos (por ejemplo, los de la cola de reportes) heredan la activación
+    os.environ[VARIABLE] = directorio
+    os.environ[VARIABLE_UMBRAL] = str(umbral)
+    with _lock:
+        ya_activo = _activo is not None
+        _activo = {"directorio": directorio, "umbral": umbral}
+    if ya_activo:
+        return
+    instrumentacion.envolver_metodos("perfilado", perfilar)
+
+
+def desactivar():
+    """Restaura los métodos originales y deja de perfilar."""
+    global _activo
+    with _lock:
+        _activo = None
+    instrumentacion.restaurar_metodos("perfilado")
+    os.environ.pop(VARIABLE, None)
+    os.environ.pop(VARIABLE_UMBRAL, None)
+
+
+def activar_desde_entorno():
+    """Activa el perfilado si la variable BITACORA_PERFIL indica un directorio."""
+    directorio = os.environ.get(VARIABLE)
+    if directorio:
+        activar(directorio, float(os.environ.get(VARIABLE_UMBRAL) or 0))
+
+
+def perfilar(funcion, nombre):
+    """Devuelve la función envuelta para ejecutarse con cProfile y tracemalloc."""
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if getattr(_locales, "perfilando", False) or not _lock_llamada.acquire(blocking=False):
+            return funcion(*args, **kwargs)
+        _locales.perfilando = True
+        try:
+            return _ejecutar_perfilado(funcion, nombre, args, kwargs)
+        finally:
+            _locales.perfilando = False
+            _lock_llamada.release()
+
+    return envoltura
+
+
+class _Muestreador(threading.Thread):
+    """Toma una instantánea de tracemalloc cada vez que la memoria supera el máximo visto."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.detener = threading.Event()
+        self.maximo = 0
+        self.instantanea = None
+
+    def muestrear(self):
+        import tracemalloc
+        actual = tracemalloc.get_traced_memory()[0]
+        if actual > self.maximo:
+            self.maximo = actual
+            self.instantanea = tracemalloc.take_snapshot()
+
+    def run(self):
+        while not self.detener.wait(INTERVALO_MUESTREO):
+            self.muestrear()
+
+
+def _ejecutar_perfilado(funcion, nombre, args, kwargs):
+    import cProfile
+    import tracemalloc
+
+    perfil = cProfile.Profile()
+    muestreador = _Muestreador()
+    # Si otra herramienta ya usa tracemalloc, se comparte y no se detiene al terminar
+    propio = not tracemalloc.is_tracing()
+    if propio:
+        tracemalloc.start(MARCOS)
+    tracemalloc.reset_peak()
+    muestreador.start()
+    inicio = time.perf_counter()
+    error = None
+    try:
+        perfil.enable()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            perfil.disable()
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        muestreador.detener.set()
+        muestreador.join()
+        muestreador.muestrear()
+        pico = tracemalloc.get_traced_memory()[1]
+        if propio:
+            tracemalloc.stop()
+        activo = _activo
+        if activo is not None and duracion >= activo["umbral"]:
+            _guardar(activo["directorio"], nombre, perfil, muestreador.instantanea, duracion, pico, error)
+
+
+def _guardar(directorio, nombre, perfil, instantanea, duracion, pico, error):
+    import io
+    import pstats
+    import tracemalloc
+
+    base = os.path.join(directorio,
+                        f"{nombre}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{next(_contador)}")
+    perfil.dump_stats(base + ".prof")
+
+    texto = io.StringIO()
+    texto.write(f"{nombre}\nduración: {duracion:.3f} s\npico de memoria: {pico / 1024 / 1024:.1f} MiB\n")
+    if error is not None:
+        texto.write(f"error: {type(error).__name__}: {error}\n")
+    if instantanea is not None:
+        instantanea = instantanea.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        texto.write("\nSitios con más memoria asignada en el pico muestreado:\n")
+        for estadistica in instantanea.statistics("lineno")[:SITIOS]:
+            marco = estadistica.traceback[0]
+            texto.write(f"{estadistica.size / 1024:>10.1f} KiB {estadistica.count:>8} bloques  "
+                        f"{marco.filename}:{marco.lineno}\n")
+    texto.write("\nFunciones con más tiempo acumulado:\n")
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(FUNCIONES)
+    with open(base + ".txt", "w", encoding="utf-8") as archivo:
+        archivo.write(texto.getvalue())
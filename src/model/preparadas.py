@@ -0,0 +1,106 @@
+"""
+Sentencias preparadas del lado del servidor para las consultas frecuentes.
+
+Cada consulta registrada con registrar() se prepara (PREPARE) la primera vez que se usa
+en una conexión y después se ejecuta con EXECUTE, así PostgreSQL no vuelve a analizarla
+ni a planificarla en cada llamada. Las conexiones de estas consultas son persistentes
+por hilo (EnrutadorConexiones con persistente=True): si se pierden, la siguiente
+llamada abre otra y, como es un objeto de conexión nuevo, las sentencias se preparan de
+nuevo automáticamente.
+
+Database.fetch_query, Database.execute_query y los mismos métodos de db_wrapper.DB
+reconocen el texto de una consulta registrada y la ejecutan preparada.
+"""
+
+import re
+import threading
+import weakref
+
+_nombres = {}      # texto normalizado de la consulta -> nombre
+_sentencias = {}   # nombre -> texto con marcadores $1, $2, ...
+_preparadas = weakref.WeakKeyDictionary()   # conexión -> nombres ya preparados en ella
+_lock = threading.Lock()
+
+
+def _normalizar(consulta):
+    return " ".join(consulta.split()).rstrip(";")
+
+
+def registrar(nombre, consulta):
+    """
+    Registra una consulta frecuente.
+
+    :param nombre: Nombre de la sentencia preparada (identificador SQL).
+    :param consulta: Texto con marcadores %s, como se pasa a cursor.execute. Los
+        parámetros cuyo tipo no se deduce de la consulta deben llevar conversión
+        explícita (por ejemplo %s::text[]).
+    :return: El nombre.
+    """
+    contador = iter(range(1, consulta.count("%s") + 1))
+    _sentencias[nombre] = re.sub(r"%s", lambda _: f"${next(contador)}", _normalizar(consulta))
+    _nombres[_normalizar(consulta)] = nombre
+    return nombre
+
+
+def nombre_de(consulta):
+    """Devuelve el nombre de una consulta registrada, o None si no lo está."""
+    return _nombres.get(_normalizar(consulta))
+
+
+def ejecutar(cur, nombre, params=()):
+    """
+    Ejecuta una consulta registrada en el cursor, preparándola antes si su conexión
+    todavía no la tiene.
+    """
+    conn = cur.connection
+    with _lock:
+        hechas = _preparadas.setdefault(conn, set())
+    if nombre not in hechas:
+        cur.execute(f"PREPARE {nombre} AS {_sentencias[nombre]}")
+        hechas.add(nombre)
+    if params:
+        cur.execute(f"EXECUTE {nombre} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {nombre}")
+
+
+def ejecutar_consulta(cur, consulta, params=None):
+    """Ejecuta una consulta preparada si está registrada y, si no, con cursor.execute."""
+    nombre = nombre_de(consulta)
+    if nombre is None:
+        cur.execute(consulta, params or ())
+    else:
+        ejecutar(cur, nombre, tuple(params or ()))
+
+
+# ---- Consultas frecuentes ----
+
+# Las columnas van explícitas y no con *: una sentencia preparada guarda el tipo de su
+# resultado, y tras un ALTER TABLE ... ADD COLUMN falla con "cached plan must not change
+# result type" en todas las conexiones persistentes que ya la tenían preparada.
+COLUMNAS_ACTIVIDADES = """id_actividad, id_bitacora, fecha, fecha_hora, supervisor, descripcion, anexos,
+    responsable, clima, estado, tipo, uuid, modificado, huella"""
+
+ACTIVIDADES_POR_RANGO = registrar("actividades_por_rango", f"""
+    SELECT {COLUMNAS_ACTIVIDADES} FROM actividades
+    WHERE fecha BETWEEN %s AND %s
+    ORDER BY fecha;
+""")
+
+USUARIO_POR_CORREO = registrar("usuario_por_correo", """
+    SELECT id_usuario, nombre, correo, contraseña, fecha_creacion FROM usuarios WHERE correo = %s;
+""")
+
+# Con arreglos por columna, la misma sentencia sirve para lotes de cualquier tamaño
+INSERTAR_ACTIVIDADES = registrar("insertar_actividades", f"""
+    INSERT INTO actividades (uuid, fecha, fecha_hora, supervisor, descripcion, anexos, responsable,
+                             clima, huella)
+    SELECT * FROM unnest(%s::text[]::uuid[], %s::text[]::date[], %s::text[]::timestamp[], %s::text[],
+                         %s::text[], %s::text[], %s::text[], %s::text[], %s::text[])
+    ON CONFLICT DO NOTHING
+    RETURNING {COLUMNAS_ACTIVIDADES};
+""")
+
+IDS_POR_UUID = registrar("ids_por_uuid", """
+    SELECT uuid::text AS uuid, id_actividad FROM actividades WHERE uuid = ANY(%s::text[]::uuid[]);
+""")
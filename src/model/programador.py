@@ -0,0 +1,268 @@
+"""
+Pregeneración programada de reportes recurrentes.
+
+Los reportes que todos piden a la vez (la semana pasada, el mes en curso, por
+bitácora) se generan en horario de baja carga con Bitacora.generar_reporte. Cada
+reporte guarda la huella de sus datos (número de entradas, último id y última
+modificación); el programador solo lo vuelve a generar si la huella cambió. Las
+solicitudes de la interfaz que coinciden con un reporte pregenerado vigente se
+atienden con ese archivo, sin recorrer actividades.
+
+Para ejecutarlo como proceso aparte (desde la raíz del proyecto):
+    python -m src.model.programador           # en bucle, dentro de la ventana
+    python -m src.model.programador --ahora   # una sola actualización inmediata
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+RUTA_PREGENERADOS = "reportes_pregenerados.db"
+DIRECTORIO_PREGENERADOS = os.path.join("reportes_generados", "pregenerados")
+
+# Horas (inicio incluido, fin excluido) de baja carga en las que se pregenera
+VENTANA_BAJA_CARGA = (1, 5)
+
+# Reportes recurrentes. periodo: "semana_anterior", "semana_actual", "mes_actual" o
+# "mes_anterior"; id_bitacora None incluye todas las bitácoras.
+REPORTES_RECURRENTES = [
+    {"nombre": "semana_anterior", "periodo": "semana_anterior", "formato": "pdf", "id_bitacora": None},
+    {"nombre": "mes_actual", "periodo": "mes_actual", "formato": "pdf", "id_bitacora": None},
+]
+
+ESQUEMA_PREGENERADOS = """
+    CREATE TABLE IF NOT EXISTS pregenerados (
+        clave TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        fecha_inicio TEXT NOT NULL,
+        fecha_fin TEXT NOT NULL,
+        formato TEXT NOT NULL,
+        id_bitacora INTEGER,
+        archivo TEXT NOT NULL,
+        huella TEXT NOT NULL,
+        generado TEXT NOT NULL
+    );
+"""
+
+# Último fallo de cada reporte recurrente; se borra cuando vuelve a generarse
+ESQUEMA_FALLOS = """
+    CREATE TABLE IF NOT EXISTS fallos_pregenerados (
+        clave TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        error TEXT NOT NULL,
+        fecha TEXT NOT NULL
+    );
+"""
+
+
+def rango_periodo(periodo, hoy=None):
+    """
+    Devuelve el rango (inicio, fin) de un periodo relativo a hoy, como objetos date.
+
+    :param periodo: "semana_anterior", "semana_actual", "mes_actual" o "mes_anterior".
+    """
+    hoy = hoy or date.today()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    if periodo == "semana_actual":
+        return lunes, lunes + timedelta(days=6)
+    if periodo == "semana_anterior":
+        return lunes - timedelta(days=7), lunes - timedelta(days=1)
+    primero = hoy.replace(day=1)
+    if periodo == "mes_actual":
+        return primero, (primero + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    if periodo == "mes_anterior":
+        fin = primero - timedelta(days=1)
+        return fin.replace(day=1), fin
+    raise ValueError(f"Periodo desconocido: {periodo}")
+
+
+def _clave(fecha_inicio, fecha_fin, formato, id_bitacora):
+    return f"{fecha_inicio}|{fecha_fin}|{formato}|{id_bitacora}"
+
+
+def _conexion(ruta=RUTA_PREGENERADOS):
+    conn = sqlite3.connect(ruta, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(ESQUEMA_PREGENERADOS)
+    conn.execute(ESQUEMA_FALLOS)
+    return conn
+
+
+def _bitacora():
+    from src.model.bitacora import Bitacora
+    from src.model.database import Database
+    return Bitacora(Database())
+
+
+def obtener_pregenerado(fecha_inicio, fecha_fin, formato, id_bitacora=None, ruta=RUTA_PREGENERADOS):
+    """
+    Devuelve la ruta de un reporte pregenerado para la solicitud si sus datos no han
+    cambiado desde que se generó; si no, None.
+    """
+    if not os.path.exists(ruta):
+        return None
+    conn = _conexion(ruta)
+    try:
+        fila = conn.execute(
+            "SELECT archivo, huella FROM pregenerados WHERE clave = ?;",
+            (_clave(fecha_inicio, fecha_fin, formato, id_bitacora),),
+        ).fetchone()
+    finally:
+        conn.close()
+    if fila is None or not os.path.exists(fila["archivo"]):
+        return None
+    try:
+        vigente = _bitacora().huella_entradas(fecha_inicio, fecha_fin, id_bitacora) == fila["huella"]
+    except Exception:
+        # Sin base de datos no se puede comprobar; se generará por el camino normal
+        return None
+    return fila["archivo"] if vigente else None
+
+
+def obtener_fallos(ruta=RUTA_PREGENERADOS):
+    """
+    Devuelve los reportes recurrentes cuya última pregeneración falló.
+
+    :return: Lista de diccionarios con clave, nombre, error y fecha.
+    """
+    if not os.path.exists(ruta):
+        return []
+    conn = _conexion(ruta)
+    try:
+        return [dict(fila) for fila in conn.execute("SELECT * FROM fallos_pregenerados ORDER BY fecha;")]
+    finally:
+        conn.close()
+
+
+class ProgramadorReportes(threading.Thread):
+    """
+    Hilo que, dentro de la ventana de baja carga, actualiza los reportes recurrentes
+    cuyos datos cambiaron.
+    """
+
+    def __init__(self, reportes=None, ventana=VENTANA_BAJA_CARGA, intervalo=900.0,
+                 ruta=RUTA_PREGENERADOS, directorio=DIRECTORIO_PREGENERADOS):
+        """
+        :param reportes: Lista de reportes recurrentes; por defecto REPORTES_RECURRENTES.
+        :param ventana: Tupla (hora_inicio, hora_fin) de baja carga.
+        :param intervalo: Segundos entre revisiones de huellas dentro de la ventana.
+        """
+        super().__init__(name="programador-reportes", daemon=True)
+        self.reportes = REPORTES_RECURRENTES if reportes is None else reportes
+        self.ventana = ventana
+        self.intervalo = intervalo
+        self.ruta = ruta
+        self.directorio = directorio
+        self.ultimo_error = None
+        self._detener = threading.Event()
+
+    def detener(self):
+        self._detener.set()
+
+    def en_ventana(self, ahora=None):
+        hora = (ahora or datetime.now()).hour
+        inicio, fin = self.ventana
+        return inicio <= hora < fin if inicio <= fin else hora >= inicio or hora < fin
+
+    def run(self):
+        while not self._detener.is_set():
+            if self.en_ventana():
+                try:
+                    self.actualizar()
+                    self.ultimo_error = None
+                except Exception as e:
+                    # Sin base de datos o sin acceso al registro de pregenerados; se
+                    # reintenta en la siguiente revisión
+                    self.ultimo_error = f"{type(e).__name__}: {e}"
+            self._detener.wait(self.intervalo)
+
+    def actualizar(self, hoy=None):
+        """
+        Genera los reportes recurrentes que faltan o cuyos datos cambiaron. Si uno
+        falla, su error queda en fallos_pregenerados y se sigue con los demás.
+
+        :return: Lista de nombres de los reportes regenerados.
+        """
+        bitacora = _bitacora()
+        regenerados = []
+        conn = _conexion(self.ruta)
+        try:
+            for reporte in self.reportes:
+                inicio, fin = (d.isoformat() for d in rango_periodo(reporte["periodo"], hoy))
+                clave = _clave(inicio, fin, reporte["formato"], reporte.get("id_bitacora"))
+                try:
+                    nombre = self._actualizar_reporte(conn, bitacora, reporte, inicio, fin, clave)
+                except Exception as e:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO fallos_pregenerados (clave, nombre, error, fecha) VALUES (?, ?, ?, ?);",
+                        (clave, reporte["nombre"], f"{type(e).__name__}: {e}",
+                         datetime.now().isoformat(timespec="seconds")),
+                    )
+                    conn.commit()
+                    continue
+                if nombre is not None:
+                    regenerados.append(nombre)
+        finally:
+            conn.close()
+        return regenerados
+
+    def _actualizar_reporte(self, conn, bitacora, reporte, inicio, fin, clave):
+        formato, id_bitacora = reporte["formato"], reporte.get("id_bitacora")
+        huella = bitacora.huella_entradas(inicio, fin, id_bitacora)
+        actual = conn.execute(
+            "SELECT archivo, huella FROM pregenerados WHERE clave = ?;", (clave,)
+        ).fetchone()
+        if actual and actual["huella"] == huella and os.path.exists(actual["archivo"]):
+            conn.execute("DELETE FROM fallos_pregenerados WHERE clave = ?;", (clave,))
+            conn.commit()
+            return None
+
+        nombre = f"{reporte['nombre']}_{inicio}_{fin}"
+        if id_bitacora is not None:
+            nombre += f"_bitacora{id_bitacora}"
+        archivo = os.path.join(self.directorio, f"{nombre}.{formato}")
+        temporal = f"pregenerado_{os.getpid()}.{formato}"
+        try:
+            bitacora.generar_reporte(inicio, fin, temporal, formato, id_bitacora=id_bitacora)
+            os.makedirs(self.directorio, exist_ok=True)
+            os.replace(temporal, archivo)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO pregenerados
+                (clave, nombre, fecha_inicio, fecha_fin, formato, id_bitacora, archivo, huella, generado)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            (clave, reporte["nombre"], inicio, fin, formato, id_bitacora, archivo, huella,
+             datetime.now().isoformat(timespec="seconds")),
+        )
+        conn.execute("DELETE FROM fallos_pregenerados WHERE clave = ?;", (clave,))
+        conn.commit()
+        return nombre
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pregenera los reportes recurrentes.")
+    parser.add_argument("--ahora", action="store_true", help="actualizar una vez, sin esperar la ventana")
+    args = parser.parse_args()
+
+    programador = ProgramadorReportes()
+    if args.ahora:
+        for nombre in programador.actualizar():
+            print(f"Regenerado: {nombre}")
+        for fallo in obtener_fallos(programador.ruta):
+            print(f"Falló: {fallo['nombre']} ({fallo['fecha']}): {fallo['error']}")
+        return
+    programador.start()
+    try:
+        programador.join()
+    except KeyboardInterrupt:
+        programador.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Actividades recurrentes: una actividad modelo repetida según una regla.
+
+La regla es una frecuencia (diaria, laborables o semanal), un intervalo (cada cuántos
+días o semanas) y una fecha final incluida. Las ocurrencias no se insertan una por una
+desde Python: la base genera la serie de fechas (generate_series en PostgreSQL, un CTE
+recursivo en SQLite) y las inserta con un solo INSERT ... SELECT, calculando también la
+huella de cada una. Las ocurrencias que ya existen (misma huella) se omiten en la misma
+sentencia con ON CONFLICT DO NOTHING.
+"""
+
+from datetime import timedelta
+
+from src.model.errores import RangoFechasInvalidoError
+
+FRECUENCIAS = ("diaria", "laborables", "semanal")
+MAX_OCURRENCIAS = 3660
+
+# Columnas comunes del INSERT ... SELECT; la fecha y la huella dependen del dialecto
+_COLUMNAS = "fecha, fecha_hora, descripcion, anexos, id_responsable, id_clima, supervisor, huella"
+_VALORES = ":descripcion, :anexos, :id_responsable, :id_clima, :supervisor"
+
+SQL_INSERTAR = {
+    "postgresql": f"""
+        INSERT INTO actividades ({_COLUMNAS})
+        SELECT d::date, d::date + CAST(:hora AS time), {_VALORES},
+               encode(sha256(convert_to(to_char(d, 'YYYY-MM-DD') || :sufijo, 'UTF8')), 'hex')
+        FROM generate_series(CAST(:inicio AS date), CAST(:hasta AS date), :paso * interval '1 day') AS serie (d)
+        WHERE :laborables = 0 OR extract(isodow FROM d) < 6
+        ON CONFLICT DO NOTHING
+    """,
+    # El CTE va dentro del INSERT porque sqlite3 no informa rowcount si la sentencia
+    # empieza con WITH; el WHERE antes de ON CONFLICT evita la ambigüedad de INSERT ... SELECT
+    "sqlite": f"""
+        INSERT INTO actividades ({_COLUMNAS})
+        WITH RECURSIVE serie (d) AS (
+            SELECT date(:inicio)
+            UNION ALL
+            SELECT date(d, '+' || :paso || ' days') FROM serie WHERE date(d, '+' || :paso || ' days') <= :hasta
+        )
+        SELECT d, CASE WHEN :hora IS NULL THEN NULL ELSE d || ' ' || :hora || '.000000' END, {_VALORES},
+               sha256_hex(d || :sufijo)
+        FROM serie
+        WHERE :laborables = 0 OR strftime('%w', d) NOT IN ('0', '6')
+        ON CONFLICT DO NOTHING
+    """,
+}
+
+
+def validar_regla(inicio, hasta, frecuencia, intervalo):
+    """
+    :param inicio: Primera fecha (date).
+    :param hasta: Última fecha posible, incluida (date).
+    :raises ValueError: Si la frecuencia o el intervalo no son válidos.
+    :raises RangoFechasInvalidoError: Si hasta es anterior al inicio o la regla genera
+        más de MAX_OCURRENCIAS actividades.
+    """
+    if frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia desconocida: {frecuencia}. Use {', '.join(FRECUENCIAS)}.")
+    if not isinstance(intervalo, int) or intervalo < 1:
+        raise ValueError("El intervalo debe ser un entero mayor o igual a 1.")
+    if frecuencia == "laborables" and intervalo != 1:
+        raise ValueError("La frecuencia laborables no admite intervalo.")
+    if hasta < inicio:
+        raise RangoFechasInvalidoError("La fecha final no puede ser anterior a la de la actividad.")
+    if contar_ocurrencias(inicio, hasta, frecuencia, intervalo) > MAX_OCURRENCIAS:
+        raise RangoFechasInvalidoError(f"La regla genera más de {MAX_OCURRENCIAS} actividades.")
+
+
+def paso_en_dias(frecuencia, intervalo):
+    return intervalo * 7 if frecuencia == "semanal" else intervalo
+
+
+def contar_ocurrencias(inicio, hasta, frecuencia, intervalo=1):
+    """Cuenta las fechas de la regla sin generarlas; una serie de años no recorre cada día."""
+    if hasta < inicio:
+        return 0
+    dias = (hasta - inicio).days + 1
+    if frecuencia != "laborables":
+        return (dias - 1) // paso_en_dias(frecuencia, intervalo) + 1
+    # Cada semana completa tiene 5 laborables; los días sueltos del final se revisan uno a uno
+    semanas, sueltos = divmod(dias, 7)
+    return semanas * 5 + sum(1 for n in range(sueltos) if (inicio.weekday() + n) % 7 < 5)
+
+
+def ocurrencias(inicio, hasta, frecuencia, intervalo=1):
+    """Genera las fechas de la regla, igual que SQL_INSERTAR."""
+    paso = timedelta(days=paso_en_dias(frecuencia, intervalo))
+    fecha = inicio
+    while fecha <= hasta:
+        if frecuencia != "laborables" or fecha.weekday() < 5:
+            yield fecha
+        fecha += paso
+
+
+def registrar_funcion_huella(conexion):
+    """Registra sha256_hex en una conexión SQLite; PostgreSQL ya tiene sha256."""
+    import hashlib
+
+    if conexion.dialect.name == "sqlite":
+        conexion.connection.driver_connection.create_function(
+            "sha256_hex", 1, lambda texto: hashlib.sha256(texto.encode("utf-8")).hexdigest(), deterministic=True
+        )
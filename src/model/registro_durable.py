@@ -0,0 +1,608 @@
+"""
+Registro durable de solo anexado para las actividades que se registran.
+
+Cada actividad se escribe primero en un segmento local, con su longitud y un CRC32,
+y se sincroniza a disco (fsync) antes de responder al usuario. Los hilos que escriben
+a la vez comparten un mismo fsync. Después, un reproductor aplica los registros a la
+base de datos en orden y avanza un punto de control; cada registro lleva un uuid que
+la base usa como clave de idempotencia, así que reaplicar tras una caída no duplica
+actividades. Los segmentos ya aplicados por completo se eliminan al compactar.
+
+Si la base de datos no está disponible, la actividad queda en el registro y se aplica
+en el siguiente intento, sin perder la entrada del supervisor.
+
+La aplicación Kivy, la consola y los procesos de reportes comparten la carpeta, así que
+las escrituras se serializan también entre procesos con un candado de archivo
+(escritura.lock) y la reproducción, el punto de control y la compactación con otro
+(reproduccion.lock). Cada escritura anexa al último segmento de la carpeta, aunque lo
+haya abierto otro proceso, y solo descarta una cola incompleta con el candado tomado,
+cuando ningún otro proceso puede estar escribiéndola.
+"""
+
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+from src.model.errores import RegistroCorruptoError
+
+DIRECTORIO_REGISTRO = "registro_durable"
+TAMANO_SEGMENTO = 4 * 1024 * 1024
+
+# Si es True, cada canal aplica sus registros en un hilo. Si es False no se inicia el
+# hilo y los registros se aplican solo al leer (Canal.vaciar) o al terminar el proceso;
+# lo usan las pruebas, que comparten una conexión de base de datos entre todos los hilos.
+APLICAR_EN_SEGUNDO_PLANO = True
+
+# Cabecera de cada registro: longitud del contenido y CRC32, ambos uint32
+_CABECERA = struct.Struct("<II")
+_EXTENSION = ".seg"
+
+
+def _fsync_directorio(directorio):
+    # Necesario para que la creación y el renombrado de archivos sobrevivan a un corte
+    try:
+        fd = os.open(directorio, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _bloquear(fd):
+    try:
+        import fcntl
+    except ImportError:
+        # Windows: se bloquea el primer byte, reintentando mientras otro proceso lo tenga
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(0.01)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _desbloquear(fd):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class BloqueoArchivo:
+    """
+    Candado exclusivo entre hilos y entre procesos sobre un archivo. Uso:
+
+        with bloqueo:
+            ...
+    """
+
+    def __init__(self, ruta):
+        """
+        :param ruta: Archivo del candado; se crea (vacío) si no existe.
+        """
+        self.ruta = ruta
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._fd is None:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                self._fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+            _bloquear(self._fd)
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            _desbloquear(self._fd)
+        finally:
+            self._lock.release()
+
+
+class RegistroDurable:
+    """
+    Registro de solo anexado dividido en segmentos, con punto de control de lo aplicado.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_REGISTRO, tamano_segmento=TAMANO_SEGMENTO):
+        """
+        :param directorio: Carpeta de los segmentos y del punto de control.
+        :param tamano_segmento: Tamaño en bytes a partir del cual se abre un segmento nuevo.
+        """
+        self.directorio = directorio
+        self.tamano_segmento = tamano_segmento
+        self._archivo = None
+        self._segmento = 0
+        self._fin = 0          # bytes del segmento abierto que se sabe que son registros válidos
+        self._escritos = 0
+        self._sincronizados = 0
+        self._bloqueo = BloqueoArchivo(os.path.join(directorio, "escritura.lock"))
+        self.bloqueo_reproduccion = BloqueoArchivo(os.path.join(directorio, "reproduccion.lock"))
+        self._lock_fsync = threading.Lock()
+
+    # ---- Segmentos ----
+
+    def _ruta(self, numero):
+        return os.path.join(self.directorio, f"{numero:012d}{_EXTENSION}")
+
+    def segmentos(self):
+        """Devuelve los números de segmento existentes, en orden."""
+        if not os.path.isdir(self.directorio):
+            return []
+        return sorted(
+            int(nombre[:-len(_EXTENSION)]) for nombre in os.listdir(self.directorio)
+            if nombre.endswith(_EXTENSION)
+        )
+
+    def _abrir(self):
+        """
+        Deja abierto para anexar el último segmento de la carpeta, descartando un registro
+        final incompleto. Se llama con el candado de escritura tomado antes de cada
+        escritura, porque otro proceso pudo haber anexado registros o rotado el segmento.
+        """
+        if self._archivo is not None and not os.path.exists(self._ruta(self._segmento)):
+            # Otro proceso lo compactó después de rotar: ya no es el último
+            self._cerrar_archivo()
+        if self._archivo is None:
+            segmentos = self.segmentos()
+            self._segmento = segmentos[-1] if segmentos else 1
+            self._archivo = open(self._ruta(self._segmento), "ab")
+            self._fin = 0
+            _fsync_directorio(self.directorio)
+        while os.path.exists(self._ruta(self._segmento + 1)):
+            # Otro proceso rotó; la compactación nunca elimina el último segmento
+            self._cerrar_archivo()
+            self._segmento += 1
+            self._archivo = open(self._ruta(self._segmento), "ab")
+            self._fin = 0
+        tamano = os.fstat(self._archivo.fileno()).st_size
+        if tamano != self._fin:
+            # Lo que otros procesos escribieron con el candado son registros completos;
+            # una cola incompleta solo puede venir de una escritura interrumpida por un corte
+            valido = self._fin
+            for valido, _ in self._leer_segmento(self._segmento, self._fin, tolerar_final=True):
+                pass
+            if tamano > valido:
+                self._archivo.truncate(valido)
+                os.fsync(self._archivo.fileno())
+            self._fin = valido
+        if self._fin >= self.tamano_segmento:
+            self._rotar()
+
+    def _rotar(self):
+        self._cerrar_archivo()
+        self._segmento += 1
+        self._archivo = open(self._ruta(self._segmento), "ab")
+        self._fin = 0
+        _fsync_directorio(self.directorio)
+
+    def _cerrar_archivo(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._archivo.close()
+        self._archivo = None
+
+    # ---- Escritura ----
+
+    def agregar(self, datos):
+        """
+        Anexa un registro y espera a que esté en disco.
+
+        :param datos: Diccionario serializable en JSON. Si no tiene "uuid", se le asigna uno.
+        :return: El diccionario registrado, con su uuid.
+        """
+        registro = dict(datos)
+        registro.setdefault("uuid", str(uuid.uuid4()))
+        contenido = json.dumps(registro, ensure_ascii=False, default=str).encode("utf-8")
+        cabecera = _CABECERA.pack(len(contenido), zlib.crc32(contenido))
+
+        with self._bloqueo:
+            self._abrir()
+            self._archivo.write(cabecera + contenido)
+            # Se vacía con el candado tomado para que otro proceso vea el registro completo
+            self._archivo.flush()
+            self._fin = self._archivo.tell()
+            self._escritos += 1
+            numero = self._escritos
+        self._sincronizar(numero)
+        return registro
+
+    def agregar_lote(self, lista):
+        """
+        Anexa varios registros con un solo fsync al final, para cargas masivas.
+
+        :param lista: Lista de diccionarios serializables en JSON.
+        :return: Lista de los diccionarios registrados, con su uuid.
+        """
+        registros, datos_binarios = [], []
+        for datos in lista:
+            registro = dict(datos)
+            registro.setdefault("uuid", str(uuid.uuid4()))
+            contenido = json.dumps(registro, ensure_ascii=False, default=str).encode("utf-8")
+            registros.append(registro)
+            datos_binarios.append(_CABECERA.pack(len(contenido), zlib.crc32(contenido)) + contenido)
+        if not registros:
+            return registros
+
+        with self._bloqueo:
+            self._abrir()
+            for binario in datos_binarios:
+                if self._fin >= self.tamano_segmento:
+                    self._rotar()
+                self._archivo.write(binario)
+                self._fin = self._archivo.tell()
+            self._archivo.flush()
+            self._escritos += len(datos_binarios)
+            numero = self._escritos
+        self._sincronizar(numero)
+        return registros
+
+    def _sincronizar(self, numero):
+        # Quien obtiene el candado hace fsync de todo lo escrito hasta ese momento;
+        # los demás hilos que esperaban encuentran su registro ya sincronizado.
+        with self._lock_fsync:
+            if self._sincronizados >= numero:
+                return
+            with self._bloqueo:
+                escritos = self._escritos
+                archivo = self._archivo
+            try:
+                os.fsync(archivo.fileno())
+            except (OSError, ValueError):
+                # Un segmento rotado o cerrado mientras tanto ya se sincronizó al cerrarlo
+                if not archivo.closed:
+                    raise
+            self._sincronizados = escritos
+
+    # ---- Lectura ----
+
+    def _leer_segmento(self, numero, desplazamiento, tolerar_final=False):
+        """
+        Genera (desplazamiento_siguiente, registro) desde un desplazamiento del segmento.
+
+        :raises RegistroCorruptoError: Si hay un registro dañado y no se tolera.
+        """
+        with open(self._ruta(numero), "rb") as f:
+            f.seek(desplazamiento)
+            while True:
+                cabecera = f.read(_CABECERA.size)
+                if not cabecera:
+                    return
+                if len(cabecera) == _CABECERA.size:
+                    longitud, crc = _CABECERA.unpack(cabecera)
+                    contenido = f.read(longitud)
+                    if len(contenido) == longitud and zlib.crc32(contenido) == crc:
+                        desplazamiento = f.tell()
+                        yield desplazamiento, json.loads(contenido)
+                        continue
+                if tolerar_final:
+                    return
+                raise RegistroCorruptoError(
+                    f"Registro dañado en el segmento {numero} en la posición {desplazamiento}."
+                )
+
+    def leer_desde(self, posicion):
+        """
+        Genera ((segmento, desplazamiento_siguiente), registro) a partir de una posición.
+        Solo el último segmento puede terminar en un registro incompleto.
+
+        :param posicion: Tupla (segmento, desplazamiento) desde la que se lee.
+        """
+        segmento_inicial, desplazamiento = posicion
+        segmentos = [s for s in self.segmentos() if s >= segmento_inicial]
+        for numero in segmentos:
+            inicio = desplazamiento if numero == segmento_inicial else 0
+            ultimo = numero == segmentos[-1]
+            for siguiente, registro in self._leer_segmento(numero, inicio, tolerar_final=ultimo):
+                yield (numero, siguiente), registro
+
+    # ---- Punto de control ----
+
+    def _ruta_control(self):
+        return os.path.join(self.directorio, "aplicado.json")
+
+    def posicion_aplicada(self):
+        """Devuelve la posición (segmento, desplazamiento) hasta la que todo está aplicado."""
+        try:
+            with open(self._ruta_control(), encoding="utf-8") as f:
+                control = json.load(f)
+        except FileNotFoundError:
+            return (0, 0)
+        return (control["segmento"], control["desplazamiento"])
+
+    def confirmar(self, posicion):
+        """Guarda de forma atómica la posición hasta la que los registros están aplicados."""
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = self._ruta_control() + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"segmento": posicion[0], "desplazamiento": posicion[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta_control())
+        _fsync_directorio(self.directorio)
+
+    def pendientes(self):
+        """Devuelve la lista de registros aún no aplicados."""
+        return [registro for _, registro in self.leer_desde(self.posicion_aplicada())]
+
+    def compactar(self):
+        """
+        Elimina los segmentos cuyos registros ya están todos aplicados. Nunca elimina el
+        último, que es al que anexan todos los procesos.
+
+        :return: Número de segmentos eliminados.
+        """
+        segmento_aplicado = self.posicion_aplicada()[0]
+        eliminados = 0
+        with self._bloqueo:
+            for numero in self.segmentos()[:-1]:
+                if numero >= segmento_aplicado:
+                    break
+                os.remove(self._ruta(numero))
+                eliminados += 1
+        if eliminados:
+            _fsync_directorio(self.directorio)
+        return eliminados
+
+    def cerrar(self):
+        with self._bloqueo:
+            if self._archivo is not None:
+                self._cerrar_archivo()
+
+
+class Reproductor:
+    """
+    Aplica a la base de datos los registros pendientes, en orden y por lotes.
+    """
+
+    def __init__(self, registro, aplicar, errores_transitorios=(), lote=100):
+        """
+        :param registro: RegistroDurable a reproducir.
+        :param aplicar: Función que recibe una lista de registros y los aplica en una
+            transacción; debe ignorar los uuid ya aplicados.
+        :param errores_transitorios: Excepciones que indican que la base no está
+            disponible; se reintenta más tarde sin descartar nada.
+        :param lote: Número máximo de registros por llamada a `aplicar`.
+        """
+        self.registro = registro
+        self.aplicar = aplicar
+        self.errores_transitorios = errores_transitorios
+        self.lote = lote
+        self.ultimo_error = None
+        # Número de reproducciones iniciadas y de la última que terminó sin error; una
+        # que empieza después de anexar un registro lo incluye
+        self.iniciadas = 0
+        self.completada = 0
+        self._lock = threading.Lock()
+        self._locales = threading.local()
+
+    def reproducir(self):
+        """
+        Aplica todos los registros pendientes. Un error transitorio detiene la reproducción
+        y los registros siguen pendientes. Un registro que la base rechaza por otro motivo
+        se aparta en rechazados.jsonl para no bloquear a los siguientes.
+
+        :return: Tupla (aplicados, rechazados), donde rechazados es una lista de
+            (registro, excepción).
+        :raises: El error transitorio, si la base no está disponible.
+        """
+        aplicados, rechazados = 0, []
+        # El punto de control es de la carpeta: un solo proceso reproduce a la vez
+        with self._lock, self.registro.bloqueo_reproduccion:
+            self.iniciadas += 1
+            numero = self.iniciadas
+            self._locales.reproduciendo = True
+            try:
+                aplicados = self._reproducir(rechazados)
+            finally:
+                self._locales.reproduciendo = False
+            self.completada = numero
+        return aplicados, rechazados
+
+    def reproduciendo(self):
+        """Indica si el hilo actual está aplicando registros (por ejemplo, desde `aplicar`)."""
+        return getattr(self._locales, "reproduciendo", False)
+
+    def _reproducir(self, rechazados):
+        aplicados = 0
+        pendientes = []
+        for posicion, registro in self.registro.leer_desde(self.registro.posicion_aplicada()):
+            pendientes.append((posicion, registro))
+            if len(pendientes) >= self.lote:
+                aplicados += self._aplicar_lote(pendientes, rechazados)
+                pendientes = []
+        if pendientes:
+            aplicados += self._aplicar_lote(pendientes, rechazados)
+        self.ultimo_error = None
+        self.registro.compactar()
+        return aplicados
+
+    def _aplicar_lote(self, pendientes, rechazados):
+        try:
+            self.aplicar([registro for _, registro in pendientes])
+        except self.errores_transitorios as e:
+            self.ultimo_error = e
+            raise
+        except Exception:
+            # Se aplica uno por uno para aislar el registro que la base rechaza
+            aplicados = 0
+            for posicion, registro in pendientes:
+                try:
+                    self.aplicar([registro])
+                except self.errores_transitorios as e:
+                    self.ultimo_error = e
+                    raise
+                except Exception as e:
+                    self._apartar(registro, e)
+                    rechazados.append((registro, e))
+                else:
+                    aplicados += 1
+                self.registro.confirmar(posicion)
+            return aplicados
+        self.registro.confirmar(pendientes[-1][0])
+        return len(pendientes)
+
+    def _apartar(self, registro, error):
+        ruta = os.path.join(self.registro.directorio, "rechazados.jsonl")
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"registro": registro, "error": str(error)}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class HiloReproductor(threading.Thread):
+    """
+    Hilo que reproduce el registro cuando se le avisa o cada cierto intervalo, con
+    espera exponencial mientras la base de datos no está disponible.
+    """
+
+    def __init__(self, reproductor, intervalo=5.0, espera_maxima=120.0):
+        super().__init__(name=f"reproductor-{os.path.basename(reproductor.registro.directorio)}", daemon=True)
+        self.reproductor = reproductor
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._reintento = 0.0    # time.monotonic() antes del cual no se reintenta
+
+    def solicitar(self):
+        self._despertar.set()
+
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+
+    def en_espera(self):
+        """Indica si la base falló hace poco y el hilo espera para reintentar."""
+        return time.monotonic() < self._reintento
+
+    def run(self):
+        espera = self.intervalo
+        while not self._detener.is_set():
+            try:
+                self.reproductor.reproducir()
+                espera = self.intervalo
+                self._reintento = 0.0
+                self._despertar.wait(espera)
+            except Exception:
+                espera = min(espera * 2, self.espera_maxima)
+                self._reintento = time.monotonic() + espera
+                # Durante la espera las escrituras nuevas no despiertan al hilo
+                self._detener.wait(espera)
+            self._despertar.clear()
+
+
+class Canal:
+    """
+    Une un registro durable con su reproductor. Escribir solo anexa y sincroniza a disco:
+    la latencia de registrar es la del disco local aunque la base no responda. Los
+    registros se aplican en el hilo del reproductor; una lectura llama antes a vaciar()
+    para ver lo que este proceso escribió.
+    """
+
+    def __init__(self, nombre, aplicar, errores_transitorios=(), directorio=DIRECTORIO_REGISTRO):
+        """
+        :param nombre: Subcarpeta del registro dentro de `directorio`.
+        :param aplicar: Función que aplica una lista de registros (ver Reproductor).
+        :param errores_transitorios: Excepciones de base de datos no disponible.
+        """
+        self.registro = RegistroDurable(os.path.join(directorio, nombre))
+        self.reproductor = Reproductor(self.registro, aplicar, errores_transitorios)
+        self._hilo = None
+        self._lock = threading.Lock()
+        # Número de la primera reproducción que incluye todo lo escrito por este proceso
+        self._necesaria = 0
+
+    def escribir(self, datos):
+        """
+        Guarda un registro de forma durable y lo deja para el reproductor. Si la base lo
+        rechaza al aplicarlo, queda en rechazados.jsonl.
+
+        :param datos: Diccionario del registro.
+        :return: El registro con su uuid.
+        """
+        registro = self.registro.agregar(datos)
+        self._avisar()
+        return registro
+
+    def escribir_lote(self, lista):
+        """
+        Guarda varios registros con un solo fsync y los deja para el reproductor.
+
+        :param lista: Lista de diccionarios de registros.
+        :return: Lista de los registros con su uuid.
+        """
+        registros = self.registro.agregar_lote(lista)
+        self._avisar()
+        return registros
+
+    def _avisar(self):
+        with self._lock:
+            self._necesaria = max(self._necesaria, self.reproductor.iniciadas + 1)
+        if APLICAR_EN_SEGUNDO_PLANO:
+            self.hilo().solicitar()
+
+    def hay_pendientes(self):
+        """Indica si algo escrito por este proceso puede no estar aplicado todavía."""
+        return self.reproductor.completada < self._necesaria
+
+    def pendientes(self):
+        """Devuelve los registros aún no aplicados; no lee el disco si no hay escrituras pendientes."""
+        return self.registro.pendientes() if self.hay_pendientes() else []
+
+    def vaciar(self):
+        """
+        Aplica los registros pendientes antes de una lectura, para que vea lo que este
+        proceso escribió. Si el reproductor está aplicando, espera a que termine. No
+        hace nada si no hay pendientes, si la base falló hace poco (el hilo espera para
+        reintentar) o si se llama desde la propia reproducción.
+
+        :return: True si no queda nada pendiente de este proceso.
+        """
+        if not self.hay_pendientes():
+            return True
+        if self.reproductor.reproduciendo() or (self._hilo is not None and self._hilo.en_espera()):
+            return False
+        try:
+            self.reproductor.reproducir()
+        except self.reproductor.errores_transitorios:
+            if APLICAR_EN_SEGUNDO_PLANO:
+                self.hilo().solicitar()
+            return False
+        return not self.hay_pendientes()
+
+    def _al_terminar(self):
+        # El hilo es daemon: lo escrito justo antes de salir (consola, CLI) se aplica aquí
+        try:
+            self.vaciar()
+        except Exception:
+            pass
+
+    def hilo(self):
+        """Devuelve el hilo reproductor del canal, iniciándolo en el primer uso."""
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = HiloReproductor(self.reproductor)
+                self._hilo.start()
+                atexit.register(self._al_terminar)
+            return self._hilo
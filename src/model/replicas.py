@@ -0,0 +1,169 @@
+"""
+Enrutamiento de conexiones entre el servidor primario de PostgreSQL y sus réplicas de lectura.
+
+Las escrituras van siempre al primario. Las lecturas se reparten entre las réplicas
+sanas cuyo retraso de replicación no supera un máximo; si ninguna cumple, se leen del
+primario. Después de una escritura, las lecturas de la misma clave (por defecto, el
+proceso) se envían al primario durante una ventana breve para que el usuario vea
+siempre sus propios cambios.
+
+Con persistente=True las conexiones no se abren en cada llamada: cada hilo conserva
+una por servidor y la reemplaza cuando se cierra o se pierde. Las usan las consultas
+frecuentes con sentencias preparadas (preparadas.py).
+"""
+
+import itertools
+import threading
+import time
+
+from src.model import trazas
+
+# Retraso de la réplica en segundos; 0 cuando ya aplicó todo lo recibido
+CONSULTA_RETRASO = """
+    SELECT pg_is_in_recovery(),
+           CASE
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END;
+"""
+
+
+class EnrutadorConexiones:
+    """
+    Entrega conexiones de escritura (primario) y de lectura (réplicas) según el tipo de operación.
+    """
+
+    def __init__(self, primaria, replicas=None, ventana_lectura_propia=5.0,
+                 retraso_maximo=10.0, intervalo_salud=5.0, tiempo_conexion=2):
+        """
+        :param primaria: Diccionario con los parámetros de conexión del primario.
+        :param replicas: Lista de diccionarios con los parámetros de cada réplica; los que
+            falten se toman del primario (normalmente basta con host y port).
+        :param ventana_lectura_propia: Segundos durante los que una clave lee del primario
+            después de escribir.
+        :param retraso_maximo: Retraso de replicación máximo aceptado, en segundos.
+        :param intervalo_salud: Segundos durante los que se reutiliza el estado de una réplica.
+        :param tiempo_conexion: Tiempo máximo de conexión al primario o a una réplica, en segundos.
+        """
+        self.primaria = dict(primaria)
+        self.replicas = [dict(self.primaria, **replica) for replica in (replicas or [])]
+        self.ventana_lectura_propia = ventana_lectura_propia
+        self.retraso_maximo = retraso_maximo
+        self.intervalo_salud = intervalo_salud
+        self.tiempo_conexion = tiempo_conexion
+
+        self._ultimas_escrituras = {}
+        self._estado = {}
+        self._turno = itertools.count()
+        self._lock = threading.Lock()
+        self._locales = threading.local()
+
+    def conexion_escritura(self, persistente=False):
+        """
+        Abre una conexión al primario.
+
+        :param persistente: Si es True, devuelve la conexión persistente del hilo.
+        """
+        return self._conectar(self.primaria, persistente, connect_timeout=self.tiempo_conexion)
+
+    def _conectar(self, parametros, persistente, **opciones):
+        import psycopg2
+        if not persistente:
+            return psycopg2.connect(**opciones, **parametros, **trazas.opciones_postgres())
+        conexiones = self._locales.__dict__.setdefault("conexiones", {})
+        clave = tuple(sorted(parametros.items()))
+        conn = conexiones.get(clave)
+        # closed es 1 si se cerró y 2 si se perdió (por ejemplo, el servidor se reinició)
+        if conn is None or conn.closed:
+            conn = conexiones[clave] = psycopg2.connect(**opciones, **parametros, **trazas.opciones_postgres())
+        return conn
+
+    def registrar_escritura(self, clave=None):
+        """
+        Marca que la clave acaba de escribir, para que sus próximas lecturas vayan al primario.
+
+        :param clave: Identificador del usuario o sesión; None representa al proceso.
+        """
+        with self._lock:
+            self._ultimas_escrituras[clave] = time.monotonic()
+
+    def _en_ventana_propia(self, clave):
+        with self._lock:
+            ultima = self._ultimas_escrituras.get(clave)
+        return ultima is not None and time.monotonic() - ultima < self.ventana_lectura_propia
+
+    def conexion_lectura(self, clave=None, persistente=False):
+        """
+        Abre una conexión para lectura, a una réplica sana o, si no hay, al primario.
+
+        :param clave: Identificador del usuario o sesión; None representa al proceso.
+        :param persistente: Si es True, devuelve la conexión persistente del hilo.
+        """
+        if not self.replicas or self._en_ventana_propia(clave):
+            return self.conexion_escritura(persistente)
+
+        import psycopg2
+
+        inicio = next(self._turno)
+        for desplazamiento in range(len(self.replicas)):
+            indice = (inicio + desplazamiento) % len(self.replicas)
+            if not self.replica_disponible(indice):
+                continue
+            try:
+                return self._conectar(self.replicas[indice], persistente, connect_timeout=self.tiempo_conexion)
+            except psycopg2.OperationalError:
+                self._marcar(indice, False, None)
+        return self.conexion_escritura(persistente)
+
+    def replica_disponible(self, indice):
+        """
+        Indica si una réplica está en línea, en recuperación y con retraso aceptable.
+        El resultado se reutiliza durante intervalo_salud segundos.
+
+        :param indice: Posición de la réplica en la lista.
+        """
+        with self._lock:
+            estado = self._estado.get(indice)
+        if estado is None or time.monotonic() - estado["verificado"] >= self.intervalo_salud:
+            estado = self.verificar_replica(indice)
+        return estado["sana"]
+
+    def verificar_replica(self, indice):
+        """
+        Consulta el estado y el retraso de replicación de una réplica.
+
+        :param indice: Posición de la réplica en la lista.
+        :return: Diccionario con las claves sana, retraso y verificado.
+        """
+        import psycopg2
+
+        try:
+            conn = psycopg2.connect(connect_timeout=self.tiempo_conexion, **self.replicas[indice], **trazas.opciones_postgres())
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(CONSULTA_RETRASO)
+                    en_recuperacion, retraso = cur.fetchone()
+            finally:
+                conn.close()
+        except psycopg2.Error:
+            return self._marcar(indice, False, None)
+
+        retraso = float(retraso)
+        return self._marcar(indice, en_recuperacion and retraso <= self.retraso_maximo, retraso)
+
+    def _marcar(self, indice, sana, retraso):
+        estado = {"sana": sana, "retraso": retraso, "verificado": time.monotonic()}
+        with self._lock:
+            self._estado[indice] = estado
+        return estado
+
+    def estado_replicas(self):
+        """
+        Verifica todas las réplicas y devuelve su estado.
+
+        :return: Lista de diccionarios con host, port, sana y retraso de cada réplica.
+        """
+        return [
+            dict(self.verificar_replica(indice), host=replica["host"], port=replica["port"])
+            for indice, replica in enumerate(self.replicas)
+        ]
@@ -0,0 +1,450 @@
+"""
+Escritores de reportes de actividades en varios formatos.
+
+Cada escritor recibe las filas de una en una y las escribe al archivo a medida que
+llegan, sin acumular el reporte en memoria, de modo que el consumo no depende del
+número de actividades del rango. El formato se elige por la extensión del archivo o
+explícitamente; se pueden agregar formatos con registrar_escritor.
+"""
+
+import abc
+import csv
+import html
+import io
+import os
+import re
+import time
+import zipfile
+
+from src.model import miniaturas, trazas
+from src.model.errores import ReporteError
+
+TITULO = "Reporte de actividades"
+SIN_ACTIVIDADES = "No hay actividades registradas en este rango de fechas."
+
+# (campo, encabezado) de las columnas de todos los formatos
+COLUMNAS = (
+    ("fecha", "Fecha"),
+    ("supervisor", "Supervisor"),
+    ("descripcion", "Descripción"),
+    ("anexos", "Anexos"),
+    ("responsable", "Responsable"),
+    ("clima", "Clima"),
+)
+
+
+def valor_celda(fila, campo):
+    """Devuelve el texto de una columna; los anexos referencian su vista previa."""
+    valor = fila.get(campo)
+    if valor is None:
+        return ""
+    if campo == "anexos":
+        return miniaturas.describir_anexos(valor) if valor else ""
+    return str(valor)
+
+
+class EscritorReporte(abc.ABC):
+    """
+    Interfaz de los escritores de reportes. Una subclase que no implemente abrir,
+    escribir_fila y cerrar no se puede instanciar. Uso:
+
+        with EscritorCSV("reporte.csv") as escritor:
+            for fila in filas:
+                escritor.escribir_fila(fila)
+    """
+
+    extension = None
+
+    def __init__(self, archivo):
+        """
+        :param archivo: Ruta del archivo de salida.
+        """
+        self.archivo = archivo
+        self.filas = 0
+
+    def __enter__(self):
+        self.abrir()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+
+    @abc.abstractmethod
+    def abrir(self):
+        """Crea el archivo de salida y escribe el encabezado."""
+
+    @abc.abstractmethod
+    def escribir_fila(self, fila):
+        """
+        Escribe una actividad.
+
+        :param fila: Diccionario (o Mapping) con los campos de la actividad.
+        """
+
+    @abc.abstractmethod
+    def cerrar(self):
+        """Escribe el final del reporte y cierra el archivo."""
+
+
+class EscritorTexto(EscritorReporte):
+    """Texto plano, una actividad por línea con columnas separadas por "|"."""
+
+    extension = "txt"
+
+    def abrir(self):
+        self._f = open(self.archivo, "w", encoding="utf-8")
+        self._f.write(f"{TITULO}\n")
+
+    def escribir_fila(self, fila):
+        self._f.write(" | ".join(valor_celda(fila, campo) for campo, _ in COLUMNAS) + "\n")
+        self.filas += 1
+
+    def cerrar(self):
+        if not self.filas:
+            self._f.write(f"{SIN_ACTIVIDADES}\n")
+        self._f.close()
+
+
+class EscritorCSV(EscritorReporte):
+    """CSV con encabezado; utf-8 con BOM para que las hojas de cálculo detecten la codificación."""
+
+    extension = "csv"
+
+    def abrir(self):
+        self._f = open(self.archivo, "w", encoding="utf-8-sig", newline="")
+        self._csv = csv.writer(self._f)
+        self._csv.writerow([encabezado for _, encabezado in COLUMNAS])
+
+    def escribir_fila(self, fila):
+        self._csv.writerow([valor_celda(fila, campo) for campo, _ in COLUMNAS])
+        self.filas += 1
+
+    def cerrar(self):
+        self._f.close()
+
+
+class EscritorHTML(EscritorReporte):
+    """Tabla HTML; los anexos de imagen se muestran con su miniatura enlazada a la vista previa."""
+
+    extension = "html"
+
+    def abrir(self):
+        self._f = open(self.archivo, "w", encoding="utf-8")
+        encabezados = "".join(f"<th>{html.escape(e)}</th>" for _, e in COLUMNAS)
+        self._f.write(
+            "<!DOCTYPE html>\n<html lang=\"es\"><head><meta charset=\"utf-8\">"
+            f"<title>{TITULO}</title><style>"
+            "body{font-family:sans-serif}table{border-collapse:collapse}"
+            "td,th{border:1px solid #ccc;padding:4px;vertical-align:top}"
+            "</style></head><body>\n"
+            f"<h1>{TITULO}</h1>\n<table>\n<thead><tr>{encabezados}</tr></thead>\n<tbody>\n"
+        )
+
+    def _anexos(self, anexos):
+        partes = []
+        for ruta in miniaturas.separar_anexos(anexos):
+            miniatura = miniaturas.obtener_miniatura(ruta)
+            vista_previa = miniaturas.obtener_vista_previa(ruta) if miniatura else None
+            if miniatura:
+                partes.append(
+                    f"<a href=\"{html.escape(vista_previa or ruta)}\">"
+                    f"<img src=\"{html.escape(miniatura)}\" alt=\"{html.escape(ruta)}\" loading=\"lazy\" height=\"64\"></a>"
+                )
+            else:
+                partes.append(html.escape(ruta))
+        return " ".join(partes)
+
+    def escribir_fila(self, fila):
+        celdas = []
+        for campo, _ in COLUMNAS:
+            if campo == "anexos":
+                celdas.append(self._anexos(fila.get("anexos") or ""))
+            else:
+                celdas.append(html.escape(valor_celda(fila, campo)))
+        self._f.write("<tr>" + "".join(f"<td>{c}</td>" for c in celdas) + "</tr>\n")
+        self.filas += 1
+
+    def cerrar(self):
+        self._f.write("</tbody>\n</table>\n")
+        if not self.filas:
+            self._f.write(f"<p>{SIN_ACTIVIDADES}</p>\n")
+        self._f.write("</body></html>\n")
+        self._f.close()
+
+
+# Caracteres de control no permitidos en XML 1.0
+_CONTROL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _texto_xml(valor):
+    return html.escape(_CONTROL_XML.sub("", valor), quote=False)
+
+
+class EscritorXLSX(EscritorReporte):
+    """
+    Hoja de cálculo Office Open XML. La hoja se escribe en streaming dentro del ZIP
+    con cadenas en línea, sin tabla de cadenas compartidas que crezca con el reporte.
+    Si se supera el límite de filas de una hoja, continúa en una hoja nueva.
+    """
+
+    extension = "xlsx"
+    MAX_FILAS_HOJA = 1048576
+
+    def abrir(self):
+        self._zip = zipfile.ZipFile(self.archivo, "w", compression=zipfile.ZIP_DEFLATED)
+        self._hojas = 0
+        self._nueva_hoja()
+
+    def _nueva_hoja(self):
+        self._hojas += 1
+        self._fila_hoja = 0
+        entrada = self._zip.open(f"xl/worksheets/sheet{self._hojas}.xml", "w", force_zip64=True)
+        self._hoja = io.TextIOWrapper(entrada, encoding="utf-8")
+        self._hoja.write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self._escribir_celdas([e for _, e in COLUMNAS])
+
+    def _cerrar_hoja(self):
+        self._hoja.write("</sheetData></worksheet>")
+        self._hoja.close()
+
+    def _escribir_celdas(self, valores):
+        self._fila_hoja += 1
+        self._hoja.write(
+            f'<row r="{self._fila_hoja}">'
+            + "".join(f'<c t="inlineStr"><is><t>{_texto_xml(v)}</t></is></c>' for v in valores)
+            + "</row>"
+        )
+
+    def escribir_fila(self, fila):
+        if self._fila_hoja >= self.MAX_FILAS_HOJA:
+            self._cerrar_hoja()
+            self._nueva_hoja()
+        self._escribir_celdas([valor_celda(fila, campo) for campo, _ in COLUMNAS])
+        self.filas += 1
+
+    def cerrar(self):
+        self._cerrar_hoja()
+        hojas = range(1, self._hojas + 1)
+        self._zip.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for n in hojas
+            )
+            + "</Types>"
+        ))
+        self._zip.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            "</Relationships>"
+        ))
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="Actividades {n}" sheetId="{n}" r:id="rId{n}"/>' for n in hojas)
+            + "</sheets></workbook>"
+        ))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{n}" Target="worksheets/sheet{n}.xml" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                for n in hojas
+            )
+            + "</Relationships>"
+        ))
+        self._zip.close()
+
+
+class EscritorPDF(EscritorReporte):
+    """
+    PDF con fuente Helvetica, en A4 horizontal. Cada página se escribe al completarse;
+    solo se conservan en memoria las posiciones de los objetos para la tabla xref.
+    """
+
+    extension = "pdf"
+    ANCHO, ALTO = 842, 595
+    MARGEN = 36
+    TAMANO_FUENTE = 7
+    INTERLINEADO = 9
+    MAX_CARACTERES = 220
+
+    # Objetos fijos: 1 catálogo, 2 árbol de páginas, 3 fuente
+    _CATALOGO, _PAGINAS, _FUENTE = 1, 2, 3
+
+    def abrir(self):
+        self._f = open(self.archivo, "wb")
+        self._posiciones = {}
+        self._paginas = []
+        self._siguiente_objeto = 4
+        self._lineas = []
+        self._lineas_por_pagina = (self.ALTO - 2 * self.MARGEN) // self.INTERLINEADO - 2
+        self._f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._objeto(self._FUENTE, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                   b"/Encoding /WinAnsiEncoding >>")
+
+    def _objeto(self, numero, contenido):
+        self._posiciones[numero] = self._f.tell()
+        self._f.write(b"%d 0 obj\n" % numero + contenido + b"\nendobj\n")
+
+    def _nuevo_numero(self):
+        numero = self._siguiente_objeto
+        self._siguiente_objeto += 1
+        return numero
+
+    @staticmethod
+    def _cadena(texto):
+        datos = texto.encode("cp1252", errors="replace")
+        return b"(" + datos.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    def _escribir_pagina(self):
+        encabezado = [TITULO, " | ".join(e for _, e in COLUMNAS)]
+        contenido = [
+            b"BT /F1 %d Tf %d TL %d %d Td" % (
+                self.TAMANO_FUENTE, self.INTERLINEADO, self.MARGEN, self.ALTO - self.MARGEN
+            )
+        ]
+        for linea in encabezado + self._lineas:
+            contenido.append(self._cadena(linea) + b" Tj T*")
+        contenido.append(b"ET")
+        flujo = b"\n".join(contenido)
+
+        numero_flujo = self._nuevo_numero()
+        self._objeto(numero_flujo, b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+        numero_pagina = self._nuevo_numero()
+        self._objeto(numero_pagina, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+        ) % (self._PAGINAS, self.ANCHO, self.ALTO, self._FUENTE, numero_flujo))
+        self._paginas.append(numero_pagina)
+        self._lineas = []
+
+    def escribir_fila(self, fila):
+        linea = " | ".join(valor_celda(fila, campo) for campo, _ in COLUMNAS).replace("\n", " ")
+        if len(linea) > self.MAX_CARACTERES:
+            linea = linea[:self.MAX_CARACTERES - 3] + "..."
+        self._lineas.append(linea)
+        self.filas += 1
+        if len(self._lineas) >= self._lineas_por_pagina:
+            self._escribir_pagina()
+
+    def cerrar(self):
+        if not self.filas:
+            self._lineas.append(SIN_ACTIVIDADES)
+        if self._lineas:
+            self._escribir_pagina()
+        hijos = b" ".join(b"%d 0 R" % n for n in self._paginas)
+        self._objeto(self._PAGINAS, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (hijos, len(self._paginas)))
+        self._objeto(self._CATALOGO, b"<< /Type /Catalog /Pages %d 0 R >>" % self._PAGINAS)
+
+        inicio_xref = self._f.tell()
+        total = self._siguiente_objeto
+        self._f.write(b"xref\n0 %d\n0000000000 65535 f \n" % total)
+        for numero in range(1, total):
+            self._f.write(b"%010d 00000 n \n" % self._posiciones[numero])
+        self._f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                      % (total, self._CATALOGO, inicio_xref))
+        self._f.close()
+
+
+ESCRITORES = {}
+
+
+def registrar_escritor(clase, formato=None):
+    """
+    Registra un escritor de reportes.
+
+    :param clase: Subclase de EscritorReporte.
+    :param formato: Nombre del formato; por defecto, la extensión de la clase.
+    """
+    ESCRITORES[(formato or clase.extension).lower()] = clase
+    return clase
+
+
+for _clase in (EscritorTexto, EscritorCSV, EscritorHTML, EscritorXLSX, EscritorPDF):
+    registrar_escritor(_clase)
+registrar_escritor(EscritorHTML, "htm")
+
+
+def obtener_escritor(archivo, formato=None):
+    """
+    Crea el escritor que corresponde al formato o, si no se indica, a la extensión del archivo.
+
+    :raises ReporteError: Si el formato no está registrado.
+    """
+    formato = (formato or os.path.splitext(archivo)[1].lstrip(".")).lower()
+    if formato not in ESCRITORES:
+        raise ReporteError(f"Formato de reporte no soportado: {formato or 'sin extensión'}.")
+    return ESCRITORES[formato](archivo)
+
+
+def con_progreso(filas, progreso, cada=1000):
+    """
+    Recorre las filas informando cuántas van cada `cada` filas y al terminar.
+
+    :param progreso: Función que recibe el número de filas recorridas, o None.
+    """
+    if progreso is None:
+        yield from filas
+        return
+    n = 0
+    for n, fila in enumerate(filas, 1):
+        yield fila
+        if n % cada == 0:
+            progreso(n)
+    progreso(n)
+
+
+def escribir_reporte(filas, archivo, formato=None, progreso=None):
+    """
+    Escribe un reporte consumiendo las filas a medida que se generan.
+
+    :param filas: Iterable de actividades (diccionarios o ActividadRecord).
+    :param archivo: Ruta del archivo de salida.
+    :param formato: Formato explícito ("pdf", "csv", "html", "xlsx", "txt").
+    :param progreso: Función opcional que recibe el número de filas escritas.
+    :return: Número de actividades escritas.
+    """
+    with trazas.tramo("escribir_reporte", "reportes") as tramo:
+        lectura = [0.0]
+        if tramo is not None:
+            filas = _medir_lectura(filas, lectura)
+        inicio = time.perf_counter()
+        filas = con_progreso(filas, progreso)
+        with obtener_escritor(archivo, formato) as escritor:
+            for fila in filas:
+                escritor.escribir_fila(fila)
+        if tramo is not None:
+            # Leer (consultas y conversión de filas) y escribir se intercalan por lotes;
+            # el tramo informa cuánto tiempo fue para cada cosa
+            total = time.perf_counter() - inicio
+            trazas.anotar(formato=escritor.extension, filas=escritor.filas,
+                          lectura_ms=round(lectura[0] * 1000, 1), escritura_ms=round((total - lectura[0]) * 1000, 1))
+    return escritor.filas
+
+
+def _medir_lectura(filas, acumulado):
+    """Recorre las filas sumando en acumulado[0] el tiempo que tarda en llegar cada una."""
+    iterador = iter(filas)
+    while True:
+        inicio = time.perf_counter()
+        try:
+            fila = next(iterador)
+        except StopIteration:
+            acumulado[0] += time.perf_counter() - inicio
+            return
+        acumulado[0] += time.perf_counter() - inicio
+        yield fila
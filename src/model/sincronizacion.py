@@ -0,0 +1,472 @@
+"""
+Diario local y sincronización con el servidor central para trabajar sin conexión.
+
+La aplicación Kivy registra cada actividad primero en un diario SQLite local, así que
+el registro funciona aunque no haya conexión con PostgreSQL. Un hilo de sincronización
+envía por lotes las actividades pendientes y trae los cambios remotos posteriores a
+una marca. Cada actividad lleva un uuid generado en el cliente, de modo que reintentar
+un lote ya aplicado no la duplica. Las consultas se responden desde el diario local.
+La misma actividad registrada dos veces (por ejemplo, con doble clic) se detecta por
+su huella de contenido antes de guardarla.
+"""
+
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+
+from src.model import cronologia, franjas, miniaturas, notificaciones
+from src.model.actividad import leer_fecha, validar_datos_actividad, validar_rango_fechas, validar_rangos
+from src.model.duplicados import huella_actividad
+from src.model.errores import ActividadDuplicadaError
+
+RUTA_DIARIO = "diario_local.db"
+
+# Se vuelven a leer los cambios de este margen anterior a la marca, para no perder
+# actividades de transacciones que confirmaron después de la última sincronización.
+MARGEN_MARCA = timedelta(minutes=5)
+
+ESQUEMA_DIARIO = [
+    """
+    CREATE TABLE IF NOT EXISTS actividades (
+        uuid TEXT PRIMARY KEY,
+        id_actividad INTEGER,
+        fecha TEXT NOT NULL,
+        supervisor TEXT,
+        descripcion TEXT NOT NULL,
+        anexos TEXT,
+        responsable TEXT,
+        clima TEXT,
+        estado TEXT,
+        tipo TEXT,
+        pendiente INTEGER NOT NULL DEFAULT 1,
+        intentos INTEGER NOT NULL DEFAULT 0,
+        ultimo_error TEXT,
+        creado TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        huella TEXT,
+        fecha_hora TEXT
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_diario_fecha ON actividades (fecha);",
+    "CREATE INDEX IF NOT EXISTS idx_diario_pendiente ON actividades (creado) WHERE pendiente = 1;",
+    "CREATE TABLE IF NOT EXISTS marcas (clave TEXT PRIMARY KEY, valor TEXT);",
+]
+
+# Índices de cobertura de la cronología (ver cronologia.py); las actividades pendientes
+# no tienen id_actividad, así que el orden es (fecha, creado, uuid)
+INDICES_CRONOLOGIA = [
+    f"CREATE INDEX IF NOT EXISTS idx_diario_{por}_fecha ON actividades ({por}, fecha, creado, uuid, "
+    f"{', '.join(c for c in cronologia.COLUMNAS if c not in (por, 'fecha'))}, pendiente);"
+    for por in cronologia.FILTROS
+]
+
+# Columnas necesarias en PostgreSQL para servidores creados antes de la sincronización
+MIGRACION_SERVIDOR = [
+    "ALTER TABLE actividades ADD COLUMN IF NOT EXISTS uuid UUID NOT NULL DEFAULT gen_random_uuid();",
+    "ALTER TABLE actividades ADD COLUMN IF NOT EXISTS modificado TIMESTAMPTZ NOT NULL DEFAULT now();",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_actividades_uuid ON actividades (uuid, fecha);",
+    "CREATE INDEX IF NOT EXISTS idx_actividades_modificado ON actividades (modificado, id_actividad);",
+    # El índice único de huella lo crea duplicados.depurar_postgres, después de depurar
+    "ALTER TABLE actividades ADD COLUMN IF NOT EXISTS huella CHAR(64);",
+    # Las actividades que llegan de los clientes y del registro durable no traen bitácora
+    "ALTER TABLE actividades ALTER COLUMN id_bitacora DROP NOT NULL;",
+] + franjas.MIGRACION_POSTGRES + cronologia.SENTENCIAS_POSTGRES
+
+COLUMNAS_CONSULTA = (
+    "uuid", "id_actividad", "fecha", "supervisor", "descripcion",
+    "anexos", "responsable", "clima", "estado", "tipo", "pendiente",
+)
+
+
+def preparar_servidor():
+    """Agrega al servidor PostgreSQL las columnas e índices que usa la sincronización."""
+    from src.model.database import get_connection
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            for sentencia in MIGRACION_SERVIDOR:
+                cur.execute(sentencia)
+        conn.commit()
+
+
+class DiarioLocal:
+    """
+    Almacén SQLite local con las actividades propias pendientes y las recibidas del servidor.
+    """
+
+    def __init__(self, ruta=RUTA_DIARIO):
+        """
+        :param ruta: Archivo SQLite del diario; se abre en el primer uso.
+        """
+        self.ruta = ruta
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _conexion(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.ruta, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            for sentencia in ESQUEMA_DIARIO:
+                conn.execute(sentencia)
+            # Diarios creados antes de la huella o de la hora
+            columnas = {fila["name"] for fila in conn.execute("PRAGMA table_info(actividades);")}
+            for columna in ("huella", "fecha_hora"):
+                if columna not in columnas:
+                    conn.execute(f"ALTER TABLE actividades ADD COLUMN {columna} TEXT;")
+            # No es único: el servidor puede tener duplicados anteriores a la huella
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_diario_huella ON actividades (huella);")
+            for sentencia in INDICES_CRONOLOGIA:
+                conn.execute(sentencia)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def registrar(self, datos_actividad, idempotente=False):
+        """
+        Registra una actividad en el diario local, con las mismas validaciones que
+        Actividad.registrar_actividad. Queda pendiente de enviar al servidor.
+
+        :param datos_actividad: Diccionario con los campos de la actividad.
+        :param idempotente: Si es True y la actividad ya está en el diario, devuelve la
+            existente en lugar de fallar.
+        :return: Diccionario de la actividad registrada, con su uuid.
+        :raises CamposVaciosError: Si falta alguno de los campos obligatorios.
+        :raises FechaInvalidaError: Si la fecha tiene un formato incorrecto.
+        :raises ActividadDuplicadaError: Si la actividad ya está en el diario y no es idempotente.
+        """
+        fecha_hora = validar_datos_actividad(datos_actividad)
+        fecha = fecha_hora.date()
+        actividad = {
+            "uuid": str(uuid.uuid4()),
+            "id_actividad": None,
+            "fecha": fecha,
+            "fecha_hora": fecha_hora if leer_fecha(datos_actividad["fecha"])[1] else None,
+            "supervisor": datos_actividad["supervisor"].strip(),
+            "descripcion": datos_actividad["descripcion"].strip(),
+            "anexos": (datos_actividad.get("anexos") or "").strip(),
+            "responsable": datos_actividad["responsable"].strip(),
+            "clima": (datos_actividad.get("clima") or "").strip(),
+            "estado": None,
+            "tipo": None,
+        }
+        huella = huella_actividad(actividad)
+        with self._lock:
+            conn = self._conexion()
+            existente = conn.execute(
+                f"SELECT {', '.join(COLUMNAS_CONSULTA)} FROM actividades WHERE huella = ? LIMIT 1;", (huella,)
+            ).fetchone()
+            if existente is not None:
+                if not idempotente:
+                    raise ActividadDuplicadaError()
+                return dict(existente, fecha=date.fromisoformat(existente["fecha"]),
+                            pendiente=bool(existente["pendiente"]))
+            conn.execute(
+                """
+                INSERT INTO actividades (uuid, fecha, fecha_hora, supervisor, descripcion, anexos, responsable,
+                                         clima, huella)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                (actividad["uuid"], fecha.isoformat(),
+                 actividad["fecha_hora"] and actividad["fecha_hora"].isoformat(sep=" ", timespec="minutes"),
+                 actividad["supervisor"], actividad["descripcion"], actividad["anexos"], actividad["responsable"],
+                 actividad["clima"], huella),
+            )
+            conn.commit()
+
+        miniaturas.encolar_anexos(actividad["anexos"])
+        notificaciones.publicar_local(actividad)
+        return actividad
+
+    def consultar(self, fecha_inicio, fecha_fin):
+        """
+        Consulta en el diario local las actividades de un rango de fechas.
+
+        :param fecha_inicio: Fecha de inicio en formato YYYY-MM-DD.
+        :param fecha_fin: Fecha de fin en formato YYYY-MM-DD.
+        :return: Lista de diccionarios; las actividades aún no enviadas tienen id_actividad None.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        with self._lock:
+            filas = self._conexion().execute(
+                f"""
+                SELECT {", ".join(COLUMNAS_CONSULTA)} FROM actividades
+                WHERE fecha BETWEEN ? AND ?
+                ORDER BY fecha, creado;
+                """,
+                (inicio.isoformat(), fin.isoformat()),
+            ).fetchall()
+        return [dict(fila, fecha=date.fromisoformat(fila["fecha"]), pendiente=bool(fila["pendiente"]))
+                for fila in filas]
+
+    def consultar_rangos(self, rangos):
+        """
+        Consulta en el diario local varios rangos de fechas con una sola consulta, como
+        Actividad.consultar_rangos.
+
+        :param rangos: Lista de tuplas (fecha_inicio, fecha_fin) en formato YYYY-MM-DD.
+        :return: Una lista de diccionarios por rango, en el orden de `rangos`.
+        :raises FechaInvalidaError: Si no hay rangos o alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si algún rango tiene el inicio después del fin.
+        """
+        validados = validar_rangos(rangos)
+        params = [valor for n, (inicio, fin) in enumerate(validados)
+                  for valor in (n, inicio.isoformat(), fin.isoformat())]
+        with self._lock:
+            filas = self._conexion().execute(
+                f"""
+                WITH rangos (n, inicio, fin) AS (VALUES {", ".join(["(?, ?, ?)"] * len(validados))})
+                SELECT rangos.n AS n_rango, {", ".join(f"a.{columna}" for columna in COLUMNAS_CONSULTA)}
+                FROM rangos JOIN actividades a ON a.fecha BETWEEN rangos.inicio AND rangos.fin
+                ORDER BY rangos.n, a.fecha, a.creado;
+                """,
+                params,
+            ).fetchall()
+        resultado = [[] for _ in validados]
+        for fila in filas:
+            fila = dict(fila)
+            resultado[fila.pop("n_rango")].append(
+                dict(fila, fecha=date.fromisoformat(fila["fecha"]), pendiente=bool(fila["pendiente"]))
+            )
+        return resultado
+
+    def cronologia(self, por, valor, fecha_inicio, fecha_fin, limite=cronologia.TAMANO_PAGINA, despues=None):
+        """
+        Devuelve una página de la cronología de un responsable o de un supervisor desde
+        el diario local, como Actividad.cronologia. El cursor es (fecha, creado, uuid).
+
+        :return: Tupla (actividades, cursor de la página siguiente o None).
+        :raises ValueError: Si el filtro no es responsable ni supervisor o el nombre está vacío.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        """
+        cronologia.validar_filtro(por, valor)
+        inicio, fin = validar_rango_fechas(fecha_inicio, fecha_fin)
+        condicion = f"{por} = ? AND fecha BETWEEN ? AND ?"
+        params = [valor.strip(), inicio.isoformat(), fin.isoformat()]
+        if despues is not None:
+            condicion += " AND (fecha, creado, uuid) > (?, ?, ?)"
+            params += list(despues)
+        with self._lock:
+            filas = self._conexion().execute(
+                f"""
+                SELECT uuid, creado, pendiente, {", ".join(cronologia.COLUMNAS)} FROM actividades
+                WHERE {condicion}
+                ORDER BY fecha, creado, uuid
+                LIMIT ?;
+                """,
+                params + [limite],
+            ).fetchall()
+        cursor = (filas[-1]["fecha"], filas[-1]["creado"], filas[-1]["uuid"]) if len(filas) == limite else None
+        actividades = [
+            dict(fila, fecha=date.fromisoformat(fila["fecha"]), fecha_hora=franjas.como_datetime(fila["fecha_hora"]),
+                 pendiente=bool(fila["pendiente"]))
+            for fila in filas
+        ]
+        for actividad in actividades:
+            del actividad["creado"]
+        return actividades, cursor
+
+    def pendientes(self, limite):
+        """Devuelve hasta `limite` actividades pendientes de enviar, en orden de registro."""
+        with self._lock:
+            filas = self._conexion().execute(
+                """
+                SELECT uuid, fecha, fecha_hora, supervisor, descripcion, anexos, responsable, clima, huella
+                FROM actividades WHERE pendiente = 1 ORDER BY creado LIMIT ?;
+                """,
+                (limite,),
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def contar_pendientes(self):
+        with self._lock:
+            return self._conexion().execute(
+                "SELECT count(*) FROM actividades WHERE pendiente = 1;"
+            ).fetchone()[0]
+
+    def marcar_enviadas(self, ids):
+        """
+        Marca como sincronizadas las actividades aceptadas por el servidor.
+
+        :param ids: Diccionario {uuid: id_actividad} devuelto por el servidor.
+        """
+        with self._lock:
+            conn = self._conexion()
+            conn.executemany(
+                "UPDATE actividades SET pendiente = 0, id_actividad = ?, ultimo_error = NULL WHERE uuid = ?;",
+                [(id_actividad, clave) for clave, id_actividad in ids.items()],
+            )
+            conn.commit()
+
+    def registrar_fallo(self, uuids, error):
+        """Anota un intento fallido de envío para las actividades indicadas."""
+        with self._lock:
+            conn = self._conexion()
+            conn.executemany(
+                "UPDATE actividades SET intentos = intentos + 1, ultimo_error = ? WHERE uuid = ?;",
+                [(error, clave) for clave in uuids],
+            )
+            conn.commit()
+
+    def aplicar_remotas(self, filas):
+        """
+        Guarda en el diario actividades recibidas del servidor. Aplicar la misma fila dos
+        veces no tiene efecto adicional.
+
+        :param filas: Filas del servidor (diccionarios con uuid, id_actividad, fecha...).
+        :return: Lista de las actividades que no estaban en el diario.
+        """
+        if not filas:
+            return []
+        with self._lock:
+            conn = self._conexion()
+            existentes = {
+                fila[0] for fila in conn.execute(
+                    f"SELECT uuid FROM actividades WHERE uuid IN ({', '.join('?' * len(filas))});",
+                    [fila["uuid"] for fila in filas],
+                )
+            }
+            conn.executemany(
+                """
+                INSERT INTO actividades (uuid, id_actividad, fecha, fecha_hora, supervisor, descripcion, anexos,
+                                         responsable, clima, estado, tipo, huella, pendiente)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT (uuid) DO UPDATE SET
+                    id_actividad = excluded.id_actividad, fecha = excluded.fecha, fecha_hora = excluded.fecha_hora,
+                    supervisor = excluded.supervisor, descripcion = excluded.descripcion,
+                    anexos = excluded.anexos, responsable = excluded.responsable,
+                    clima = excluded.clima, estado = excluded.estado, tipo = excluded.tipo,
+                    huella = excluded.huella, pendiente = 0;
+                """,
+                [
+                    (f["uuid"], f["id_actividad"], str(f["fecha"]), f.get("fecha_hora") and str(f["fecha_hora"]),
+                     f["supervisor"], f["descripcion"], f["anexos"], f["responsable"], f["clima"], f["estado"],
+                     f["tipo"], huella_actividad(f))
+                    for f in filas
+                ],
+            )
+            conn.commit()
+        return [dict(f) for f in filas if f["uuid"] not in existentes]
+
+    def obtener_marca(self):
+        """Devuelve la marca (modificado, id_actividad) de la última actividad recibida."""
+        with self._lock:
+            fila = self._conexion().execute("SELECT valor FROM marcas WHERE clave = 'remota';").fetchone()
+        if fila is None:
+            return None, 0
+        modificado, id_actividad = fila[0].rsplit("|", 1)
+        return datetime.fromisoformat(modificado), int(id_actividad)
+
+    def guardar_marca(self, modificado, id_actividad):
+        with self._lock:
+            conn = self._conexion()
+            conn.execute(
+                "INSERT INTO marcas (clave, valor) VALUES ('remota', ?) "
+                "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor;",
+                (f"{modificado.isoformat()}|{id_actividad}",),
+            )
+            conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class MotorSincronizacion(threading.Thread):
+    """
+    Hilo que envía las actividades pendientes del diario y trae los cambios del servidor.
+    Si el servidor no responde, reintenta con espera exponencial.
+    """
+
+    def __init__(self, diario, intervalo=30.0, lote=200, espera_maxima=300.0):
+        """
+        :param diario: DiarioLocal a sincronizar.
+        :param intervalo: Segundos entre sincronizaciones cuando hay conexión.
+        :param lote: Número de actividades por envío o recepción.
+        :param espera_maxima: Espera máxima entre reintentos sin conexión, en segundos.
+        """
+        super().__init__(name="sincronizacion", daemon=True)
+        self.diario = diario
+        self.intervalo = intervalo
+        self.lote = lote
+        self.espera_maxima = espera_maxima
+        self.ultimo_error = None
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+
+    def solicitar(self):
+        """Pide una sincronización inmediata, por ejemplo tras registrar una actividad."""
+        self._despertar.set()
+
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+
+    def run(self):
+        espera = self.intervalo
+        while not self._detener.is_set():
+            try:
+                self.sincronizar()
+                self.ultimo_error = None
+                espera = self.intervalo
+            except Exception as e:
+                # Sin conexión o servidor caído: se conserva todo en el diario y se reintenta
+                self.ultimo_error = str(e)
+                espera = min(espera * 2, self.espera_maxima)
+            self._despertar.wait(espera)
+            self._despertar.clear()
+
+    def sincronizar(self):
+        """
+        Ejecuta un ciclo completo de envío y recepción.
+
+        :return: Tupla (enviadas, recibidas).
+        """
+        return self.enviar(), self.recibir()
+
+    def enviar(self):
+        from src.model import database
+
+        enviadas = 0
+        while True:
+            pendientes = self.diario.pendientes(self.lote)
+            if not pendientes:
+                break
+            try:
+                ids = database.insertar_actividades_lote(pendientes)
+            except Exception as e:
+                self.diario.registrar_fallo([p["uuid"] for p in pendientes], str(e))
+                raise
+            self.diario.marcar_enviadas(ids)
+            enviadas += len(pendientes)
+            if len(pendientes) < self.lote:
+                break
+        return enviadas
+
+    def recibir(self):
+        from src.model import database
+
+        modificado, id_actividad = self.diario.obtener_marca()
+        desde = (modificado - MARGEN_MARCA, 0) if modificado else (None, 0)
+        ultima = (modificado, id_actividad)
+        recibidas = 0
+        while True:
+            filas = database.obtener_actividades_modificadas_desde(*desde, limite=self.lote)
+            if not filas:
+                break
+            for actividad in self.diario.aplicar_remotas(filas):
+                notificaciones.publicar_local(actividad)
+                recibidas += 1
+            desde = (filas[-1]["modificado"], filas[-1]["id_actividad"])
+            if ultima[0] is None or desde > ultima:
+                ultima = desde
+            if len(filas) < self.lote:
+                break
+        if ultima[0] is not None:
+            self.diario.guardar_marca(*ultima)
+        return recibidas
@@ -0,0 +1,372 @@
+"""
+Cola local de trabajos de reporte, persistida en SQLite y atendida por procesos.
+
+encolar() devuelve el id del trabajo de inmediato; un grupo de procesos de trabajo
+toma los pendientes, ejecuta generar_reporte y va guardando el progreso, que se
+consulta con estado(). Una solicitud idéntica a otra pendiente o en curso devuelve el
+mismo trabajo en lugar de generar el reporte dos veces. Los reportes terminados se
+eliminan (archivo y registro) después de `retencion_dias`.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from src.model import trazas
+from src.model.actividad import validar_rango_fechas
+from src.model.errores import ReporteError
+
+RUTA_COLA = "trabajos_reportes.db"
+DIRECTORIO_SALIDA = "reportes_generados"
+RETENCION_DIAS = 7
+
+PENDIENTE, EN_CURSO, TERMINADO, ERROR = "pendiente", "en_curso", "terminado", "error"
+ORIGENES = ("bitacora", "actividad")
+
+ESQUEMA_COLA = [
+    """
+    CREATE TABLE IF NOT EXISTS trabajos (
+        id TEXT PRIMARY KEY,
+        clave TEXT NOT NULL,
+        origen TEXT NOT NULL,
+        fecha_inicio TEXT NOT NULL,
+        fecha_fin TEXT NOT NULL,
+        formato TEXT NOT NULL,
+        id_bitacora INTEGER,
+        archivo TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        filas INTEGER NOT NULL DEFAULT 0,
+        total INTEGER,
+        error TEXT,
+        pid INTEGER,
+        creado TEXT NOT NULL,
+        iniciado TEXT,
+        terminado TEXT
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado, creado);",
+    "CREATE INDEX IF NOT EXISTS idx_trabajos_clave ON trabajos (clave, estado);",
+]
+
+
+def _ahora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ColaReportes:
+    """
+    Cola de trabajos de reporte con su grupo de procesos de trabajo.
+    """
+
+    def __init__(self, ruta=RUTA_COLA, directorio_salida=DIRECTORIO_SALIDA, procesos=2,
+                 retencion_dias=RETENCION_DIAS, intervalo=0.5):
+        """
+        :param ruta: Archivo SQLite de la cola.
+        :param directorio_salida: Carpeta donde quedan los reportes terminados.
+        :param procesos: Número de procesos de trabajo.
+        :param retencion_dias: Días que se conservan los reportes terminados o fallidos.
+        :param intervalo: Segundos entre consultas de la cola cuando no hay trabajos.
+        """
+        self.ruta = ruta
+        self.directorio_salida = directorio_salida
+        self.procesos = procesos
+        self.retencion_dias = retencion_dias
+        self.intervalo = intervalo
+        self._trabajadores = []
+        self._detener = None
+        self._preparada = False
+
+    def _conexion(self):
+        # Varias conexiones de distintos procesos comparten el archivo: WAL y espera por bloqueo
+        conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._preparada:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            for sentencia in ESQUEMA_COLA:
+                conn.execute(sentencia)
+            self._preparada = True
+        return conn
+
+    # ---- Solicitudes ----
+
+    def encolar(self, fecha_inicio, fecha_fin, nombre="reporte.pdf", formato=None, origen="bitacora",
+                id_bitacora=None):
+        """
+        Encola un reporte y devuelve su id sin esperar a que se genere. Si hay un reporte
+        pregenerado vigente para la misma solicitud, el trabajo nace terminado con él.
+
+        :param fecha_inicio: Fecha de inicio (YYYY-MM-DD).
+        :param fecha_fin: Fecha de fin (YYYY-MM-DD).
+        :param nombre: Nombre del archivo; su extensión define el formato si no se indica.
+        :param formato: Formato explícito del reporte.
+        :param origen: "bitacora" (PostgreSQL) o "actividad" (SQLAlchemy).
+        :param id_bitacora: Si se indica, el reporte incluye solo esa bitácora (origen "bitacora").
+        :return: Id del trabajo, o el de uno idéntico que ya está pendiente o en curso.
+        :raises FechaInvalidaError: Si alguna fecha no es válida.
+        :raises RangoFechasInvalidoError: Si la fecha de inicio es posterior a la fecha de fin.
+        :raises ReporteError: Si el nombre del archivo o el origen no son válidos.
+        """
+        from src.model.bitacora import PATRON_ARCHIVO_REPORTE
+
+        validar_rango_fechas(fecha_inicio, fecha_fin)
+        if origen not in ORIGENES:
+            raise ReporteError(f"Origen de reporte desconocido: {origen}.")
+        if not nombre or not re.match(PATRON_ARCHIVO_REPORTE, nombre):
+            raise ReporteError("El nombre del archivo es inválido.")
+        formato = (formato or os.path.splitext(nombre)[1].lstrip(".")).lower()
+        clave = hashlib.sha256(
+            f"{origen}|{fecha_inicio}|{fecha_fin}|{formato}|{id_bitacora}".encode()
+        ).hexdigest()
+        pregenerado = None
+        if origen == "bitacora":
+            from src.model.programador import obtener_pregenerado
+            pregenerado = obtener_pregenerado(fecha_inicio, fecha_fin, formato, id_bitacora)
+
+        conn = self._conexion()
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            existente = conn.execute(
+                "SELECT id FROM trabajos WHERE clave = ? AND estado IN (?, ?) LIMIT 1;",
+                (clave, PENDIENTE, EN_CURSO),
+            ).fetchone()
+            if existente:
+                conn.execute("COMMIT;")
+                return existente["id"]
+            id_trabajo = uuid.uuid4().hex
+            archivo = os.path.join(self.directorio_salida, f"{id_trabajo[:8]}_{nombre}")
+            estado, terminado = PENDIENTE, None
+            if pregenerado:
+                _copiar(pregenerado, archivo)
+                estado, terminado = TERMINADO, _ahora()
+            conn.execute(
+                """
+                INSERT INTO trabajos (id, clave, origen, fecha_inicio, fecha_fin, formato, id_bitacora,
+                                      archivo, estado, creado, terminado)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                (id_trabajo, clave, origen, fecha_inicio, fecha_fin, formato, id_bitacora,
+                 archivo, estado, _ahora(), terminado),
+            )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        finally:
+            conn.close()
+        if estado == PENDIENTE:
+            trazas.enlazar(id_trabajo)
+            self.iniciar()
+        return id_trabajo
+
+    def estado(self, id_trabajo):
+        """
+        Devuelve el estado de un trabajo: estado, filas escritas, total, progreso (0 a 1
+        si se conoce el total), archivo y error.
+
+        :return: Diccionario, o None si el trabajo no existe o ya se eliminó.
+        """
+        conn = self._conexion()
+        try:
+            fila = conn.execute("SELECT * FROM trabajos WHERE id = ?;", (id_trabajo,)).fetchone()
+        finally:
+            conn.close()
+        if fila is None:
+            return None
+        trabajo = dict(fila)
+        if trabajo["estado"] == TERMINADO:
+            trabajo["progreso"] = 1.0
+        elif trabajo["total"]:
+            trabajo["progreso"] = min(trabajo["filas"] / trabajo["total"], 1.0)
+        else:
+            trabajo["progreso"] = None
+        return trabajo
+
+    def listar(self, limite=20):
+        """Devuelve los trabajos más recientes, del más nuevo al más antiguo."""
+        conn = self._conexion()
+        try:
+            filas = conn.execute("SELECT id FROM trabajos ORDER BY creado DESC LIMIT ?;", (limite,)).fetchall()
+        finally:
+            conn.close()
+        return [self.estado(fila["id"]) for fila in filas]
+
+    def limpiar(self):
+        """
+        Aplica la política de retención: elimina los reportes terminados o fallidos
+        más antiguos que `retencion_dias`, con sus archivos.
+
+        :return: Número de trabajos eliminados.
+        """
+        limite = (datetime.now() - timedelta(days=self.retencion_dias)).isoformat(timespec="seconds")
+        conn = self._conexion()
+        try:
+            vencidos = conn.execute(
+                "SELECT id, archivo FROM trabajos WHERE estado IN (?, ?) AND terminado < ?;",
+                (TERMINADO, ERROR, limite),
+            ).fetchall()
+            for vencido in vencidos:
+                try:
+                    os.remove(vencido["archivo"])
+                except FileNotFoundError:
+                    pass
+            conn.executemany("DELETE FROM trabajos WHERE id = ?;", [(v["id"],) for v in vencidos])
+        finally:
+            conn.close()
+        return len(vencidos)
+
+    # ---- Procesos de trabajo ----
+
+    def iniciar(self):
+        """Inicia los procesos de trabajo si no están en marcha."""
+        if any(p.is_alive() for p in self._trabajadores):
+            return
+        self._recuperar_interrumpidos()
+        self.limpiar()
+        # spawn evita heredar el estado de Kivy o conexiones abiertas del proceso principal
+        import multiprocessing
+        contexto = multiprocessing.get_context("spawn")
+        self._detener = contexto.Event()
+        self._trabajadores = [
+            contexto.Process(
+                target=_ejecutar_trabajador,
+                args=(self.ruta, self.directorio_salida, self.retencion_dias, self.intervalo, self._detener),
+                name=f"reportes-{n}",
+                daemon=True,
+            )
+            for n in range(self.procesos)
+        ]
+        for proceso in self._trabajadores:
+            proceso.start()
+
+    def detener(self, espera=5.0):
+        """Pide a los procesos que terminen tras el trabajo en curso y los espera."""
+        if self._detener is not None:
+            self._detener.set()
+        for proceso in self._trabajadores:
+            proceso.join(espera)
+        self._trabajadores = []
+
+    def _recuperar_interrumpidos(self):
+        # Trabajos que quedaron en curso porque su proceso terminó de forma abrupta
+        conn = self._conexion()
+        try:
+            en_curso = conn.execute("SELECT id, pid FROM trabajos WHERE estado = ?;", (EN_CURSO,)).fetchall()
+            for trabajo in en_curso:
+                if trabajo["pid"] is None or not _proceso_vivo(trabajo["pid"]):
+                    conn.execute(
+                        "UPDATE trabajos SET estado = ?, pid = NULL, filas = 0 WHERE id = ? AND estado = ?;",
+                        (PENDIENTE, trabajo["id"], EN_CURSO),
+                    )
+        finally:
+            conn.close()
+
+    def tomar(self):
+        """Marca como en curso el trabajo pendiente más antiguo y lo devuelve, o None."""
+        conn = self._conexion()
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            fila = conn.execute(
+                "SELECT * FROM trabajos WHERE estado = ? ORDER BY creado LIMIT 1;", (PENDIENTE,)
+            ).fetchone()
+            if fila is not None:
+                conn.execute(
+                    "UPDATE trabajos SET estado = ?, pid = ?, iniciado = ? WHERE id = ?;",
+                    (EN_CURSO, os.getpid(), _ahora(), fila["id"]),
+                )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        finally:
+            conn.close()
+        return dict(fila) if fila else None
+
+    @trazas.trazado("trabajos")
+    def ejecutar(self, trabajo):
+        """Genera el reporte de un trabajo tomado y registra el resultado."""
+        trazas.enlazar(trabajo["id"], fin=True)
+        conn = self._conexion()
+
+        def actualizar(**campos):
+            asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+            conn.execute(f"UPDATE trabajos SET {asignaciones} WHERE id = ?;", (*campos.values(), trabajo["id"]))
+
+        # El reporte se escribe con un nombre temporal y se mueve al terminar, así nunca
+        # se entrega un archivo a medio escribir
+        temporal = f"trabajo_{trabajo['id']}.{trabajo['formato']}"
+        try:
+            fechas = (trabajo["fecha_inicio"], trabajo["fecha_fin"])
+            progreso = lambda filas: actualizar(filas=filas)
+            if trabajo["origen"] == "actividad":
+                from src.model.actividad import Actividad
+                modelo = Actividad()
+                actualizar(total=modelo.contar_actividades(*fechas))
+                modelo.generar_reporte(*fechas, temporal, trabajo["formato"], progreso=progreso)
+            else:
+                from src.model.bitacora import Bitacora
+                from src.model.database import Database
+                modelo = Bitacora(Database())
+                actualizar(total=modelo.contar_entradas(*fechas, id_bitacora=trabajo["id_bitacora"]))
+                modelo.generar_reporte(*fechas, temporal, trabajo["formato"], progreso=progreso,
+                                       id_bitacora=trabajo["id_bitacora"])
+            os.makedirs(os.path.dirname(trabajo["archivo"]) or ".", exist_ok=True)
+            os.replace(temporal, trabajo["archivo"])
+            actualizar(estado=TERMINADO, terminado=_ahora(), pid=None)
+        except Exception as e:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            actualizar(estado=ERROR, error=str(e), terminado=_ahora(), pid=None)
+        finally:
+            conn.close()
+
+
+def _copiar(origen, destino):
+    # Un enlace duro evita copiar el contenido; si el sistema de archivos no lo admite, se copia
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    try:
+        os.link(origen, destino)
+    except OSError:
+        import shutil
+        shutil.copyfile(origen, destino)
+
+
+def _ejecutar_trabajador(ruta, directorio_salida, retencion_dias, intervalo, detener):
+    from src.model import perfilado, trazas
+    perfilado.activar_desde_entorno()
+    trazas.activar_desde_entorno()
+    cola = ColaReportes(ruta, directorio_salida, retencion_dias=retencion_dias, intervalo=intervalo)
+    ultima_limpieza = time.monotonic()
+    while not detener.is_set():
+        trabajo = cola.tomar()
+        if trabajo is None:
+            detener.wait(intervalo)
+        else:
+            cola.ejecutar(trabajo)
+        if time.monotonic() - ultima_limpieza > 3600:
+            cola.limpiar()
+            ultima_limpieza = time.monotonic()
+
+
+_cola = None
+
+
+def obtener_cola():
+    """Devuelve la cola de reportes del proceso, creándola en el primer uso."""
+    global _cola
+    if _cola is None:
+        _cola = ColaReportes()
+    return _cola
@@ -0,0 +1,378 @@
+"""
+Trazas de extremo a extremo: de la acción del usuario hasta cada sentencia SQL.
+
+Se activa con la variable de entorno BITACORA_TRAZA=<directorio> (consola, aplicación
+Kivy y procesos de reportes en segundo plano) o con `main_console.py --traza
+<directorio> ...`. Entonces se registran tramos (spans) anidados:
+
+    kivy / consola   FormularioBase.ejecutar_accion y los manejadores del menú
+    modelo           cada método público de Actividad, Bitacora y Usuario
+    sql / postgres   cada sentencia ejecutada por SQLAlchemy o psycopg2
+    reportes         la escritura de un reporte, con el tiempo de lectura de filas
+                     separado del de escritura
+
+El tramo actual se guarda en una variable de contexto (contextvars), así que cada hilo
+tiene su propia pila. Las tareas enviadas a otro hilo o a un grupo de hilos heredan el
+tramo con propagar(funcion), y un trabajo encolado para otro proceso se une con
+enlazar() al tramo que lo ejecuta, por ejemplo el reporte que genera la cola.
+
+Cada proceso escribe sus tramos en <directorio>/traza-<fecha>-<pid>.json, en el formato
+Trace Event de Chrome (arreglo JSON, ts y dur en microsegundos), que abren Perfetto
+(ui.perfetto.dev) y chrome://tracing. El archivo se escribe a medida que se llena el
+búfer y el arreglo queda sin cerrar, cosa que el formato admite: sigue siendo legible
+si el proceso termina de golpe. unir() junta los archivos de todos los procesos en uno.
+
+Sin la variable no se envuelve nada y cada tramo cuesta una comparación.
+"""
+
+import atexit
+import contextvars
+import functools
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.model import instrumentacion
+
+VARIABLE = "BITACORA_TRAZA"
+TAMANO_BUFER = 1000    # eventos que se juntan antes de escribir
+INTERVALO_ESCRITURA = 1.0
+LARGO_SQL = 200        # caracteres de cada sentencia guardados en la traza
+
+_activo = None         # True mientras se traza
+_directorio = None
+_actual = contextvars.ContextVar("tramo_actual", default=None)
+_lock = threading.Lock()
+_eventos = []
+_hilos_nombrados = set()
+_ids = itertools.count(1)
+_archivo = None
+_ultima_escritura = 0.0
+_cursores_trazados = {}
+_ConexionTrazada = None
+
+
+class Tramo:
+    """Un tramo abierto: su nombre, categoría, argumentos e inicio."""
+
+    __slots__ = ("nombre", "categoria", "args", "id", "padre", "inicio", "reloj", "token")
+
+    def __init__(self, nombre, categoria, args, padre):
+        self.nombre = nombre
+        self.categoria = categoria
+        self.args = args
+        self.id = next(_ids)
+        self.padre = padre
+        self.inicio = time.time_ns() // 1000
+        self.reloj = time.perf_counter()
+        self.token = None
+
+
+def activo():
+    return _activo is not None
+
+
+def activar(directorio):
+    """
+    Empieza a registrar tramos y envuelve los métodos públicos de las clases del
+    modelo. Llamarla de nuevo no los vuelve a envolver.
+
+    :param directorio: Carpeta de los archivos de traza; se crea si no existe.
+    """
+    global _activo, _directorio
+    os.makedirs(directorio, exist_ok=True)
+    # Los procesos hijos (por ejemplo, los de la cola de reportes) heredan la activación
+    os.environ[VARIABLE] = directorio
+    with _lock:
+        ya_activo = _activo is not None
+        _activo = True
+        if _directorio != directorio and _archivo is not None:
+            _cerrar_archivo()
+        _directorio = directorio
+    if ya_activo:
+        return
+    instrumentacion.envolver_metodos("trazas", lambda metodo, nombre: trazado("modelo", nombre)(metodo))
+    _escuchar_sqlalchemy(True)
+    atexit.register(escribir)
+
+
+def desactivar():
+    """Restaura los métodos originales, escribe los tramos pendientes y deja de trazar."""
+    global _activo
+    _escuchar_sqlalchemy(False)
+    with _lock:
+        _activo = None
+    instrumentacion.restaurar_metodos("trazas")
+    escribir()
+    with _lock:
+        _cerrar_archivo()
+    atexit.unregister(escribir)
+    os.environ.pop(VARIABLE, None)
+
+
+def activar_desde_entorno():
+    """Activa las trazas si la variable BITACORA_TRAZA indica un directorio."""
+    directorio = os.environ.get(VARIABLE)
+    if directorio:
+        activar(directorio)
+
+
+# ---- Tramos ----
+
+def iniciar(nombre, categoria="app", **args):
+    """
+    Abre un tramo hijo del actual y lo deja como actual. Para casos en que el inicio y
+    el fin están en funciones distintas; en los demás, usar tramo().
+
+    :return: El tramo, o None si las trazas no están activas.
+    """
+    if _activo is None:
+        return None
+    abierto = Tramo(nombre, categoria, args, _actual.get())
+    abierto.token = _actual.set(abierto)
+    return abierto
+
+
+def terminar(abierto, error=None):
+    """Cierra un tramo abierto con iniciar() y restaura el anterior como actual."""
+    if abierto is None:
+        return
+    duracion = int((time.perf_counter() - abierto.reloj) * 1e6)
+    try:
+        _actual.reset(abierto.token)
+    except ValueError:
+        # Se cerró desde otro contexto; el actual de ese contexto queda como estaba
+        pass
+    args = dict(abierto.args, id=abierto.id)
+    if abierto.padre is not None:
+        args["padre"] = abierto.padre.id
+    if error is not None:
+        args["error"] = f"{type(error).__name__}: {error}"
+    _agregar({
+        "name": abierto.nombre, "cat": abierto.categoria, "ph": "X",
+        "ts": abierto.inicio, "dur": duracion, "args": args,
+    })
+
+
+@contextmanager
+def tramo(nombre, categoria="app", **args):
+    """Registra como tramo el bloque del with; los tramos abiertos dentro son sus hijos."""
+    abierto = iniciar(nombre, categoria, **args)
+    try:
+        yield abierto
+    except BaseException as e:
+        terminar(abierto, e)
+        raise
+    terminar(abierto)
+
+
+def trazado(categoria="app", nombre=None):
+    """Decorador que registra cada llamada a la función como un tramo."""
+
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _activo is None:
+                return funcion(*args, **kwargs)
+            with tramo(etiqueta, categoria):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def anotar(**args):
+    """Agrega argumentos al tramo actual (por ejemplo, el número de filas)."""
+    actual = _actual.get()
+    if actual is not None:
+        actual.args.update(args)
+
+
+def propagar(funcion):
+    """
+    Devuelve la función para ejecutarse en otro hilo dentro del tramo actual. Uso:
+
+        executor.submit(trazas.propagar(tarea), ...)
+        threading.Thread(target=trazas.propagar(tarea)).start()
+    """
+    if _activo is None:
+        return funcion
+    padre = _actual.get()
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        token = _actual.set(padre)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            _actual.reset(token)
+
+    return envoltura
+
+
+def enlazar(clave, fin=False):
+    """
+    Une dos tramos, aunque estén en hilos o procesos distintos, con una flecha en el
+    visor: se llama con fin=False dentro del tramo que origina el trabajo y con
+    fin=True dentro del que lo ejecuta, con la misma clave (por ejemplo, el id del
+    trabajo).
+    """
+    if _activo is None or _actual.get() is None:
+        return
+    evento = {"name": "enlace", "cat": "enlace", "ph": "f" if fin else "s", "id": str(clave),
+              "ts": time.time_ns() // 1000}
+    if fin:
+        evento["bp"] = "e"
+    _agregar(evento)
+
+
+# ---- SQL ----
+
+def _resumir_sql(sentencia):
+    if isinstance(sentencia, bytes):
+        sentencia = sentencia.decode("utf-8", errors="replace")
+    return " ".join(str(sentencia).split())[:LARGO_SQL]
+
+
+def _antes_de_ejecutar(conexion, cursor, sentencia, parametros, contexto, varias):
+    conexion.info.setdefault("trazas", []).append(
+        iniciar("SQL", "sql", sql=_resumir_sql(sentencia), varias=varias)
+    )
+
+
+def _despues_de_ejecutar(conexion, cursor, sentencia, parametros, contexto, varias):
+    pila = conexion.info.get("trazas")
+    if pila:
+        terminar(pila.pop())
+
+
+def _al_fallar(contexto_error):
+    pila = contexto_error.connection.info.get("trazas") if contexto_error.connection is not None else None
+    if pila:
+        terminar(pila.pop(), contexto_error.original_exception)
+
+
+def _escuchar_sqlalchemy(escuchar):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    for nombre, funcion in (("before_cursor_execute", _antes_de_ejecutar),
+                            ("after_cursor_execute", _despues_de_ejecutar),
+                            ("handle_error", _al_fallar)):
+        if escuchar and not event.contains(Engine, nombre, funcion):
+            event.listen(Engine, nombre, funcion)
+        elif not escuchar and event.contains(Engine, nombre, funcion):
+            event.remove(Engine, nombre, funcion)
+
+
+def opciones_postgres():
+    """
+    Opciones de psycopg2.connect para trazar las sentencias de la conexión: con las
+    trazas activas, una connection_factory cuyos cursores registran cada execute.
+    """
+    global _ConexionTrazada
+    if _activo is None:
+        return {}
+    if _ConexionTrazada is None:
+        import psycopg2.extensions
+
+        class ConexionTrazada(psycopg2.extensions.connection):
+            def cursor(self, *args, **kwargs):
+                base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+                kwargs["cursor_factory"] = _cursor_trazado(base)
+                return super().cursor(*args, **kwargs)
+
+        _ConexionTrazada = ConexionTrazada
+    return {"connection_factory": _ConexionTrazada}
+
+
+def _cursor_trazado(base):
+    """Devuelve (y guarda) una subclase del cursor que registra execute y executemany."""
+    clase = _cursores_trazados.get(base)
+    if clase is None:
+        def execute(self, query, vars=None):
+            with tramo("SQL", "postgres", sql=_resumir_sql(query)):
+                return base.execute(self, query, vars)
+
+        def executemany(self, query, vars_list):
+            with tramo("SQL", "postgres", sql=_resumir_sql(query), varias=True):
+                return base.executemany(self, query, vars_list)
+
+        clase = _cursores_trazados[base] = type(f"{base.__name__}Trazado", (base,), {
+            "execute": execute, "executemany": executemany,
+        })
+    return clase
+
+
+# ---- Escritura ----
+
+def _agregar(evento):
+    hilo = threading.get_native_id()
+    evento["pid"] = os.getpid()
+    evento["tid"] = hilo
+    with _lock:
+        if hilo not in _hilos_nombrados:
+            _hilos_nombrados.add(hilo)
+            _eventos.append({"name": "thread_name", "ph": "M", "pid": evento["pid"], "tid": hilo,
+                             "args": {"name": threading.current_thread().name}})
+        _eventos.append(evento)
+        pendiente = len(_eventos) >= TAMANO_BUFER or time.monotonic() - _ultima_escritura > INTERVALO_ESCRITURA
+    if pendiente:
+        escribir()
+
+
+def escribir():
+    """Escribe en el archivo del proceso los tramos cerrados que están en el búfer."""
+    global _archivo, _ultima_escritura
+    with _lock:
+        _ultima_escritura = time.monotonic()
+        if not _eventos:
+            return
+        if _archivo is None:
+            ruta = os.path.join(_directorio, f"traza-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.json")
+            _archivo = open(ruta, "w", encoding="utf-8")
+            _archivo.write("[\n")
+            _archivo.write(json.dumps({"name": "process_name", "ph": "M", "pid": os.getpid(),
+                                       "args": {"name": f"bitácora {os.getpid()}"}}) + ",\n")
+        _archivo.write("".join(json.dumps(evento, ensure_ascii=False) + ",\n" for evento in _eventos))
+        _archivo.flush()
+        _eventos.clear()
+
+
+def _cerrar_archivo():
+    global _archivo
+    if _archivo is not None:
+        _archivo.close()
+        _archivo = None
+    _hilos_nombrados.clear()
+
+
+def leer(ruta):
+    """Lee un archivo de traza, aunque el arreglo haya quedado sin cerrar."""
+    with open(ruta, encoding="utf-8") as archivo:
+        texto = archivo.read().rstrip().rstrip(",")
+    if not texto.endswith("]"):
+        texto += "]"
+    return json.loads(texto)
+
+
+def unir(directorio, salida):
+    """
+    Junta en un solo archivo las trazas de todos los procesos, para abrirlas juntas.
+
+    :return: Número de eventos escritos.
+    """
+    eventos = []
+    for ruta in sorted(glob.glob(os.path.join(directorio, "traza-*.json"))):
+        eventos.extend(leer(ruta))
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, archivo, ensure_ascii=False)
+    return len(eventos)
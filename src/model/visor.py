@@ -0,0 +1,138 @@
+"""
+Lectura paginada de reportes generados, para verlos dentro de la aplicación.
+
+El archivo se mapea en memoria (mmap) en lugar de leerse: abrirlo no depende de su
+tamaño y el sistema operativo trae del disco solo las páginas que se muestran. El
+índice guarda únicamente el desplazamiento en bytes donde empieza cada página de
+LINEAS_POR_PAGINA líneas. Se construye a medida que se avanza y, si se pide, completo
+en un hilo aparte (indexar) para conocer el total de páginas y saltar al final.
+
+Se pueden ver los reportes de texto: txt, csv y html (sin etiquetas, una fila por línea).
+"""
+
+import html
+import mmap
+import re
+import threading
+from array import array
+
+from src.model.errores import ReporteError
+
+FORMATOS_VISIBLES = ("txt", "csv", "html")
+LINEAS_POR_PAGINA = 50
+_BOM = b"\xef\xbb\xbf"
+_SEPARADOR_CELDAS = re.compile(r"</t[dh]>\s*<t[dh][^>]*>")
+_ETIQUETA = re.compile(r"<[^>]*>")
+
+
+def formato_visible(ruta):
+    """Devuelve el formato del reporte según su extensión, o None si el visor no lo muestra."""
+    extension = ruta.rsplit(".", 1)[-1].lower() if "." in ruta else ""
+    return extension if extension in FORMATOS_VISIBLES else None
+
+
+def linea_html(linea):
+    """Convierte una línea del reporte HTML en texto, con las celdas separadas por " | "."""
+    return " ".join(html.unescape(_ETIQUETA.sub(" ", _SEPARADOR_CELDAS.sub(" | ", linea))).split())
+
+
+class VisorReporte:
+    """
+    Páginas de un reporte de texto mapeado en memoria.
+    """
+
+    def __init__(self, ruta, lineas_por_pagina=LINEAS_POR_PAGINA):
+        """
+        :param ruta: Archivo del reporte.
+        :param lineas_por_pagina: Líneas de cada página.
+        :raises ReporteError: Si el formato no se puede ver o el archivo no se puede abrir.
+        """
+        self.formato = formato_visible(ruta)
+        if self.formato is None:
+            raise ReporteError(f"El visor solo muestra reportes {', '.join(FORMATOS_VISIBLES)}.")
+        self.lineas_por_pagina = lineas_por_pagina
+        try:
+            self._archivo = open(ruta, "rb")
+        except OSError as e:
+            raise ReporteError(f"No se pudo abrir el reporte: {e}")
+        try:
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Un archivo vacío no se puede mapear
+            self._mapa = b""
+        self.tamano = len(self._mapa)
+        inicio = len(_BOM) if self._mapa[:len(_BOM)] == _BOM else 0
+        self._inicios = array("Q", [inicio])
+        self._completo = inicio >= self.tamano
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+
+    def cerrar(self):
+        self._completo = True
+        with self._lock:
+            if isinstance(self._mapa, mmap.mmap):
+                self._mapa.close()
+            self._archivo.close()
+
+    def _fin_de_pagina(self, inicio):
+        # mmap.find recorre en C; el bucle de Python es de una vuelta por línea de la página
+        posicion = inicio
+        for _ in range(self.lineas_por_pagina):
+            posicion = self._mapa.find(b"\n", posicion) + 1
+            if posicion == 0:
+                return self.tamano
+        return posicion
+
+    def _indexar_hasta(self, pagina):
+        """Extiende el índice hasta conocer el inicio de la página indicada o el final."""
+        with self._lock:
+            while not self._completo and len(self._inicios) <= pagina:
+                fin = self._fin_de_pagina(self._inicios[-1])
+                if fin >= self.tamano:
+                    self._completo = True
+                else:
+                    self._inicios.append(fin)
+
+    def indexar(self, bloque=1000):
+        """
+        Completa el índice de páginas. Pensado para un hilo aparte: avanza de a
+        `bloque` páginas liberando el lock entre bloques, así la página visible se
+        puede leer mientras tanto.
+        """
+        while not self._completo:
+            self._indexar_hasta(len(self._inicios) + bloque)
+
+    @property
+    def total_paginas(self):
+        """Número de páginas, o None si el índice todavía no está completo."""
+        return len(self._inicios) if self._completo else None
+
+    @property
+    def paginas_conocidas(self):
+        return len(self._inicios)
+
+    def pagina(self, numero):
+        """
+        Devuelve el texto de una página.
+
+        :param numero: Número de página desde 0.
+        :raises IndexError: Si el reporte tiene menos páginas.
+        """
+        if numero < 0:
+            raise IndexError(numero)
+        self._indexar_hasta(numero + 1)
+        with self._lock:
+            if numero >= len(self._inicios):
+                raise IndexError(numero)
+            inicio = self._inicios[numero]
+            fin = self._inicios[numero + 1] if numero + 1 < len(self._inicios) else self._fin_de_pagina(inicio)
+            contenido = self._mapa[inicio:fin]
+        texto = contenido.decode("utf-8", errors="replace").rstrip("\r\n")
+        if self.formato == "html":
+            texto = "\n".join(filter(None, (linea_html(linea) for linea in texto.splitlines())))
+        return texto
@@ -0,0 +1,205 @@
+"""
+Subcomandos de línea de órdenes para operaciones por lotes.
+
+Pensados para scripts y tuberías: todo corre en un solo proceso sobre el engine de
+SQLAlchemy (una conexión del pool que se reutiliza en cada lote), la salida se escribe
+a medida que se leen las actividades y los errores van a stderr con código de salida
+distinto de cero. Sin subcomando, main_console.py abre el menú interactivo.
+
+Ejemplos (desde la raíz del proyecto):
+    python main_console.py registrar actividades.jsonl otras.csv
+    python main_console.py consultar 2024-01-01 2024-12-31 --formato csv > 2024.csv
+    python main_console.py reporte 2024-01-01 2024-01-31 enero.xlsx
+    python main_console.py --perfil perfiles reporte 2024-01-01 2024-12-31 anual.csv
+    python main_console.py --traza trazas reporte 2024-01-01 2024-12-31 anual.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+from src.model import trazas
+from src.model.actividad_record import CAMPOS
+from src.model.errores import ArchivoEntradaError, BaseError
+from src.model.sesion import obtener_sesion
+
+FORMATOS_ENTRADA = ("jsonl", "csv")
+FORMATOS_SALIDA = ("jsonl", "csv")
+
+
+def formato_de_archivo(ruta, formato=None):
+    """Devuelve el formato de un archivo de entrada: el indicado o el de su extensión (jsonl por defecto)."""
+    if formato:
+        return formato
+    return "csv" if ruta.lower().endswith(".csv") else "jsonl"
+
+
+def leer_jsonl(archivo, nombre="-"):
+    """Genera un diccionario por cada línea no vacía de un archivo JSON por línea."""
+    for numero, linea in enumerate(archivo, 1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError as e:
+            raise ArchivoEntradaError(f"{nombre}:{numero}: JSON inválido ({e.msg}).")
+        if not isinstance(datos, dict):
+            raise ArchivoEntradaError(f"{nombre}:{numero}: se esperaba un objeto JSON.")
+        yield datos
+
+
+def leer_csv(archivo, nombre="-"):
+    """Genera un diccionario por fila de un CSV con encabezado (fecha, supervisor, ...)."""
+    lector = csv.DictReader(archivo)
+    faltantes = {"fecha", "supervisor", "descripcion", "responsable"} - set(lector.fieldnames or ())
+    if faltantes:
+        raise ArchivoEntradaError(f"{nombre}: faltan columnas en el encabezado: {', '.join(sorted(faltantes))}.")
+    yield from lector
+
+
+def _abrir_entrada(ruta):
+    if ruta == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    return open(ruta, encoding="utf-8-sig", newline="")
+
+
+def comando_registrar(args, actividad_model):
+    total, errores = 0, 0
+    for ruta in args.archivos:
+        formato = formato_de_archivo(ruta, args.formato)
+        leer = leer_csv if formato == "csv" else leer_jsonl
+        leidas = 0
+
+        def contar(filas):
+            nonlocal leidas
+            for leidas, fila in enumerate(filas, 1):
+                yield fila
+
+        with _abrir_entrada(ruta) as archivo:
+            try:
+                registradas, invalidas = actividad_model.registrar_actividades(
+                    contar(leer(archivo, ruta)), args.lote, omitir_invalidas=args.omitir_invalidas,
+                    idempotente=args.idempotente,
+                )
+            except ArchivoEntradaError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+            except BaseError as e:
+                print(f"{ruta}: actividad {leidas}: {e} Las anteriores quedaron registradas; "
+                      f"use --omitir-invalidas para continuar.", file=sys.stderr)
+                return 1
+        for posicion, error in invalidas:
+            print(f"{ruta}: actividad {posicion}: {error}", file=sys.stderr)
+        total += registradas
+        errores += len(invalidas)
+        print(f"{ruta}: {registradas} actividades registradas", file=sys.stderr)
+    if len(args.archivos) > 1:
+        print(f"Total: {total} actividades registradas, {errores} omitidas", file=sys.stderr)
+    return 1 if errores else 0
+
+
+def escribir_jsonl(actividades, salida):
+    for actividad in actividades:
+        salida.write(json.dumps(dict(actividad), ensure_ascii=False, default=str) + "\n")
+
+
+def escribir_csv(actividades, salida):
+    escritor = csv.writer(salida, lineterminator="\n")
+    escritor.writerow(CAMPOS)
+    for actividad in actividades:
+        escritor.writerow([actividad[campo] for campo in CAMPOS])
+
+
+def comando_consultar(args, actividad_model):
+    actividades = actividad_model.iterar_actividades(args.fecha_inicio, args.fecha_fin, args.lote)
+    escribir = escribir_csv if args.formato == "csv" else escribir_jsonl
+    escribir(actividades, sys.stdout)
+    sys.stdout.flush()
+    return 0
+
+
+def comando_reporte(args, actividad_model):
+    if args.origen == "bitacora":
+        from src.model.bitacora import Bitacora
+        from src.model.database import Database
+        Bitacora(Database()).generar_reporte(
+            args.fecha_inicio, args.fecha_fin, args.archivo, args.formato, id_bitacora=args.id_bitacora
+        )
+    else:
+        actividad_model.generar_reporte(args.fecha_inicio, args.fecha_fin, args.archivo, args.formato)
+    print(f"Reporte generado: {args.archivo}", file=sys.stderr)
+    return 0
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="main_console.py",
+        description="Bitácora de obra. Sin subcomando se abre el menú interactivo.",
+    )
+    parser.add_argument("--perfil", metavar="DIRECTORIO",
+                        help="guardar perfiles de CPU y memoria de cada operación del modelo (ver perfilado.py)")
+    parser.add_argument("--traza", metavar="DIRECTORIO",
+                        help="guardar trazas de cada operación hasta el SQL, para Perfetto (ver trazas.py)")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    registrar = subcomandos.add_parser("registrar", help="registrar actividades desde archivos JSONL o CSV")
+    registrar.add_argument("archivos", nargs="+", metavar="ARCHIVO", help='archivo de entrada; "-" lee de stdin')
+    registrar.add_argument("--formato", choices=FORMATOS_ENTRADA,
+                           help="formato de entrada; por defecto según la extensión (jsonl si no es .csv)")
+    registrar.add_argument("--lote", type=int, default=500, help="actividades por transacción")
+    registrar.add_argument("--omitir-invalidas", action="store_true",
+                           help="informar las actividades inválidas y seguir con las demás")
+    registrar.add_argument("--idempotente", action="store_true",
+                           help="omitir sin error las actividades ya registradas (para reintentar una carga)")
+    registrar.set_defaults(funcion=comando_registrar)
+
+    consultar = subcomandos.add_parser("consultar", help="escribir en stdout las actividades de un rango")
+    consultar.add_argument("fecha_inicio", metavar="FECHA_INICIO", help="YYYY-MM-DD")
+    consultar.add_argument("fecha_fin", metavar="FECHA_FIN", help="YYYY-MM-DD")
+    consultar.add_argument("--formato", choices=FORMATOS_SALIDA, default="jsonl")
+    consultar.add_argument("--lote", type=int, default=1000, help="filas leídas de la base por viaje")
+    consultar.set_defaults(funcion=comando_consultar)
+
+    reporte = subcomandos.add_parser("reporte", help="generar un reporte en este proceso")
+    reporte.add_argument("fecha_inicio", metavar="FECHA_INICIO", help="YYYY-MM-DD")
+    reporte.add_argument("fecha_fin", metavar="FECHA_FIN", help="YYYY-MM-DD")
+    reporte.add_argument("archivo", metavar="ARCHIVO", help="archivo de salida (.pdf, .csv, .html, .xlsx o .txt)")
+    reporte.add_argument("--formato", help="formato del reporte; por defecto según la extensión")
+    reporte.add_argument("--origen", choices=("actividad", "bitacora"), default="actividad",
+                         help="actividad: base SQLAlchemy; bitacora: PostgreSQL")
+    reporte.add_argument("--id-bitacora", type=int, help="solo esa bitácora (origen bitacora)")
+    reporte.set_defaults(funcion=comando_reporte)
+    return parser
+
+
+def main(argv=None):
+    """
+    Ejecuta un subcomando y devuelve el código de salida.
+
+    :param argv: Argumentos sin el nombre del programa; por defecto sys.argv[1:].
+    """
+    args = crear_parser().parse_args(argv)
+    if args.perfil:
+        from src.model import perfilado
+        perfilado.activar(args.perfil)
+    if args.traza:
+        trazas.activar(args.traza)
+    if not obtener_sesion():
+        print("Error: Debes iniciar sesión primero (opción 5 del menú interactivo).", file=sys.stderr)
+        return 1
+
+    from src.model.actividad import Actividad
+    try:
+        with trazas.tramo(f"cli.{args.comando}", "consola"):
+            return args.funcion(args, Actividad())
+    except (BaseError, ValueError, OSError) as e:
+        if isinstance(e, BrokenPipeError):
+            # El lector de la tubería terminó antes (por ejemplo, `| head`)
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return 0
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
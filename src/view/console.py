@@ -11,6 +11,10 @@ from src.model.usuario import Usuario
 from src.model.errores import *
 from src.model.sesion import guardar_sesion, obtener_sesion, cerrar_sesion
 from src.model.database import Database
+from src.model.cronologia import TAMANO_PAGINA
+from src.model.franjas import NOMBRES_TURNO
+from src.model.trabajos import obtener_cola
+from src.model import perfilado, trazas
 
 # Instancias de modelos
 actividad_model = Actividad(Database)
@@ -30,9 +34,14 @@ def mostrar_menu():
     print("5. Iniciar sesión")
     print("6. Cambiar contraseña")
     print("7. Cerrar sesión")
+    print("8. Estado de reportes")
+    print("9. Actividades por hora, turno o día")
+    print("10. Cronología de un responsable o supervisor")
+    print("11. Registrar actividad recurrente")
     print("0. Salir")
 
 
+@trazas.trazado("consola")
 def registrar_actividad():
     """Registra una nueva actividad. Requiere sesión activa."""
     usuario = obtener_sesion()
@@ -41,7 +50,7 @@ def registrar_actividad():
         return
 
     datos = {
-        "fecha": input("Fecha (YYYY-MM-DD): "),
+        "fecha": input("Fecha (YYYY-MM-DD o YYYY-MM-DD HH:MM): "),
         "supervisor": input("Supervisor: "),
         "descripcion": input("Descripción: "),
         "anexos": input("Anexos: "),
@@ -56,46 +65,160 @@ def registrar_actividad():
         print(f"Error: {str(e)}")
 
 
+@trazas.trazado("consola")
+def registrar_recurrente():
+    """Registra una actividad que se repite hasta una fecha. Requiere sesión activa."""
+    if not obtener_sesion():
+        print("Error: Debes iniciar sesión primero.")
+        return
+
+    datos = {
+        "fecha": input("Primera fecha (YYYY-MM-DD o YYYY-MM-DD HH:MM): "),
+        "supervisor": input("Supervisor: "),
+        "descripcion": input("Descripción: "),
+        "anexos": input("Anexos: "),
+        "responsable": input("Responsable: "),
+        "clima": input("Clima: ")
+    }
+    frecuencia = input("Frecuencia (diaria, laborables, semanal): ").strip().lower()
+    intervalo = 1
+    if frecuencia != "laborables":
+        texto = input("Repetir cada cuántos días o semanas [1]: ").strip()
+        intervalo = int(texto) if texto.isdigit() else 1
+    hasta = input("Hasta (YYYY-MM-DD): ")
+    omitir = input("¿Omitir las que ya estén registradas? (s/N): ").strip().lower() == "s"
+
+    try:
+        registradas = actividad_model.registrar_recurrente(datos, frecuencia, hasta, intervalo, idempotente=omitir)
+        print(f"Se registraron {registradas} actividades.")
+    except (BaseError, ValueError) as e:
+        print(f"Error: {str(e)}")
+
+
+@trazas.trazado("consola")
 def consultar_actividades():
-    """Consulta actividades entre dos fechas. Requiere sesión activa."""
+    """
+    Consulta actividades entre dos fechas. Se pueden agregar más rangos (por ejemplo,
+    para comparar semanas); todos se consultan a la vez. Requiere sesión activa.
+    """
     if not obtener_sesion():
         print("Error: Debes iniciar sesión primero.")
         return
 
-    fi = input("Fecha inicio (YYYY-MM-DD): ")
-    ff = input("Fecha fin (YYYY-MM-DD): ")
+    rangos = [(input("Fecha inicio (YYYY-MM-DD): "), input("Fecha fin (YYYY-MM-DD): "))]
+    while input("¿Agregar otro rango? (s/N): ").strip().lower() == "s":
+        rangos.append((input("Fecha inicio (YYYY-MM-DD): "), input("Fecha fin (YYYY-MM-DD): ")))
 
     try:
-        actividades = actividad_model.consultar_actividades(fi, ff)
-        if actividades:
-            print("\nActividades encontradas:")
-            for a in actividades:
-                print(a)
+        if len(rangos) == 1:
+            resultados = [actividad_model.consultar_actividades(*rangos[0])]
         else:
-            print("No se encontraron actividades.")
+            resultados = actividad_model.consultar_rangos(rangos)
+        for (fi, ff), actividades in zip(rangos, resultados):
+            if len(rangos) > 1:
+                print(f"\n=== {fi.strip()} a {ff.strip()}: {len(actividades)} actividades ===")
+            if actividades:
+                print("\nActividades encontradas:")
+                for a in actividades:
+                    print(a)
+            else:
+                print("No se encontraron actividades.")
     except BaseError as e:
         print(f"Error: {str(e)}")
 
 
+@trazas.trazado("consola")
 def generar_reporte():
-    """Genera un reporte PDF. Requiere sesión activa."""
+    """Encola un reporte y muestra su id sin esperar a que termine. Requiere sesión activa."""
     if not obtener_sesion():
         print("Error: Debes iniciar sesión primero.")
         return
 
     fi = input("Fecha inicio (YYYY-MM-DD): ")
     ff = input("Fecha fin (YYYY-MM-DD): ")
-    pdf = input("Nombre del archivo PDF (sin extensión): ")
+    nombre = input("Nombre del archivo (.pdf, .csv, .html, .xlsx o .txt; sin extensión = PDF): ").strip()
+    if nombre and "." not in nombre:
+        nombre += ".pdf"
 
     try:
-        if bitacora_model.generar_reporte(fi, ff, pdf):
-            print("Reporte generado exitosamente.")
-        else:
-            print("No hay actividades en ese rango de fechas.")
+        id_trabajo = obtener_cola().encolar(fi, ff, nombre)
+        print(f"Reporte en cola con id {id_trabajo}. Consulte su avance con la opción 8.")
     except BaseError as e:
         print(f"Error: {str(e)}")
 
 
+@trazas.trazado("consola")
+def estado_reportes():
+    """Muestra el estado y el avance de los reportes recientes."""
+    trabajos = obtener_cola().listar()
+    if not trabajos:
+        print("No hay reportes en cola.")
+        return
+    for t in trabajos:
+        avance = f"{t['progreso']:.0%}" if t["progreso"] is not None else f"{t['filas']} filas"
+        detalle = t["archivo"] if t["estado"] == "terminado" else (t["error"] or "")
+        print(f"{t['id']} | {t['fecha_inicio']} a {t['fecha_fin']} | {t['estado']} | {avance} | {detalle}")
+
+
+@trazas.trazado("consola")
+def actividades_por_franja():
+    """Muestra cuántas actividades hubo por hora, turno o día en un rango. Requiere sesión activa."""
+    if not obtener_sesion():
+        print("Error: Debes iniciar sesión primero.")
+        return
+
+    fi = input("Desde (YYYY-MM-DD o YYYY-MM-DD HH:MM): ")
+    ff = input("Hasta (YYYY-MM-DD o YYYY-MM-DD HH:MM): ")
+    franja = input("Franja (hora, turno o dia) [hora]: ").strip() or "hora"
+
+    try:
+        conteo = actividad_model.contar_por_franja(fi, ff, franja)
+    except (BaseError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        return
+    if not conteo:
+        print("No se encontraron actividades.")
+    for inicio, cantidad in conteo.items():
+        if franja == "turno":
+            etiqueta = f"{inicio:%Y-%m-%d} {NOMBRES_TURNO[inicio.hour]}"
+        elif franja == "hora":
+            etiqueta = f"{inicio:%Y-%m-%d %H:00}"
+        else:
+            etiqueta = f"{inicio:%Y-%m-%d}"
+        print(f"{etiqueta} | {cantidad}")
+
+
+@trazas.trazado("consola")
+def cronologia():
+    """Muestra por páginas las actividades de un responsable o supervisor. Requiere sesión activa."""
+    if not obtener_sesion():
+        print("Error: Debes iniciar sesión primero.")
+        return
+
+    por = input("Buscar por (responsable o supervisor) [responsable]: ").strip() or "responsable"
+    nombre = input("Nombre: ")
+    fi = input("Fecha inicio (YYYY-MM-DD): ")
+    ff = input("Fecha fin (YYYY-MM-DD): ")
+
+    # Cada página sigue a la anterior por cursor, sin volver a recorrer las ya mostradas
+    cursor, mostradas = None, 0
+    while True:
+        try:
+            actividades, cursor = actividad_model.cronologia(por, nombre, fi, ff, TAMANO_PAGINA, cursor)
+        except (BaseError, ValueError) as e:
+            print(f"Error: {str(e)}")
+            return
+        for a in actividades:
+            hora = f"{a['fecha_hora']:%H:%M}" if a["fecha_hora"] else "     "
+            print(f"{a['fecha']} {hora} | {a['descripcion']} | {a['estado'] or ''} | {a['tipo'] or ''}")
+        mostradas += len(actividades)
+        if not mostradas:
+            print("No se encontraron actividades.")
+        if cursor is None or input("Enter para ver más, q para terminar: ").strip().lower() == "q":
+            return
+
+
+@trazas.trazado("consola")
 def crear_cuenta():
     """Crea una nueva cuenta de usuario y la inicia automáticamente."""
     nombre = input("Nombre: ")
@@ -110,6 +233,7 @@ def crear_cuenta():
         print(f"Error: {str(e)}")
 
 
+@trazas.trazado("consola")
 def iniciar_sesion():
     """Permite a un usuario iniciar sesión."""
     correo = input("Correo: ")
@@ -123,6 +247,7 @@ def iniciar_sesion():
         print(f"Error: {str(e)}")
 
 
+@trazas.trazado("consola")
 def cambiar_contrasena():
     """Permite cambiar la contraseña del usuario autenticado. Cierra sesión por seguridad."""
     usuario = obtener_sesion()
@@ -140,6 +265,7 @@ def cambiar_contrasena():
         print(f"Error: {str(e)}")
 
 
+@trazas.trazado("consola")
 def cerrar_sesion_consola():
     """Cierra la sesión activa."""
     if obtener_sesion():
@@ -151,6 +277,8 @@ def cerrar_sesion_consola():
 
 def main():
     """Ejecuta el menú principal."""
+    perfilado.activar_desde_entorno()
+    trazas.activar_desde_entorno()
     while True:
         mostrar_menu()
         opcion = input("Seleccione una opción: ").strip()
@@ -169,7 +297,16 @@ def main():
             cambiar_contrasena()
         elif opcion == "7":
             cerrar_sesion_consola()
+        elif opcion == "8":
+            estado_reportes()
+        elif opcion == "9":
+            actividades_por_franja()
+        elif opcion == "10":
+            cronologia()
+        elif opcion == "11":
+            registrar_recurrente()
         elif opcion == "0":
+            obtener_cola().detener()
             print("Hasta luego.")
             break
         else:
@@ -1,5 +1,6 @@
 import sys
 import os
+import threading
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from kivy.app import App
@@ -9,9 +10,10 @@ from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
 from kivy.uix.scrollview import ScrollView
-from kivy.uix.popup import Popup
 from kivy.metrics import dp
+from kivy.clock import Clock
 from functools import partial
+from datetime import datetime
 
 from src.model.database import Database
 from src.model.actividad import Actividad
@@ -19,6 +21,9 @@ from src.model.bitacora import Bitacora
 from src.model.usuario import Usuario
 from src.model.errores import *
 from src.model.sesion import guardar_sesion, obtener_sesion, cerrar_sesion
+from src.model import miniaturas, notificaciones, trazas, visor
+from src.model.sincronizacion import DiarioLocal, MotorSincronizacion
+from src.model.trabajos import obtener_cola
 
 # Inicialización de lógica
 import src.model.database as db
@@ -26,6 +31,9 @@ actividad_model = Actividad(db)
 bitacora_model = Bitacora(db)
 usuario_model = Usuario(db)  # <- Aquí sin pasar db
 
+# Las actividades se registran y consultan en el diario local y se sincronizan en segundo plano
+diario_local = DiarioLocal()
+
 
 class MenuPrincipal(Screen):
     def __init__(self, **kwargs):
@@ -41,6 +49,7 @@ class MenuPrincipal(Screen):
         opciones = [
             ("Registrar actividad", "registro"),
             ("Consultar actividades", "consulta"),
+            ("Cronología de una persona", "cronologia"),
             ("Generar reporte", "reporte"),
             ("Crear cuenta de usuario", "crear_cuenta"),
             ("Iniciar sesión", "login"),
@@ -72,7 +81,7 @@ class MenuPrincipal(Screen):
             self.btn_logout.disabled = True
 
     def cambiar_pantalla(self, screen_name, instance):
-        if screen_name in ["registro", "consulta", "reporte", "cambiar_contrasena"] and not obtener_sesion():
+        if screen_name in ["registro", "consulta", "cronologia", "reporte", "cambiar_contrasena"] and not obtener_sesion():
             self.mostrar_popup("Debes iniciar sesión primero.")
         else:
             self.manager.current = screen_name
@@ -86,6 +95,7 @@ class MenuPrincipal(Screen):
                     input_widget.text = ""
 
     def mostrar_popup(self, mensaje):
+        from kivy.uix.popup import Popup
         popup = Popup(title='Advertencia',
                       content=Label(text=mensaje),
                       size_hint=(None, None), size=(400, 200))
@@ -128,14 +138,15 @@ class FormularioBase(Screen):
     def ejecutar_accion(self, instance):
         try:
             valores = [self.inputs[c].text for c in self.campos]
-            mensaje = self.accion(*valores)
+            with trazas.tramo(f"{type(self).__name__}.ejecutar_accion", "kivy"):
+                mensaje = self.accion(*valores)
             self.resultado.text = f"[color=00ff00]{mensaje}[/color]"
         except BaseError as e:
             self.resultado.text = f"[color=ff0000]Error: {str(e)}[/color]"
 
 
 class RegistroActividad(FormularioBase):
-    campos = ["Fecha", "Supervisor", "Descripción", "Anexos", "Responsable", "Clima"]
+    campos = ["Fecha (YYYY-MM-DD HH:MM)", "Supervisor", "Descripción", "Anexos", "Responsable", "Clima"]
     boton_texto = "Registrar"
 
     def accion(self, fecha, supervisor, descripcion, anexos, responsable, clima):
@@ -150,7 +161,8 @@ class RegistroActividad(FormularioBase):
             "responsable": responsable,
             "clima": clima
         }
-        actividad_model.registrar_actividad(datos)
+        diario_local.registrar(datos)
+        App.get_running_app().sincronizacion.solicitar()
 
         # Limpia los campos después de registrar
         for input_widget in self.inputs.values():
@@ -195,38 +207,290 @@ class CambiarContrasena(FormularioBase):
 
 
 class Reporte(FormularioBase):
-    campos = ["Fecha inicio", "Fecha fin", "Nombre PDF"]
+    campos = ["Fecha inicio", "Fecha fin", "Nombre del archivo"]
     boton_texto = "Generar reporte"
 
-    def accion(self, fi, ff, pdf):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.archivo = None
+        # Consulta periódica del avance del trabajo en cola; una por pantalla
+        self.sondeo = None
+        self.ver = Button(text="Ver reporte", size_hint_y=None, height=40, disabled=True)
+        self.ver.bind(on_press=self.ver_reporte)
+        self.layout.add_widget(self.ver, index=1)
+
+    def ver_reporte(self, instance):
+        self.manager.get_screen('visor').abrir(self.archivo)
+        self.manager.current = 'visor'
+
+    def accion(self, fi, ff, nombre):
         if not obtener_sesion():
             raise CamposVaciosError("Debes iniciar sesión primero.")
-        if bitacora_model.generar_reporte(fi, ff, pdf):
-            return "Reporte generado exitosamente."
-        return "No hay actividades en ese rango de fechas."
+        self.ver.disabled = True
+        # El reporte se genera en otro proceso; la pantalla consulta su avance
+        self.id_trabajo = obtener_cola().encolar(fi, ff, nombre)
+        if self.sondeo is not None:
+            self.sondeo.cancel()
+        self.sondeo = Clock.schedule_interval(self.actualizar_estado, 1.0)
+        return "Reporte en cola..."
+
+    def actualizar_estado(self, dt):
+        trabajo = obtener_cola().estado(self.id_trabajo)
+        if trabajo is None:
+            return False
+        if trabajo["estado"] == "terminado":
+            self.resultado.text = f"[color=00ff00]Reporte generado exitosamente: {trabajo['archivo']}[/color]"
+            self.archivo = trabajo["archivo"]
+            self.ver.disabled = visor.formato_visible(self.archivo) is None
+            return False
+        if trabajo["estado"] == "error":
+            self.resultado.text = f"[color=ff0000]Error: {trabajo['error']}[/color]"
+            return False
+        avance = f"{trabajo['progreso']:.0%}" if trabajo["progreso"] is not None else f"{trabajo['filas']} filas"
+        self.resultado.text = f"[color=00ff00]Generando reporte... {avance}[/color]"
+
+
+CIERRE_COLOR = "[/color]"
+
+
+def clave_actividad(actividad):
+    # Las actividades aún no sincronizadas no tienen id_actividad, pero sí uuid
+    return actividad.get("uuid") or actividad["id_actividad"]
 
 
 class ConsultarActividades(FormularioBase):
     campos = ["Fecha inicio", "Fecha fin"]
     boton_texto = "Consultar"
+    max_miniaturas = 12
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.miniaturas = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=None, height=dp(80))
+        self.layout.add_widget(self.miniaturas, index=1)
+
+        # Las actividades nuevas del rango consultado se agregan sin volver a consultar
+        self.rango = None
+        self.ids_mostrados = set()
+        notificaciones.suscribir(self.recibir_actividad)
+        # Número de la última consulta; descarta las miniaturas que terminan tarde
+        self.consulta_miniaturas = 0
+
+    def recibir_actividad(self, actividad):
+        # Puede llegar desde otro hilo; la interfaz solo se modifica en el hilo principal
+        Clock.schedule_once(lambda dt: self.agregar_actividad(actividad))
+
+    def agregar_actividad(self, actividad):
+        if self.rango is None:
+            return
+        inicio, fin = self.rango
+        if not inicio <= notificaciones.fecha_de(actividad) <= fin:
+            return
+        clave = clave_actividad(actividad)
+        if clave in self.ids_mostrados:
+            return
+        # Solo se agrega la línea nueva, sin volver a armar el texto de las anteriores
+        linea = str(actividad)
+        if self.ids_mostrados:
+            self.resultado.text = f"{self.resultado.text[:-len(CIERRE_COLOR)]}\n{linea}{CIERRE_COLOR}"
+        else:
+            self.resultado.text = f"[color=00ff00]{linea}{CIERRE_COLOR}"
+        self.ids_mostrados.add(clave)
+
+    def mostrar_miniaturas(self, actividades):
+        # Las miniaturas se generan en el grupo de hilos de miniaturas.py y se agregan
+        # en el hilo principal a medida que terminan
+        self.miniaturas.clear_widgets()
+        self.consulta_miniaturas += 1
+        rutas = [ruta for actividad in actividades for ruta in miniaturas.separar_anexos(actividad["anexos"])
+                 if miniaturas.es_imagen(ruta)][:self.max_miniaturas]
+        for futuro in miniaturas.encolar_anexos(", ".join(rutas)):
+            futuro.add_done_callback(partial(self.miniatura_lista, self.consulta_miniaturas))
+
+    def miniatura_lista(self, consulta, futuro):
+        # Se llama desde un hilo de miniaturas
+        Clock.schedule_once(lambda dt: self.agregar_miniatura(consulta, futuro))
+
+    def agregar_miniatura(self, consulta, futuro):
+        from kivy.uix.image import Image
+        # Resultado de una consulta anterior, o la generación falló
+        if consulta != self.consulta_miniaturas or futuro.exception() is not None:
+            return
+        miniatura = futuro.result().get("miniatura")
+        if miniatura:
+            self.miniaturas.add_widget(Image(source=miniatura, size_hint_x=None, width=dp(80)))
 
     def accion(self, fi, ff):
         if not obtener_sesion():
             raise CamposVaciosError("Debes iniciar sesión primero.")
-        actividades = actividad_model.consultar_actividades(fi, ff)
+        actividades = diario_local.consultar(fi, ff)
+        self.rango = (datetime.strptime(fi, "%Y-%m-%d").date(), datetime.strptime(ff, "%Y-%m-%d").date())
+        self.ids_mostrados = {clave_actividad(a) for a in actividades}
+        self.mostrar_miniaturas(actividades)
         if actividades:
             return "\n".join(str(a) for a in actividades)
         return "No se encontraron actividades."
 
 
+class CronologiaActividades(FormularioBase):
+    campos = ["Buscar por (responsable o supervisor)", "Nombre", "Fecha inicio", "Fecha fin"]
+    boton_texto = "Consultar"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Las páginas siguientes se piden desde el cursor de la última mostrada
+        self.consulta = None
+        self.cursor = None
+        self.lineas = []
+        self.ver_mas = Button(text="Ver más", size_hint_y=None, height=40, disabled=True)
+        self.ver_mas.bind(on_press=self.siguiente_pagina)
+        self.layout.add_widget(self.ver_mas, index=1)
+
+    def cargar_pagina(self):
+        actividades, self.cursor = diario_local.cronologia(*self.consulta, despues=self.cursor)
+        for a in actividades:
+            hora = f" {a['fecha_hora']:%H:%M}" if a["fecha_hora"] else ""
+            self.lineas.append(f"{a['fecha']}{hora} | {a['descripcion']} | {a['estado'] or ''}")
+        self.ver_mas.disabled = self.cursor is None
+        return "\n".join(self.lineas) if self.lineas else "No se encontraron actividades."
+
+    def siguiente_pagina(self, instance):
+        self.resultado.text = f"[color=00ff00]{self.cargar_pagina()}[/color]"
+
+    def accion(self, por, nombre, fi, ff):
+        if not obtener_sesion():
+            raise CamposVaciosError("Debes iniciar sesión primero.")
+        self.consulta = (por.strip() or "responsable", nombre, fi, ff)
+        self.cursor = None
+        self.lineas = []
+        try:
+            return self.cargar_pagina()
+        except ValueError as e:
+            raise CamposVaciosError(str(e))
+
+
+class VisorReportes(Screen):
+    """
+    Muestra un reporte generado página por página. El archivo está mapeado en memoria y
+    solo se convierte en texto la página visible; el total de páginas se calcula en
+    segundo plano.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.visor = None
+        self.numero = 0
+        layout = BoxLayout(orientation='vertical', padding=10, spacing=5)
+
+        self.titulo = Label(text="", size_hint_y=None, height=30)
+        layout.add_widget(self.titulo)
+
+        self.scroll = ScrollView()
+        self.texto = Label(text="", size_hint_y=None, halign='left', valign='top', font_size='13sp')
+        self.texto.bind(width=lambda l, ancho: setattr(l, 'text_size', (ancho, None)),
+                        texture_size=lambda l, tamano: setattr(l, 'height', tamano[1]))
+        self.scroll.add_widget(self.texto)
+        layout.add_widget(self.scroll)
+
+        botones = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        for texto, destino in (("<<", lambda: 0), ("<", lambda: self.numero - 1),
+                               (">", lambda: self.numero + 1), (">>", self.ultima_pagina)):
+            boton = Button(text=texto)
+            boton.bind(on_press=lambda x, destino=destino: self.mostrar(destino()))
+            botones.add_widget(boton)
+        layout.add_widget(botones)
+
+        volver = Button(text="Volver", size_hint_y=None, height=40)
+        volver.bind(on_press=lambda x: setattr(self.manager, 'current', 'reporte'))
+        layout.add_widget(volver)
+        self.add_widget(layout)
+
+    def abrir(self, archivo):
+        self.cerrar()
+        try:
+            self.visor = visor.VisorReporte(archivo)
+        except BaseError as e:
+            self.titulo.text = f"Error: {e}"
+            self.texto.text = ""
+            return
+        self.nombre = os.path.basename(archivo)
+        threading.Thread(target=trazas.propagar(self.visor.indexar), daemon=True).start()
+        Clock.schedule_interval(self.actualizar_titulo, 0.5)
+        self.mostrar(0)
+
+    def ultima_pagina(self):
+        # Mientras el índice se completa, se salta a la última página conocida
+        return (self.visor.total_paginas or self.visor.paginas_conocidas) - 1
+
+    def mostrar(self, numero):
+        if self.visor is None:
+            return
+        try:
+            self.texto.text = self.visor.pagina(numero)
+        except IndexError:
+            return
+        self.numero = numero
+        self.scroll.scroll_y = 1
+        self.actualizar_titulo(0)
+
+    def actualizar_titulo(self, dt):
+        if self.visor is None:
+            return False
+        total = self.visor.total_paginas
+        de = f"de {total}" if total else f"de {self.visor.paginas_conocidas}+"
+        self.titulo.text = f"{self.nombre}: página {self.numero + 1} {de}"
+        return total is None
+
+    def cerrar(self):
+        if self.visor is not None:
+            self.visor.cerrar()
+            self.visor = None
+
+    def on_leave(self):
+        self.cerrar()
+
+
+class GestorPantallas(ScreenManager):
+    """ScreenManager que construye cada pantalla la primera vez que se muestra."""
+
+    def __init__(self, fabricas, **kwargs):
+        super().__init__(**kwargs)
+        self.fabricas = fabricas
+
+    def has_screen(self, name):
+        return name in self.fabricas or super().has_screen(name)
+
+    def get_screen(self, name):
+        if name in self.fabricas and not super().has_screen(name):
+            self.add_widget(self.fabricas[name](name=name))
+        return super().get_screen(name)
+
+
 class BitacoraApp(App):
     def build(self):
-        sm = ScreenManager()
+        # Solo el menú se construye al iniciar; el resto, al navegar hacia cada pantalla
+        sm = GestorPantallas({
+            'registro': RegistroActividad,
+            'consulta': ConsultarActividades,
+            'cronologia': CronologiaActividades,
+            'reporte': Reporte,
+            'visor': VisorReportes,
+            'crear_cuenta': CrearCuenta,
+            'login': IniciarSesion,
+            'cambiar_contrasena': CambiarContrasena,
+        })
         sm.add_widget(MenuPrincipal(name='menu'))
-        sm.add_widget(RegistroActividad(name='registro'))
-        sm.add_widget(ConsultarActividades(name='consulta'))
-        sm.add_widget(Reporte(name='reporte'))
-        sm.add_widget(CrearCuenta(name='crear_cuenta'))
-        sm.add_widget(IniciarSesion(name='login'))
-        sm.add_widget(CambiarContrasena(name='cambiar_contrasena'))
         return sm
+
+    def on_start(self):
+        self.sincronizacion = MotorSincronizacion(diario_local)
+        self.sincronizacion.start()
+        self.escucha = None
+        if notificaciones.ESCUCHAR_POSTGRES:
+            self.escucha = notificaciones.EscuchaPostgres()
+            self.escucha.start()
+
+    def on_stop(self):
+        self.sincronizacion.detener()
+        obtener_cola().detener()
+        if self.escucha:
+            self.escucha.detener()
@@ -0,0 +1,134 @@
+"""
+Fixtures de base de datos para correr las pruebas en paralelo (pytest -n auto, con
+pytest-xdist).
+
+Cada proceso de pruebas (worker_id gw0, gw1, ...; "master" sin xdist) arma una sola
+vez su propia base SQLite y su propio esquema de PostgreSQL. Cada prueba que usa
+`base_orm` o `base_postgres` corre dentro de una transacción que se revierte al
+terminar; los commit del código probado quedan en savepoints. Así no hace falta
+vaciar ni recrear tablas entre pruebas y los procesos no comparten datos.
+"""
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def id_proceso(request):
+    # workerinput solo existe en los procesos de pytest-xdist
+    return getattr(request.config, "workerinput", {}).get("workerid", "master")
+
+
+@pytest.fixture(scope="session")
+def engine_orm(id_proceso, tmp_path_factory):
+    """Base SQLite del proceso, con el esquema creado una vez."""
+    from sqlalchemy import create_engine, event
+    from src.model import orm_model
+
+    ruta = tmp_path_factory.mktemp("orm") / f"actividades_{id_proceso}.db"
+    engine = create_engine(f"sqlite:///{ruta}")
+
+    # pysqlite maneja las transacciones por su cuenta y no admite savepoints anidados;
+    # se desactiva y SQLAlchemy emite BEGIN.
+    @event.listens_for(engine, "connect")
+    def _sin_transaccion_implicita(conexion_dbapi, registro):
+        conexion_dbapi.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _iniciar(conexion):
+        conexion.exec_driver_sql("BEGIN")
+
+    orm_model.Base.metadata.create_all(engine)
+    orm_model.usar_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def conexion_postgres(id_proceso):
+    """Conexión del proceso a PostgreSQL con un esquema propio como search_path."""
+    from src.model import database, particiones
+    from src.model.crear_tablas import crear_tablas
+
+    esquema = f"pruebas_{id_proceso}"
+    conn = database.conectar()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {esquema} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {esquema};")
+        cur.execute(f"SET search_path TO {esquema}, public;")
+    crear_tablas(conn)
+    database.usar_conexion(conn)
+    try:
+        particiones.asegurar_particiones_futuras()
+    finally:
+        database.usar_conexion(None)
+    conn.commit()
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {esquema} CASCADE;")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def directorio_aislado(tmp_path, monkeypatch):
+    """
+    Corre la prueba en una carpeta propia: registro durable, archivo frío, sesión y
+    reportes generados no se comparten con otras pruebas ni procesos. Los registros
+    durables se aplican al leer, sin hilo, porque la conexión de la prueba es una sola.
+    """
+    from src.model import actividad, archivado, database, registro_durable
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(registro_durable, "APLICAR_EN_SEGUNDO_PLANO", False)
+    monkeypatch.setattr(actividad, "_canal_durable", None)
+    monkeypatch.setattr(database, "_canal_durable", None)
+    monkeypatch.setattr(archivado, "_archivos", {})
+    return tmp_path
+
+
+@pytest.fixture
+def base_orm(engine_orm, directorio_aislado):
+    """Transacción de SQLAlchemy que se revierte al terminar la prueba."""
+    from src.model import orm_model
+
+    conexion = engine_orm.connect()
+    transaccion = conexion.begin()
+    orm_model.usar_conexion(conexion)
+    try:
+        yield conexion
+    finally:
+        orm_model.usar_conexion(None)
+        transaccion.rollback()
+        conexion.close()
+
+
+@pytest.fixture
+def base_postgres(conexion_postgres, directorio_aislado):
+    """Transacción de PostgreSQL que se revierte al terminar la prueba."""
+    from src.model import database
+
+    database.usar_conexion(conexion_postgres)
+    try:
+        yield conexion_postgres
+    finally:
+        database.usar_conexion(None)
+        conexion_postgres.rollback()
+
+
+@pytest.fixture
+def nueva_actividad():
+    """
+    Fábrica de actividades válidas para registrar: nueva_actividad(descripcion="Zanja")
+    devuelve un diccionario nuevo con los demás campos comunes a todas las pruebas.
+    """
+    def crear(**cambios):
+        return dict({
+            "fecha": "2025-03-06",
+            "supervisor": "Juan Pérez",
+            "descripcion": "Revisión de equipos",
+            "anexos": "",
+            "responsable": "María",
+            "clima": "Soleado",
+        }, **cambios)
+    return crear
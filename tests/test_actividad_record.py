@@ -0,0 +1,58 @@
+from datetime import date
+
+import pytest
+
+from src.model.actividad_record import ActividadRecord
+
+
+def crear_record(**cambios):
+    datos = {
+        "id_actividad": 1,
+        "fecha": date(2025, 3, 6),
+        "supervisor": "Juan Pérez",
+        "descripcion": "Revisión de equipos",
+        "anexos": "",
+        "responsable": "María",
+        "clima": "Soleado",
+        "estado": None,
+        "tipo": None,
+    }
+    datos.update(cambios)
+    return ActividadRecord(**datos), datos
+
+
+class TestActividadRecord:
+
+    def test_acceso_como_diccionario(self):
+        """El registro admite acceso por clave, get y comparación con un diccionario"""
+        record, datos = crear_record()
+        assert record["descripcion"] == "Revisión de equipos"
+        assert record.get("clima") == "Soleado"
+        assert record.get("inexistente", "x") == "x"
+        assert record == datos
+        assert dict(record) == datos
+
+    def test_clave_inexistente(self):
+        """Una clave desconocida lanza KeyError"""
+        record, _ = crear_record()
+        with pytest.raises(KeyError):
+            record["inexistente"]
+
+    def test_sin_diccionario_por_instancia(self):
+        """El registro no tiene __dict__"""
+        record, _ = crear_record()
+        assert not hasattr(record, "__dict__")
+
+    def test_campos_internados(self):
+        """Los campos repetidos comparten la misma cadena"""
+        a, _ = crear_record(responsable="".join(["Car", "los"]))
+        b, _ = crear_record(responsable="".join(["Carl", "os"]))
+        assert a.responsable is b.responsable
+
+    def test_fabrica_desde_tuplas(self):
+        """La fábrica ignora columnas extra y completa las faltantes con None"""
+        crear = ActividadRecord.fabrica(["id_actividad", "id_bitacora", "fecha", "descripcion"])
+        record = crear((7, 3, date(2025, 3, 6), "Limpieza"))
+        assert record["id_actividad"] == 7
+        assert record["descripcion"] == "Limpieza"
+        assert record["clima"] is None
@@ -0,0 +1,54 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from src.model import archivado
+from src.model.archivado import ArchivoFrio, combinar, meses_a_archivar
+
+
+def actividad(id_actividad, fecha):
+    return {"id_actividad": id_actividad, "fecha": fecha, "descripcion": f"actividad {id_actividad}"}
+
+
+def insertar_orm(fecha, descripcion):
+    from src.model.orm_model import ActividadORM, Session
+    session = Session()
+    session.add(ActividadORM(fecha=fecha, supervisor="Juan", descripcion=descripcion, responsable="María"))
+    session.commit()
+    session.close()
+
+
+class TestArchivoFrio:
+
+    def test_lee_solo_meses_que_se_solapan(self, tmp_path):
+        """Un rango fuera de los meses archivados no toca el archivo"""
+        archivo = ArchivoFrio(str(tmp_path))
+        archivo.escribir_mes("2020-01", [actividad(1, date(2020, 1, 5)), actividad(2, date(2020, 1, 20))])
+        assert not archivo.solapa(date(2021, 1, 1), date(2021, 12, 31))
+        assert [f["id_actividad"] for f in archivo.leer(date(2020, 1, 10), date(2020, 3, 1))] == [2]
+
+    def test_combina_sin_duplicar(self, tmp_path):
+        """Las fuentes se combinan por fecha y una fila repetida aparece una vez"""
+        calientes = [actividad(2, date(2020, 1, 20)), actividad(5, date(2024, 5, 1))]
+        archivadas = [actividad(1, date(2020, 1, 5)), actividad(2, date(2020, 1, 20))]
+        assert [f["id_actividad"] for f in combinar(calientes, archivadas)] == [1, 2, 5]
+
+    def test_meses_anteriores_al_horizonte(self):
+        """Solo se archivan meses completos anteriores al horizonte"""
+        meses = meses_a_archivar(date(2020, 11, 15), horizonte_dias=60, hoy=date(2021, 3, 10))
+        assert meses == [date(2020, 11, 1), date(2020, 12, 1)]
+
+    def test_archivar_no_borra_lo_insertado_durante_la_copia(self, base_orm, monkeypatch):
+        """Una actividad del mes que llega mientras se copia queda en la tabla"""
+        insertar_orm(date(2020, 1, 10), "Copiada")
+        escribir_mes = ArchivoFrio.escribir_mes
+
+        def escribir_e_insertar(archivo, mes, filas):
+            total = escribir_mes(archivo, mes, filas)
+            insertar_orm(date(2020, 1, 20), "Llegó durante la copia")
+            return total
+
+        monkeypatch.setattr(ArchivoFrio, "escribir_mes", escribir_e_insertar)
+        assert archivado.archivar_orm(hoy=date(2025, 1, 1)) == {"2020-01": 1}
+        restantes = base_orm.execute(text("SELECT descripcion FROM actividades WHERE fecha < '2021-01-01'"))
+        assert restantes.scalars().all() == ["Llegó durante la copia"]
@@ -0,0 +1,106 @@
+import sqlite3
+
+from sqlalchemy import create_engine, event, text
+
+from src.model import orm_model
+from src.model.actividad import Actividad
+from src.model.catalogos import migrar, obtener_catalogo
+
+
+class TestCatalogos:
+
+    def test_registrar_guarda_ids_y_consultar_devuelve_texto(self, base_orm, nueva_actividad):
+        """Los valores repetidos se guardan una vez en su catálogo y se leen como texto"""
+        actividad = Actividad()
+        actividad.registrar_actividades([
+            nueva_actividad(), nueva_actividad(responsable="Ana"), nueva_actividad(descripcion="Cambio de filtros")
+        ])
+        consultadas = actividad.consultar_actividades("2025-03-06", "2025-03-06")
+        assert [a["responsable"] for a in consultadas] == ["María", "Ana", "María"]
+        assert base_orm.execute(text("SELECT count(*) FROM climas")).scalar() == 1
+        assert base_orm.execute(text("SELECT DISTINCT typeof(id_clima) FROM actividades")).scalar() == "integer"
+        assert actividad.contar_por("responsable", "2025-03-06", "2025-03-06") == {"María": 2, "Ana": 1}
+
+    def test_migrar_convierte_columnas_de_texto(self, tmp_path):
+        """La migración llena los catálogos y conserva los valores de cada actividad"""
+        ruta = tmp_path / "anterior.db"
+        conn = sqlite3.connect(ruta)
+        conn.execute(
+            "CREATE TABLE actividades (id_actividad INTEGER PRIMARY KEY, fecha DATE NOT NULL, "
+            "descripcion TEXT NOT NULL, anexos TEXT, responsable VARCHAR(100), clima VARCHAR(50), "
+            "estado VARCHAR(50), tipo VARCHAR(50), supervisor VARCHAR(100))"
+        )
+        conn.executemany(
+            "INSERT INTO actividades VALUES (?, '2025-03-06', 'Zanja', '', ?, ?, NULL, 'Obra civil', 'Juan')",
+            [(1, "Ana", "Lluvia"), (2, "Luis", "Lluvia"), (3, "Ana", None)],
+        )
+        conn.commit()
+        conn.close()
+
+        engine = create_engine(f"sqlite:///{ruta}")
+        assert migrar(engine) is True
+        assert migrar(engine) is False
+        engine.dispose()
+        conn = sqlite3.connect(ruta)
+        filas = conn.execute(
+            "SELECT r.nombre, c.nombre, a.id_estado FROM actividades a "
+            "JOIN responsables r ON r.id = a.id_responsable LEFT JOIN climas c ON c.id = a.id_clima "
+            "ORDER BY a.id_actividad"
+        ).fetchall()
+        assert conn.execute("SELECT count(*) FROM responsables").fetchone()[0] == 2
+        conn.close()
+        assert filas == [("Ana", "Lluvia", None), ("Luis", "Lluvia", None), ("Ana", None, None)]
+
+    def test_abrir_la_base_no_cambia_el_esquema(self, tmp_path, monkeypatch):
+        """get_engine no ejecuta DDL; migrar_esquema actualiza la base una sola vez"""
+        ruta = tmp_path / "anterior.db"
+        conn = sqlite3.connect(ruta)
+        conn.execute(
+            "CREATE TABLE actividades (id_actividad INTEGER PRIMARY KEY, fecha DATE NOT NULL, "
+            "descripcion TEXT NOT NULL, anexos TEXT, responsable VARCHAR(100), clima VARCHAR(50), "
+            "estado VARCHAR(50), tipo VARCHAR(50), supervisor VARCHAR(100))"
+        )
+        conn.commit()
+        conn.close()
+
+        monkeypatch.delattr(orm_model, "engine", raising=False)
+        monkeypatch.setattr(orm_model, "DATABASE_URL", f"sqlite:///{ruta}")
+        engine = orm_model.get_engine()
+        with engine.connect() as conexion:
+            columnas = [fila[1] for fila in conexion.execute(text("PRAGMA table_info(actividades)"))]
+        assert "huella" not in columnas and "clima" in columnas
+
+        assert orm_model.migrar_esquema(engine)[0] == "catálogos"
+        assert orm_model.migrar_esquema(engine) == []
+        with engine.connect() as conexion:
+            columnas = [fila[1] for fila in conexion.execute(text("PRAGMA table_info(actividades)"))]
+            indices = [fila[1] for fila in conexion.execute(text("PRAGMA index_list(actividades)"))]
+        assert {"id_clima", "huella", "fecha_hora"} <= set(columnas)
+        assert "idx_actividades_fecha_hora" in indices
+        engine.dispose()
+
+    def test_valor_nuevo_se_comparte_al_confirmar(self, tmp_path):
+        """Un valor sin confirmar solo lo ve su conexión; un valor ausente se busca una vez"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'catalogos.db'}")
+        orm_model.Base.metadata.create_all(engine)
+        consultas = []
+        event.listen(engine, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+        climas = obtener_catalogo("climas")
+        climas.invalidar()
+        try:
+            with engine.begin() as conexion:
+                id_niebla = climas.asegurar("Niebla", conexion)
+                assert climas._ids == {} and climas.id_de("Niebla", conexion) == id_niebla
+            assert climas.id_de("Niebla") == id_niebla
+
+            with engine.connect() as conexion:
+                conexion.begin()
+                climas.asegurar("Bruma", conexion)
+                conexion.rollback()
+                del consultas[:]
+                assert climas.id_de("Bruma", conexion) is None
+                assert climas.id_de("Bruma", conexion) is None
+            assert consultas == ["SELECT id, nombre FROM climas WHERE nombre = ?"]
+        finally:
+            climas.invalidar()
+            engine.dispose()
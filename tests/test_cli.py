@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+from src.model.errores import ArchivoEntradaError
+from src.view.cli import crear_parser, escribir_jsonl, leer_csv, leer_jsonl
+
+
+class TestCli:
+
+    def test_lee_jsonl_y_csv(self):
+        """Ambos formatos de entrada producen los mismos diccionarios"""
+        jsonl = io.StringIO('{"fecha": "2024-01-05", "supervisor": "Ana"}\n\n{"fecha": "2024-01-06", "supervisor": "Luis"}\n')
+        csv = io.StringIO("fecha,supervisor,descripcion,responsable\n2024-01-05,Ana,Zanja,Pedro\n")
+        assert [d["supervisor"] for d in leer_jsonl(jsonl)] == ["Ana", "Luis"]
+        assert list(leer_csv(csv)) == [
+            {"fecha": "2024-01-05", "supervisor": "Ana", "descripcion": "Zanja", "responsable": "Pedro"}
+        ]
+
+    def test_entrada_mal_formada_indica_la_linea(self):
+        """Una línea JSON inválida se informa con archivo y número de línea"""
+        with pytest.raises(ArchivoEntradaError, match="datos.jsonl:2"):
+            list(leer_jsonl(io.StringIO('{"fecha": "2024-01-05"}\n{"fecha"\n'), "datos.jsonl"))
+
+    def test_consultar_escribe_una_linea_por_actividad(self):
+        """La salida JSONL tiene una línea por actividad y el parser exige el rango"""
+        salida = io.StringIO()
+        escribir_jsonl([{"id_actividad": 1, "descripcion": "Colado"}], salida)
+        assert salida.getvalue() == '{"id_actividad": 1, "descripcion": "Colado"}\n'
+        args = crear_parser().parse_args(["consultar", "2024-01-01", "2024-01-31", "--formato", "csv"])
+        assert (args.fecha_inicio, args.formato) == ("2024-01-01", "csv")
@@ -0,0 +1,30 @@
+import pytest
+
+from src.model.actividad import Actividad
+
+
+class TestCronologia:
+
+    def test_paginas_por_cursor(self, base_orm, nueva_actividad):
+        """Las páginas siguen el orden (fecha, id_actividad) y solo traen a la persona pedida"""
+        actividad = Actividad()
+        actividad.registrar_actividades([
+            nueva_actividad(fecha=f"2025-03-{dia:02d}", descripcion=f"Tarea {dia}-{i}",
+                            responsable="Carlos" if i % 2 else "Ana")
+            for dia in (9, 3, 5) for i in range(4)
+        ])
+
+        filas, cursor = actividad.cronologia("responsable", "Carlos", "2025-03-01", "2025-03-31", limite=4)
+        assert [a["descripcion"] for a in filas] == ["Tarea 3-1", "Tarea 3-3", "Tarea 5-1", "Tarea 5-3"]
+        siguientes, cursor = actividad.cronologia("responsable", "Carlos", "2025-03-01", "2025-03-31",
+                                                  limite=4, despues=cursor)
+        assert [a["descripcion"] for a in siguientes] == ["Tarea 9-1", "Tarea 9-3"]
+        assert cursor is None
+        assert {a["responsable"] for a in filas + siguientes} == {"Carlos"}
+
+        filas, _ = actividad.cronologia("supervisor", "Juan Pérez", "2025-03-04", "2025-03-05")
+        assert len(filas) == 4
+
+    def test_filtro_desconocido(self, base_orm):
+        with pytest.raises(ValueError):
+            Actividad().cronologia("clima", "Soleado", "2025-03-01", "2025-03-31")
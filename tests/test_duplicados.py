@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.model.actividad import Actividad
+from src.model.bitacora import Bitacora
+from src.model.database import Database
+from src.model.duplicados import depurar_dia, huella_actividad
+from src.model.errores import ActividadDuplicadaError
+
+
+class TestDuplicados:
+
+    def test_huella_ignora_mayusculas_y_espacios(self, nueva_actividad):
+        """La huella no cambia con mayúsculas, espacios repetidos ni composición Unicode"""
+        variante = nueva_actividad(supervisor="  JUAN   pérez ", descripcion="revisión de EQUIPOS")
+        assert huella_actividad(variante) == huella_actividad(nueva_actividad())
+        assert huella_actividad(nueva_actividad(fecha="2025-03-07")) != huella_actividad(nueva_actividad())
+
+    def test_depurar_dia_conserva_la_mas_antigua(self, nueva_actividad):
+        """De cada grupo con la misma huella se conserva la de menor id y se completa su huella"""
+        filas = [
+            nueva_actividad(id_actividad=3, huella=None),
+            nueva_actividad(id_actividad=1, huella=None, descripcion="REVISIÓN DE EQUIPOS"),
+            nueva_actividad(id_actividad=2, huella=None, descripcion="Otra"),
+        ]
+        eliminar, actualizar = depurar_dia(filas)
+        assert eliminar == [3]
+        assert [id_actividad for id_actividad, _ in actualizar] == [1, 2]
+
+    def test_registrar_rechaza_o_ignora_duplicados(self, base_orm, nueva_actividad):
+        """Un duplicado se rechaza, salvo que el registro sea idempotente"""
+        actividad = Actividad()
+        actividad.registrar_actividad(nueva_actividad())
+        with pytest.raises(ActividadDuplicadaError):
+            actividad.registrar_actividad(nueva_actividad(supervisor="juan pérez"))
+        actividad.registrar_actividad(nueva_actividad(), idempotente=True)
+
+        registradas, invalidas = actividad.registrar_actividades(
+            [nueva_actividad(), nueva_actividad(descripcion="Cambio de filtros")], omitir_invalidas=True
+        )
+        assert registradas == 1
+        assert [(posicion, type(error)) for posicion, error in invalidas] == [(1, ActividadDuplicadaError)]
+        assert actividad.contar_actividades("2025-03-06", "2025-03-06") == 2
+
+    def test_agregar_entrada_de_bitacora_sin_duplicar(self, base_postgres, nueva_actividad):
+        """La entrada se inserta en actividades y la repetida choca con el índice de huella"""
+        bitacora = Bitacora(Database())
+        entrada = SimpleNamespace(**nueva_actividad())
+        id_actividad = bitacora.agregar_entrada(entrada)
+        assert id_actividad is not None
+        with pytest.raises(ActividadDuplicadaError):
+            bitacora.agregar_entrada(SimpleNamespace(**nueva_actividad(descripcion="REVISIÓN DE EQUIPOS")))
+        assert bitacora.agregar_entrada(entrada, idempotente=True) is None
+        with base_postgres.cursor() as cur:
+            cur.execute("SELECT count(*) FROM actividades WHERE huella = %s;", (huella_actividad(vars(entrada)),))
+            assert cur.fetchone() == (1,)
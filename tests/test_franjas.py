@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from src.model.actividad import Actividad
+from src.model.franjas import inicio_franja
+
+
+class TestFranjas:
+
+    def test_inicio_de_turno(self):
+        """Los turnos empiezan a las 06:00, 14:00 y 22:00; la madrugada es del turno de noche anterior"""
+        assert inicio_franja(datetime(2025, 3, 6, 13, 59), "turno") == datetime(2025, 3, 6, 6)
+        assert inicio_franja(datetime(2025, 3, 6, 14, 0), "turno") == datetime(2025, 3, 6, 14)
+        assert inicio_franja(datetime(2025, 3, 7, 5, 30), "turno") == datetime(2025, 3, 6, 22)
+
+    def test_contar_por_franja(self, base_orm, nueva_actividad):
+        """La base agrupa por hora, turno o día igual que inicio_franja"""
+        actividad = Actividad()
+        horas = ["2025-03-06 08:15", "2025-03-06 08:40", "2025-03-06 23:10", "2025-03-07 05:00", "2025-03-07"]
+        actividad.registrar_actividades(
+            [nueva_actividad(fecha=fecha, descripcion=f"Tarea {i}") for i, fecha in enumerate(horas)]
+        )
+
+        assert actividad.contar_por_franja("2025-03-06", "2025-03-06", "hora") == {
+            datetime(2025, 3, 6, 8): 2, datetime(2025, 3, 6, 23): 1,
+        }
+        assert actividad.contar_por_franja("2025-03-06", "2025-03-07", "turno") == {
+            datetime(2025, 3, 6, 6): 2, datetime(2025, 3, 6, 22): 2,
+        }
+        assert actividad.contar_por_franja("2025-03-06", "2025-03-07", "dia") == {
+            datetime(2025, 3, 6): 3, datetime(2025, 3, 7): 2,
+        }
+        assert actividad.contar_por_franja("2025-03-06 08:30", "2025-03-06 23:00", "dia") == {
+            datetime(2025, 3, 6): 1,
+        }
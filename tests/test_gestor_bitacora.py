@@ -5,22 +5,16 @@ from src.model.usuario import Usuario
 from src.model.database import Database
 from src.model.errores import CamposVaciosError, FechaInvalidaError, RangoFechasInvalidoError, UsuarioNoEncontradoError, ContrasenaIncorrectaError, CorreoYaRegistradoError, ReporteError
 
-from sqlalchemy.orm import sessionmaker
-from src.model.orm_model import Base, engine
-
-
-Session = sessionmaker(bind=engine)
+# Las fixtures base_orm y base_postgres (tests/conftest.py) corren cada prueba en una
+# transacción que se revierte, sobre una base y un esquema propios de cada proceso.
 
 
 class TestRegistroActividad:
-    def setup_method(self, method):
+    @pytest.fixture(autouse=True)
+    def preparar(self, base_orm):
         """Método de configuración para cada prueba"""
         self.db = Database()
-        self.db.clear_tables()
         self.actividad = Actividad(self.db)
-        Base.metadata.drop_all(bind=engine)   # Limpia antes
-        Base.metadata.create_all(bind=engine) # Crea las tablas necesarias
-        self.session = Session()
     
     # ---- PRUEBAS NORMALES ----
     def test_registro_actividad_valida(self):
@@ -143,10 +137,10 @@ class TestRegistroActividad:
 
 class TestConsultarActividades:
 
-    def setup_method(self, method):
+    @pytest.fixture(autouse=True)
+    def preparar(self, base_orm):
         """Configuración antes de cada prueba"""
         self.db = Database()
-        self.db.clear_tables()
         self.actividad = Actividad(self.db)
     
     # ---- PRUEBAS NORMALES ----
@@ -199,10 +193,10 @@ class TestConsultarActividades:
 
 class TestGenerarReporte:
     
-    def setup_method(self, method):
+    @pytest.fixture(autouse=True)
+    def preparar(self, base_orm, base_postgres):
         """Configuración antes de cada prueba"""
         self.db = Database()
-        self.db.clear_tables()
         self.actividad = Actividad(self.db)
         self.bitacora = Bitacora(self.db)
     
@@ -258,6 +252,13 @@ class TestGenerarReporte:
         with pytest.raises(ReporteError):
             self.bitacora.generar_reporte("2025-03-06", "2025-03-06", "invalido@#.pdf")
 
+    def test_contar_e_iterar_entradas_fecha_invalida(self):
+        """Contar o recorrer entradas con una fecha inválida o un rango invertido"""
+        with pytest.raises(FechaInvalidaError):
+            self.bitacora.contar_entradas("2025-02-30", "2025-03-06")
+        with pytest.raises(RangoFechasInvalidoError):
+            self.bitacora.iterar_entradas("2025-03-10", "2025-03-01")
+
 import pytest
 from src.model.usuario import Usuario
 from src.model.database import Database
@@ -269,10 +270,10 @@ from src.model.errores import (
 )
 
 class TestCrearCuenta:
-    def setup_method(self, method):
+    @pytest.fixture(autouse=True)
+    def preparar(self, base_postgres):
         """Configuración antes de cada prueba"""
         self.db = Database()
-        self.db.clear_tables()
         self.usuario = Usuario(self.db)
 
     # ---- PRUEBAS NORMALES ----
@@ -330,10 +331,10 @@ class TestCrearCuenta:
 
 class TestIniciarSesion:
     
-    def setup_method(self, method):
+    @pytest.fixture(autouse=True)
+    def preparar(self, base_postgres):
         """Configuración antes de cada prueba"""
         self.db = Database()
-        self.db.clear_tables()
         self.usuario = Usuario(self.db)
 
     # ---- PRUEBAS NORMALES ----
@@ -398,12 +399,10 @@ class TestIniciarSesion:
             self.usuario.iniciar_sesion("", "")
 
 class TestCambiarContrasena:
-    def setup_method(self, method):
+    @pytest.fixture(autouse=True)
+    def preparar(self, base_postgres):
         """Configuración antes de cada prueba"""
         self.db = Database()
-
-        self.db.clear_tables()
-
         self.usuario = Usuario(self.db)
         self.usuario.crear_cuenta("Juan Pérez", "juan@example.com", "Password123")
     
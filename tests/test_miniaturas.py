@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from src.model.miniaturas import GeneradorMiniaturas
+
+
+@pytest.fixture
+def generador(tmp_path):
+    generador = GeneradorMiniaturas(directorio=str(tmp_path / "cache"))
+    yield generador
+    if generador._executor is not None:
+        generador._executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def foto(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    ruta = tmp_path / "foto.png"
+    Image.new("RGB", (640, 480), "red").save(ruta)
+    return str(ruta)
+
+
+class TestMiniaturas:
+
+    def test_misma_foto_en_dos_rutas_se_genera_una_vez(self, generador, foto, tmp_path):
+        """La caché usa el hash del contenido: una copia de la foto reutiliza la misma miniatura"""
+        copia = tmp_path / "copia.png"
+        copia.write_bytes(open(foto, "rb").read())
+        [primera] = generador.encolar(foto)
+        miniatura = primera.result()["miniatura"]
+        assert generador.obtener(str(copia)) == miniatura
+        generadas = [nombre for _, _, nombres in os.walk(generador.directorio) for nombre in nombres]
+        assert sorted(generadas) == sorted(os.path.basename(r) for r in primera.result().values())
+
+    def test_encolar_dos_veces_comparte_el_trabajo_pendiente(self, generador, foto):
+        """Mientras una imagen está en proceso, volver a encolarla devuelve el mismo futuro"""
+        liberar = threading.Event()
+        llamadas = []
+
+        def lento(ruta):
+            llamadas.append(ruta)
+            liberar.wait(5)
+            return {"miniatura": "lista.jpg"}
+
+        generador._procesar = lento
+        [primero] = generador.encolar(foto)
+        [segundo] = generador.encolar(f"{foto}; no_es_imagen.txt")
+        assert segundo is primero
+        liberar.set()
+        assert primero.result() == {"miniatura": "lista.jpg"} and llamadas == [foto]
+        generador._executor.shutdown(wait=True)
+        assert generador._pendientes == {}
+
+    def test_sin_pillow_no_hay_miniatura(self, generador, foto, monkeypatch):
+        """Sin Pillow no se genera nada y el anexo queda sin miniatura, sin errores"""
+        monkeypatch.setitem(sys.modules, "PIL", None)
+        assert generador.obtener(foto) is None
+        assert generador.encolar(foto)[0].result() == {}
+        assert not os.path.exists(generador.directorio)
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+from src.model import database, notificaciones
+from src.model.notificaciones import EscuchaPostgres, NotificadorLocal
+
+
+class CursorFalso:
+    def __init__(self):
+        self.sentencias = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sentencia, params=None):
+        self.sentencias.append((sentencia, params))
+
+
+class ConexionFalsa:
+    """Conexión con LISTEN: cada byte escrito en la tubería entrega un aviso o corta la conexión."""
+
+    def __init__(self, avisos):
+        self.lectura, self.escritura = os.pipe()
+        self.avisos = list(avisos)
+        self.notifies = []
+        self.cursor_falso = CursorFalso()
+        self.cerrada = False
+        for _ in self.avisos:
+            os.write(self.escritura, b"x")
+
+    def fileno(self):
+        return self.lectura
+
+    def cursor(self):
+        return self.cursor_falso
+
+    def poll(self):
+        os.read(self.lectura, 1)
+        aviso = self.avisos.pop(0)
+        if aviso is None:
+            raise OSError("conexión perdida")
+        self.notifies.append(SimpleNamespace(payload=json.dumps(aviso)))
+
+    def close(self):
+        self.cerrada = True
+        os.close(self.lectura)
+        os.close(self.escritura)
+
+
+class TestNotificaciones:
+
+    def test_suscriptor_que_falla_no_corta_la_entrega(self):
+        """Todos los suscriptores reciben la actividad aunque uno falle; cancelar deja de entregar"""
+        notificador = NotificadorLocal()
+        recibidas = []
+
+        def falla(actividad):
+            raise RuntimeError("vista cerrada")
+
+        notificador.suscribir(falla)
+        cancelar = notificador.suscribir(recibidas.append)
+        notificador.publicar({"id_actividad": 1})
+        cancelar()
+        cancelar()
+        notificador.publicar({"id_actividad": 2})
+        assert recibidas == [{"id_actividad": 1}]
+
+    def test_carga_grande_envia_solo_la_clave(self):
+        """Una actividad que no entra en NOTIFY se anuncia incompleta, con id y fecha"""
+        cur = CursorFalso()
+        actividad = {"id_actividad": 5, "fecha": date(2025, 3, 6), "descripcion": "Zanja"}
+        notificaciones.notificar_postgres(cur, actividad)
+        notificaciones.notificar_postgres(cur, dict(actividad, descripcion="x" * notificaciones._MAX_CARGA))
+        cargas = [json.loads(params[1]) for _, params in cur.sentencias]
+        assert cargas[0] == {"id_actividad": 5, "fecha": "2025-03-06", "descripcion": "Zanja"}
+        assert cargas[1] == {"id_actividad": 5, "fecha": "2025-03-06", "incompleta": True}
+
+    def test_escucha_se_reconecta_y_se_detiene(self, monkeypatch):
+        """Si la conexión se corta, la escucha abre otra y sigue; detener termina el hilo"""
+        conexiones = [
+            ConexionFalsa([{"id_actividad": 1, "fecha": "2025-03-06"}, None]),
+            ConexionFalsa([{"id_actividad": 2, "fecha": "2025-03-06", "incompleta": True}]),
+        ]
+        pedidas = iter(conexiones)
+        monkeypatch.setattr(database, "get_connection", lambda: next(pedidas))
+        monkeypatch.setattr(database, "obtener_actividad_por_id",
+                            lambda id_actividad: {"id_actividad": id_actividad, "descripcion": "Completa"})
+
+        notificador = NotificadorLocal()
+        recibidas = []
+        dos = threading.Event()
+        notificador.suscribir(lambda actividad: (recibidas.append(actividad), len(recibidas) == 2 and dos.set()))
+        escucha = EscuchaPostgres(notificador, intervalo=0.05)
+        escucha.start()
+        assert dos.wait(5)
+        escucha.detener()
+        escucha.join(5)
+
+        assert not escucha.is_alive()
+        assert recibidas == [{"id_actividad": 1, "fecha": "2025-03-06"},
+                             {"id_actividad": 2, "descripcion": "Completa"}]
+        assert all(c.cerrada and c.cursor_falso.sentencias == [(f"LISTEN {notificaciones.CANAL};", None)]
+                   for c in conexiones)
+        assert escucha.ultimo_error is None
@@ -0,0 +1,18 @@
+import uuid
+
+from src.model import database
+
+
+class TestParticiones:
+
+    def test_insertar_lote_en_tabla_particionada(self, base_postgres):
+        """Las actividades sin bitácora se insertan en la partición de su mes"""
+        clave = str(uuid.uuid4())
+        ids = database.insertar_actividades_lote([{
+            "uuid": clave, "fecha": "2025-03-06", "supervisor": "Ana", "descripcion": "Vaciado de losa",
+            "anexos": "", "responsable": "Luis", "clima": "Soleado",
+        }])
+        with base_postgres.cursor() as cur:
+            cur.execute("SELECT tableoid::regclass::text, id_bitacora FROM actividades WHERE id_actividad = %s;",
+                        (ids[clave],))
+            assert cur.fetchone() == ("actividades_2025_03", None)
@@ -0,0 +1,40 @@
+import pytest
+
+from src.model import perfilado
+from src.model.actividad import Actividad
+
+
+@pytest.fixture
+def perfiles(tmp_path):
+    directorio = tmp_path / "perfiles"
+    perfilado.activar(str(directorio))
+    try:
+        yield directorio
+    finally:
+        perfilado.desactivar()
+
+
+class TestPerfilado:
+
+    def test_guarda_perfil_y_memoria_por_operacion(self, base_orm, perfiles):
+        """Cada operación del modelo deja su perfil de cProfile y su resumen de memoria"""
+        actividad = Actividad()
+        actividad.registrar_actividad({
+            "fecha": "2024-05-10", "supervisor": "Ana", "descripcion": "Vaciado de losa",
+            "anexos": "", "responsable": "Luis", "clima": "Soleado",
+        })
+        assert actividad.generar_reporte("2024-05-01", "2024-05-31", "mayo.csv")
+
+        archivos = sorted(p.name for p in perfiles.iterdir())
+        reporte = [nombre for nombre in archivos if nombre.startswith("Actividad.generar_reporte-")]
+        assert {nombre.rsplit(".", 1)[1] for nombre in reporte} == {"prof", "txt"}
+        resumen = (perfiles / next(n for n in reporte if n.endswith(".txt"))).read_text(encoding="utf-8")
+        assert "pico de memoria" in resumen and "tiempo acumulado" in resumen
+        # registrar_actividad llama a otros métodos, pero solo deja su propio perfil
+        assert len([n for n in archivos if n.endswith(".prof")]) == 2
+
+    def test_desactivar_restaura_los_metodos(self, perfiles):
+        """Sin perfilado los métodos vuelven a ser los originales"""
+        assert Actividad.generar_reporte.__wrapped__
+        perfilado.desactivar()
+        assert not hasattr(Actividad.generar_reporte, "__wrapped__")
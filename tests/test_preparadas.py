@@ -0,0 +1,39 @@
+from src.model import database, preparadas
+from src.model.db_wrapper import DB
+
+
+def sentencias_preparadas(cur):
+    cur.execute("SELECT name FROM pg_prepared_statements;")
+    return {fila[0] for fila in cur.fetchall()}
+
+
+class TestSentenciasPreparadas:
+
+    def test_consulta_frecuente_se_prepara_una_vez(self, base_postgres):
+        """La consulta por correo se prepara en la conexión y se reutiliza"""
+        assert database.obtener_usuario_por_correo("nadie@ejemplo.com") is None
+        assert database.obtener_usuario_por_correo("nadie@ejemplo.com") is None
+        with base_postgres.cursor() as cur:
+            assert preparadas.USUARIO_POR_CORREO in sentencias_preparadas(cur)
+
+    def test_se_vuelve_a_preparar_tras_reconectar(self):
+        """Si la conexión persistente se pierde, la nueva vuelve a preparar la sentencia"""
+        db = DB(database.DB_HOST, database.DB_PORT, database.DB_NAME, database.DB_USER, database.DB_PASSWORD)
+        consulta = "SELECT id_usuario, nombre, correo, contraseña, fecha_creacion FROM usuarios WHERE correo = %s;"
+        assert db.fetch_query(consulta, ("nadie@ejemplo.com",)) == []
+        conn = db.enrutador.conexion_lectura(persistente=True)
+        conn.close()
+
+        assert db.fetch_query(consulta, ("nadie@ejemplo.com",)) == []
+        nueva = db.enrutador.conexion_lectura(persistente=True)
+        assert nueva is not conn
+        with nueva.cursor() as cur:
+            assert preparadas.USUARIO_POR_CORREO in sentencias_preparadas(cur)
+
+    def test_consulta_por_rango_sobrevive_a_una_columna_nueva(self, base_postgres):
+        """Con columnas explícitas, agregar una columna no invalida la sentencia ya preparada"""
+        with base_postgres.cursor() as cur:
+            preparadas.ejecutar(cur, preparadas.ACTIVIDADES_POR_RANGO, ("2025-03-01", "2025-03-31"))
+            cur.execute("ALTER TABLE actividades ADD COLUMN prueba_columna INT;")
+            preparadas.ejecutar(cur, preparadas.ACTIVIDADES_POR_RANGO, ("2025-03-01", "2025-03-31"))
+            assert "prueba_columna" not in [columna.name for columna in cur.description]
@@ -0,0 +1,52 @@
+from datetime import date, datetime
+
+from src.model import programador as modulo_programador
+from src.model.programador import ProgramadorReportes, obtener_fallos, rango_periodo
+
+
+class BitacoraFalsa:
+    """Genera reportes vacíos; falla para los rangos indicados."""
+
+    def __init__(self, fallan=()):
+        self.fallan = set(fallan)
+
+    def huella_entradas(self, fecha_inicio, fecha_fin, id_bitacora=None):
+        return "1|1|2025-03-10"
+
+    def generar_reporte(self, fecha_inicio, fecha_fin, archivo, formato, id_bitacora=None):
+        if fecha_inicio in self.fallan:
+            raise OSError("disco lleno")
+        open(archivo, "w").close()
+
+
+class TestProgramador:
+
+    def test_rangos_de_periodos(self):
+        """Los periodos recurrentes se calculan relativos al día indicado"""
+        lunes = date(2025, 3, 10)
+        assert rango_periodo("semana_anterior", lunes) == (date(2025, 3, 3), date(2025, 3, 9))
+        assert rango_periodo("semana_actual", date(2025, 3, 12)) == (lunes, date(2025, 3, 16))
+        assert rango_periodo("mes_actual", date(2024, 2, 10)) == (date(2024, 2, 1), date(2024, 2, 29))
+        assert rango_periodo("mes_anterior", date(2025, 1, 15)) == (date(2024, 12, 1), date(2024, 12, 31))
+
+    def test_ventana_de_baja_carga(self):
+        """La ventana admite rangos que cruzan la medianoche"""
+        programador = ProgramadorReportes(ventana=(22, 4))
+        assert programador.en_ventana(datetime(2025, 3, 10, 23))
+        assert programador.en_ventana(datetime(2025, 3, 10, 2))
+        assert not programador.en_ventana(datetime(2025, 3, 10, 12))
+
+    def test_un_reporte_que_falla_queda_registrado_y_no_frena_los_demas(self, directorio_aislado, monkeypatch):
+        """El error de un reporte se guarda en fallos_pregenerados y se borra al generarlo bien"""
+        bitacora = BitacoraFalsa(fallan={"2025-03-03"})
+        monkeypatch.setattr(modulo_programador, "_bitacora", lambda: bitacora)
+        ruta = str(directorio_aislado / "pregenerados.db")
+        programador = ProgramadorReportes(ruta=ruta, directorio=str(directorio_aislado / "pregenerados"))
+
+        assert programador.actualizar(date(2025, 3, 10)) == ["mes_actual_2025-03-01_2025-03-31"]
+        [fallo] = obtener_fallos(ruta)
+        assert fallo["nombre"] == "semana_anterior" and fallo["error"] == "OSError: disco lleno"
+
+        bitacora.fallan.clear()
+        assert programador.actualizar(date(2025, 3, 10)) == ["semana_anterior_2025-03-03_2025-03-09"]
+        assert obtener_fallos(ruta) == []
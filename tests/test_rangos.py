@@ -0,0 +1,30 @@
+import pytest
+
+from src.model.actividad import Actividad
+from src.model.errores import RangoFechasInvalidoError
+
+
+class TestConsultaPorRangos:
+
+    def test_resultados_agrupados_por_rango(self, base_orm, nueva_actividad):
+        """Cada rango recibe sus actividades, en el orden pedido, aunque se solapen"""
+        actividad = Actividad()
+        actividad.registrar_actividades([
+            nueva_actividad(fecha=f"2025-03-{dia:02d}", descripcion=f"Tarea {dia}") for dia in (2, 5, 9, 20)
+        ])
+
+        rangos = [("2025-03-15", "2025-03-31"), ("2025-03-01", "2025-03-05"), ("2025-03-05", "2025-03-09"),
+                  ("2025-04-01", "2025-04-30")]
+        resultado = actividad.consultar_rangos(rangos)
+        assert [[a["descripcion"] for a in grupo] for grupo in resultado] == [
+            ["Tarea 20"], ["Tarea 2", "Tarea 5"], ["Tarea 5", "Tarea 9"], [],
+        ]
+        assert actividad.consultar_rangos(rangos, compacto=True) == [
+            list(actividad.consultar_actividades(*rango, compacto=True))
+            for rango in rangos
+        ]
+
+    def test_valida_todos_los_rangos(self, base_orm):
+        """Un rango inválido rechaza la consulta e indica cuál es"""
+        with pytest.raises(RangoFechasInvalidoError, match="Rango 2"):
+            Actividad().consultar_rangos([("2025-03-01", "2025-03-05"), ("2025-03-09", "2025-03-01")])
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.model import recurrencias
+from src.model.actividad import Actividad
+from src.model.duplicados import huella_actividad
+from src.model.errores import ActividadDuplicadaError, RangoFechasInvalidoError
+
+
+class TestRecurrencias:
+
+    def test_validar_regla(self):
+        """La frecuencia, el intervalo y el rango se validan antes de tocar la base"""
+        assert list(recurrencias.ocurrencias(date(2025, 3, 6), date(2025, 3, 11), "laborables")) == [
+            date(2025, 3, 6), date(2025, 3, 7), date(2025, 3, 10), date(2025, 3, 11)
+        ]
+        with pytest.raises(ValueError):
+            recurrencias.validar_regla(date(2025, 3, 6), date(2025, 3, 7), "mensual", 1)
+        with pytest.raises(RangoFechasInvalidoError):
+            recurrencias.validar_regla(date(2025, 3, 6), date(2060, 1, 1), "diaria", 1)
+
+    def test_contar_ocurrencias_sin_generarlas(self):
+        """La cuenta aritmética coincide con las fechas generadas para cada frecuencia"""
+        for frecuencia, intervalo in (("diaria", 1), ("diaria", 3), ("laborables", 1), ("semanal", 2)):
+            for dias in range(0, 40):
+                inicio = date(2025, 3, 1) + timedelta(days=dias % 7)
+                hasta = inicio + timedelta(days=dias)
+                esperadas = sum(1 for _ in recurrencias.ocurrencias(inicio, hasta, frecuencia, intervalo))
+                assert recurrencias.contar_ocurrencias(inicio, hasta, frecuencia, intervalo) == esperadas
+
+    def test_registrar_recurrente_en_la_base(self, base_orm, nueva_actividad):
+        """Las ocurrencias se insertan con la hora y la misma huella que registrar_actividad"""
+        actividad = Actividad()
+        ronda = nueva_actividad(fecha="2025-03-06 08:30", descripcion="Ronda de seguridad")
+        assert actividad.registrar_recurrente(ronda, "laborables", "2025-03-14") == 7
+        assert actividad.registrar_recurrente(dict(ronda, descripcion="Ronda"), "semanal", "2025-03-27") == 4
+
+        filas = base_orm.exec_driver_sql(
+            "SELECT fecha, fecha_hora, huella FROM actividades WHERE descripcion = 'Ronda de seguridad' ORDER BY fecha"
+        ).all()
+        assert [str(fila[1])[:16] for fila in filas[:2]] == ["2025-03-06 08:30", "2025-03-07 08:30"]
+        assert [fila[2] for fila in filas] == [huella_actividad(dict(ronda, fecha=fila[0])) for fila in filas]
+        assert actividad.contar_actividades("2025-03-06", "2025-03-31") == 11
+
+    def test_registrar_recurrente_duplicada(self, base_orm, nueva_actividad):
+        """Si alguna ocurrencia ya existe se rechaza toda la serie, salvo que sea idempotente"""
+        actividad = Actividad()
+        ronda = nueva_actividad(fecha="2025-03-06 08:30", descripcion="Ronda de seguridad")
+        actividad.registrar_actividad(dict(ronda, fecha="2025-03-08 10:00"))
+        with pytest.raises(ActividadDuplicadaError):
+            actividad.registrar_recurrente(ronda, "diaria", "2025-03-10")
+        assert actividad.contar_actividades("2025-03-06", "2025-03-10") == 1
+        assert actividad.registrar_recurrente(ronda, "diaria", "2025-03-10", idempotente=True) == 4
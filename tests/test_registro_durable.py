@@ -0,0 +1,123 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.model import registro_durable
+from src.model.registro_durable import Canal, RegistroDurable, Reproductor
+
+
+class BaseFalsa:
+    """Destino que guarda los registros por uuid y puede simular una caída."""
+
+    def __init__(self):
+        self.filas = {}
+        self.disponible = True
+
+    def aplicar(self, registros):
+        if not self.disponible:
+            raise ConnectionError("base no disponible")
+        for registro in registros:
+            self.filas.setdefault(registro["uuid"], registro)
+
+
+class TestRegistroDurable:
+
+    def test_reproduce_en_orden_tras_una_caida(self, tmp_path):
+        """Los registros escritos con la base caída se aplican al volver, en orden"""
+        registro = RegistroDurable(str(tmp_path))
+        base = BaseFalsa()
+        reproductor = Reproductor(registro, base.aplicar, errores_transitorios=(ConnectionError,))
+
+        base.disponible = False
+        for i in range(3):
+            registro.agregar({"descripcion": f"actividad {i}"})
+        with pytest.raises(ConnectionError):
+            reproductor.reproducir()
+        assert len(registro.pendientes()) == 3
+
+        base.disponible = True
+        aplicados, rechazados = reproductor.reproducir()
+        assert aplicados == 3 and rechazados == []
+        assert [r["descripcion"] for r in base.filas.values()] == ["actividad 0", "actividad 1", "actividad 2"]
+        assert registro.pendientes() == []
+
+    def test_descarta_cola_incompleta(self, tmp_path):
+        """Un registro final cortado por una caída se descarta al reabrir"""
+        registro = RegistroDurable(str(tmp_path))
+        registro.agregar({"descripcion": "completa"})
+        registro.cerrar()
+        with open(registro._ruta(1), "ab") as f:
+            f.write(b"\x40\x00\x00\x00\x00")
+
+        reabierto = RegistroDurable(str(tmp_path))
+        reabierto.agregar({"descripcion": "siguiente"})
+        assert [r["descripcion"] for r in reabierto.pendientes()] == ["completa", "siguiente"]
+
+    def test_compacta_segmentos_aplicados(self, tmp_path):
+        """Los segmentos ya aplicados se eliminan y un reinicio no reaplica nada"""
+        registro = RegistroDurable(str(tmp_path), tamano_segmento=64)
+        base = BaseFalsa()
+        for i in range(10):
+            registro.agregar({"descripcion": f"actividad {i}"})
+        assert len(registro.segmentos()) > 1
+
+        Reproductor(registro, base.aplicar).reproducir()
+        assert registro.segmentos() == [registro.segmentos()[-1]]
+        assert len(base.filas) == 10
+        assert RegistroDurable(str(tmp_path)).pendientes() == []
+
+    def test_varios_procesos_comparten_la_carpeta(self, tmp_path):
+        """Dos procesos que anexan y rotan a la vez no pierden ni cortan registros"""
+        raiz = Path(__file__).resolve().parents[1]
+        codigo = (
+            "import sys\n"
+            "from src.model.registro_durable import RegistroDurable\n"
+            "registro = RegistroDurable(sys.argv[1], tamano_segmento=2048)\n"
+            "for i in range(200):\n"
+            "    registro.agregar({'proceso': sys.argv[2], 'i': i})\n"
+        )
+        procesos = [
+            subprocess.Popen([sys.executable, "-c", codigo, str(tmp_path), nombre], cwd=raiz)
+            for nombre in ("a", "b")
+        ]
+        assert [proceso.wait() for proceso in procesos] == [0, 0]
+
+        registros = RegistroDurable(str(tmp_path)).pendientes()
+        assert len(registros) == 400
+        for nombre in ("a", "b"):
+            assert [r["i"] for r in registros if r["proceso"] == nombre] == list(range(200))
+
+    def test_compactar_no_pierde_lo_que_anexa_otro_proceso(self, tmp_path):
+        """Quien escribe después de que otro rotó y compactó anexa al último segmento"""
+        propio = RegistroDurable(str(tmp_path), tamano_segmento=64)
+        otro = RegistroDurable(str(tmp_path), tamano_segmento=64)
+        base = BaseFalsa()
+        otro.agregar({"descripcion": "del otro"})
+        for i in range(5):
+            propio.agregar({"descripcion": f"actividad {i}"})
+        Reproductor(propio, base.aplicar).reproducir()
+        assert len(base.filas) == 6
+
+        otro.agregar({"descripcion": "después de compactar"})
+        assert [r["descripcion"] for r in RegistroDurable(str(tmp_path)).pendientes()] == ["después de compactar"]
+
+    def test_canal_escribe_sin_esperar_a_la_base(self, tmp_path, monkeypatch):
+        """Escribir no toca la base; vaciar aplica antes de leer, salvo con la base caída"""
+        monkeypatch.setattr(registro_durable, "APLICAR_EN_SEGUNDO_PLANO", False)
+        base = BaseFalsa()
+        llamadas = []
+        canal = Canal("prueba", lambda registros: (llamadas.append(len(registros)), base.aplicar(registros)),
+                      errores_transitorios=(ConnectionError,), directorio=str(tmp_path))
+
+        base.disponible = False
+        registro = canal.escribir({"descripcion": "sin base"})
+        assert llamadas == [] and [r["uuid"] for r in canal.pendientes()] == [registro["uuid"]]
+        assert canal.vaciar() is False
+
+        base.disponible = True
+        canal.escribir_lote([{"descripcion": "a"}, {"descripcion": "b"}])
+        assert canal.vaciar() is True
+        assert llamadas == [1, 3] and len(base.filas) == 3
+        assert canal.pendientes() == [] and canal.vaciar() is True and llamadas == [1, 3]
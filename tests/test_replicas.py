@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from src.model import database
+from src.model.db_wrapper import DB
+
+# Puerto de una réplica en espera (standby) del servidor de pruebas; ver README
+PUERTO_REPLICA = os.environ.get("BITACORA_PUERTO_REPLICA")
+requiere_replica = pytest.mark.skipif(not PUERTO_REPLICA, reason="No hay réplica de PostgreSQL configurada")
+
+
+def crear_db(replicas, **kwargs):
+    return DB(database.DB_HOST, database.DB_PORT, database.DB_NAME, database.DB_USER,
+              database.DB_PASSWORD, replicas=replicas, **kwargs)
+
+
+def lee_de_replica(db):
+    return db.fetch_query("SELECT pg_is_in_recovery() AS replica;")[0]["replica"]
+
+
+class TestEnrutamientoReplicas:
+
+    def test_sin_replicas_lee_del_primario(self):
+        """Sin réplicas configuradas las lecturas van al primario"""
+        assert lee_de_replica(crear_db(None)) is False
+
+    def test_replica_caida_lee_del_primario(self):
+        """Una réplica inaccesible se marca como no sana y se lee del primario"""
+        db = crear_db([{"host": "localhost", "port": "1"}])
+        assert lee_de_replica(db) is False
+        assert db.estado_replicas()[0]["sana"] is False
+
+    @requiere_replica
+    def test_lectura_va_a_la_replica(self):
+        """Las lecturas se envían a una réplica sana"""
+        db = crear_db([{"port": PUERTO_REPLICA}])
+        assert lee_de_replica(db) is True
+        assert db.estado_replicas()[0]["sana"] is True
+
+    @requiere_replica
+    def test_lectura_propia_despues_de_escribir(self):
+        """Después de escribir, las lecturas van al primario durante la ventana"""
+        db = crear_db([{"port": PUERTO_REPLICA}], ventana_lectura_propia=60)
+        db.execute_query("SELECT 1;")
+        assert lee_de_replica(db) is False
+
+    @requiere_replica
+    def test_replica_con_retraso_excesivo(self):
+        """Una réplica con más retraso del permitido no recibe lecturas"""
+        db = crear_db([{"port": PUERTO_REPLICA}], retraso_maximo=-1)
+        assert lee_de_replica(db) is False
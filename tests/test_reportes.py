@@ -0,0 +1,69 @@
+import csv
+import zipfile
+from datetime import date
+
+import pytest
+
+from src.model import reportes
+from src.model.errores import ReporteError
+
+
+def filas(n):
+    for i in range(n):
+        yield {
+            "fecha": date(2025, 3, 6),
+            "supervisor": "Juan Pérez",
+            "descripcion": f"Revisión {i}",
+            "anexos": "",
+            "responsable": "María",
+            "clima": None,
+        }
+
+
+class TestReportes:
+
+    def test_formato_por_extension(self, tmp_path):
+        """El formato se elige por la extensión y el CSV contiene todas las filas"""
+        archivo = tmp_path / "reporte.csv"
+        assert reportes.escribir_reporte(filas(3), str(archivo)) == 3
+        with open(archivo, encoding="utf-8-sig", newline="") as f:
+            lineas = list(csv.reader(f))
+        assert lineas[0][0] == "Fecha"
+        assert lineas[3][2] == "Revisión 2"
+
+    def test_formato_explicito(self, tmp_path):
+        """El parámetro formato tiene prioridad sobre la extensión"""
+        archivo = tmp_path / "reporte.dat"
+        reportes.escribir_reporte(filas(1), str(archivo), formato="xlsx")
+        with zipfile.ZipFile(archivo) as libro:
+            assert "Revisión 0" in libro.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+    def test_pdf_por_paginas(self, tmp_path):
+        """El PDF reparte las filas en páginas y termina con la tabla xref"""
+        archivo = tmp_path / "reporte.pdf"
+        reportes.escribir_reporte(filas(200), str(archivo))
+        contenido = archivo.read_bytes()
+        assert contenido.startswith(b"%PDF-1.4")
+        assert contenido.rstrip().endswith(b"%%EOF")
+        assert contenido.count(b"/Type /Page ") == 4
+
+    def test_formato_no_soportado(self, tmp_path):
+        """Un formato desconocido genera ReporteError"""
+        with pytest.raises(ReporteError):
+            reportes.escribir_reporte(filas(1), str(tmp_path / "reporte.doc"))
+
+    def test_escritor_incompleto_falla_al_crearse(self, tmp_path, monkeypatch):
+        """Un escritor registrado sin cerrar no se puede instanciar"""
+        class EscritorIncompleto(reportes.EscritorReporte):
+            extension = "md"
+
+            def abrir(self):
+                pass
+
+            def escribir_fila(self, fila):
+                pass
+
+        monkeypatch.setattr(reportes, "ESCRITORES", dict(reportes.ESCRITORES))
+        reportes.registrar_escritor(EscritorIncompleto)
+        with pytest.raises(TypeError, match="cerrar"):
+            reportes.escribir_reporte(filas(1), str(tmp_path / "reporte.md"))
@@ -0,0 +1,101 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.model import database
+from src.model.errores import ActividadDuplicadaError
+from src.model.sincronizacion import MARGEN_MARCA, DiarioLocal, MotorSincronizacion
+
+
+@pytest.fixture
+def fila_remota(nueva_actividad):
+    def crear(id_actividad, uuid, modificado, **cambios):
+        fila = nueva_actividad(id_actividad=id_actividad, uuid=uuid, fecha=date(2025, 3, 6), fecha_hora=None,
+                               clima="Nublado", estado=None, tipo=None, modificado=modificado)
+        fila.update(cambios)
+        return fila
+    return crear
+
+
+@pytest.fixture
+def diario(directorio_aislado):
+    diario = DiarioLocal(str(directorio_aislado / "diario.db"))
+    try:
+        yield diario
+    finally:
+        diario.cerrar()
+
+
+class TestDiarioLocal:
+
+    def test_registrar_sin_anexos_ni_clima_y_marcar_enviadas(self, diario, nueva_actividad):
+        """Anexos y clima en None se guardan vacíos; al enviarla deja de estar pendiente"""
+        sin_anexos = nueva_actividad(anexos=None, clima=None)
+        actividad = diario.registrar(sin_anexos)
+        assert (actividad["anexos"], actividad["clima"]) == ("", "")
+        with pytest.raises(ActividadDuplicadaError):
+            diario.registrar(dict(sin_anexos, supervisor="juan pérez"))
+        assert diario.registrar(sin_anexos, idempotente=True)["uuid"] == actividad["uuid"]
+
+        assert [p["uuid"] for p in diario.pendientes(10)] == [actividad["uuid"]]
+        diario.marcar_enviadas({actividad["uuid"]: 7})
+        assert diario.pendientes(10) == []
+        [consultada] = diario.consultar("2025-03-01", "2025-03-31")
+        assert (consultada["id_actividad"], consultada["pendiente"]) == (7, False)
+
+    def test_aplicar_remotas_dos_veces(self, diario, fila_remota):
+        """Aplicar de nuevo la misma fila la actualiza sin devolverla como nueva"""
+        fila = fila_remota(1, "a1", datetime(2025, 3, 6, 8))
+        assert [f["uuid"] for f in diario.aplicar_remotas([fila])] == ["a1"]
+        assert diario.aplicar_remotas([dict(fila, descripcion="Cambio de filtros")]) == []
+        [consultada] = diario.consultar("2025-03-06", "2025-03-06")
+        assert consultada["descripcion"] == "Cambio de filtros"
+        assert diario.contar_pendientes() == 0
+
+
+class TestMotorSincronizacion:
+
+    def test_enviar_por_lotes_y_registrar_fallos(self, diario, monkeypatch, nueva_actividad):
+        """Se envía en lotes del tamaño indicado; un fallo queda anotado y las actividades siguen pendientes"""
+        for n in range(3):
+            diario.registrar(nueva_actividad(descripcion=f"Tarea {n}"))
+        lotes = []
+
+        def insertar(pendientes):
+            lotes.append(len(pendientes))
+            return {p["uuid"]: len(lotes) for p in pendientes}
+
+        motor = MotorSincronizacion(diario, lote=2)
+        monkeypatch.setattr(database, "insertar_actividades_lote", insertar)
+        assert motor.enviar() == 3
+        assert lotes == [2, 1] and diario.contar_pendientes() == 0
+
+        diario.registrar(nueva_actividad(descripcion="Tarea sin conexión"))
+
+        def sin_conexion(pendientes):
+            raise ConnectionError("servidor caído")
+
+        monkeypatch.setattr(database, "insertar_actividades_lote", sin_conexion)
+        with pytest.raises(ConnectionError):
+            motor.enviar()
+        fila = diario._conexion().execute("SELECT intentos, ultimo_error FROM actividades WHERE pendiente = 1;").fetchone()
+        assert tuple(fila) == (1, "servidor caído")
+
+    def test_recibir_avanza_la_marca(self, diario, monkeypatch, fila_remota):
+        """Las filas recibidas se aplican y la marca queda en la última; la siguiente vez se pide desde ella"""
+        filas = [fila_remota(1, "a1", datetime(2025, 3, 6, 8)),
+                 fila_remota(2, "a2", datetime(2025, 3, 6, 9), descripcion="Cambio de filtros")]
+        pedidas = []
+
+        def modificadas_desde(modificado, id_actividad, limite):
+            pedidas.append(modificado)
+            return [f for f in filas if modificado is None or (f["modificado"], f["id_actividad"])
+                    > (modificado, id_actividad)][:limite]
+
+        monkeypatch.setattr(database, "obtener_actividades_modificadas_desde", modificadas_desde)
+        motor = MotorSincronizacion(diario, lote=1)
+        assert motor.recibir() == 2
+        assert diario.obtener_marca() == (datetime(2025, 3, 6, 9), 2)
+        del pedidas[:]
+        assert motor.recibir() == 0
+        assert pedidas[0] == datetime(2025, 3, 6, 9) - MARGEN_MARCA
@@ -0,0 +1,37 @@
+import pytest
+
+from src.model.errores import RangoFechasInvalidoError, ReporteError
+from src.model.trabajos import ColaReportes, PENDIENTE
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    cola = ColaReportes(str(tmp_path / "cola.db"), str(tmp_path / "salida"))
+    # Sin procesos de trabajo: las pruebas solo revisan la cola
+    monkeypatch.setattr(cola, "iniciar", lambda: None)
+    return cola
+
+
+class TestColaReportes:
+
+    def test_encolar_devuelve_id_pendiente(self, cola):
+        """Encolar devuelve un id de inmediato y el trabajo queda pendiente"""
+        id_trabajo = cola.encolar("2025-03-01", "2025-03-10", "reporte.csv")
+        trabajo = cola.estado(id_trabajo)
+        assert trabajo["estado"] == PENDIENTE
+        assert trabajo["formato"] == "csv"
+
+    def test_solicitudes_identicas_se_agrupan(self, cola):
+        """Una solicitud idéntica a otra pendiente devuelve el mismo trabajo"""
+        primero = cola.encolar("2025-03-01", "2025-03-10", "reporte.pdf")
+        segundo = cola.encolar("2025-03-01", "2025-03-10", "copia.pdf")
+        otro = cola.encolar("2025-03-01", "2025-03-10", "reporte.csv")
+        assert primero == segundo
+        assert otro != primero
+
+    def test_validaciones(self, cola):
+        """Las fechas y el nombre se validan al encolar"""
+        with pytest.raises(RangoFechasInvalidoError):
+            cola.encolar("2025-03-10", "2025-03-01", "reporte.pdf")
+        with pytest.raises(ReporteError):
+            cola.encolar("2025-03-01", "2025-03-10", "reporte_@#$%.pdf")
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.model import perfilado, trazas
+from src.model.actividad import Actividad
+
+
+@pytest.fixture
+def directorio_trazas(tmp_path):
+    directorio = tmp_path / "trazas"
+    trazas.activar(str(directorio))
+    try:
+        yield directorio
+    finally:
+        trazas.desactivar()
+
+
+def tramos(directorio):
+    eventos = [evento for ruta in directorio.glob("traza-*.json") for evento in trazas.leer(str(ruta))]
+    return [evento for evento in eventos if evento["ph"] == "X"]
+
+
+class TestTrazas:
+
+    def test_tramos_desde_la_accion_hasta_el_sql(self, base_orm, directorio_trazas):
+        """La acción, el método del modelo, el SQL y la escritura del reporte quedan anidados"""
+        actividad = Actividad()
+        with trazas.tramo("Reporte.ejecutar_accion", "kivy"):
+            actividad.registrar_actividad({
+                "fecha": "2024-05-10", "supervisor": "Ana", "descripcion": "Vaciado de losa",
+                "anexos": "", "responsable": "Luis", "clima": "Soleado",
+            })
+            assert actividad.generar_reporte("2024-05-01", "2024-05-31", "mayo.csv")
+        trazas.desactivar()
+
+        eventos = tramos(directorio_trazas)
+        por_id = {evento["args"]["id"]: evento for evento in eventos}
+        reporte = next(e for e in eventos if e["name"] == "Actividad.generar_reporte")
+        assert por_id[reporte["args"]["padre"]]["name"] == "Reporte.ejecutar_accion"
+        escritura = next(e for e in eventos if e["name"] == "escribir_reporte")
+        assert escritura["args"]["padre"] == reporte["args"]["id"]
+        assert escritura["args"]["filas"] == 1 and "lectura_ms" in escritura["args"]
+        consultas = [e["args"]["sql"] for e in eventos
+                     if e["cat"] == "sql" and e["args"]["padre"] == escritura["args"]["id"]]
+        assert any(sql.startswith("SELECT") for sql in consultas)
+        assert not hasattr(Actividad.generar_reporte, "__wrapped__")
+
+    def test_propagar_a_otro_hilo_y_unir(self, directorio_trazas, tmp_path):
+        """Una tarea de un grupo de hilos es hija del tramo que la envió"""
+        def tarea():
+            with trazas.tramo("tarea"):
+                pass
+
+        with ThreadPoolExecutor(1) as executor, trazas.tramo("accion") as accion:
+            executor.submit(trazas.propagar(tarea)).result()
+            executor.submit(tarea).result()
+        trazas.desactivar()
+
+        eventos = tramos(directorio_trazas)
+        padres = [e["args"].get("padre") for e in eventos if e["name"] == "tarea"]
+        assert padres == [accion.id, None]
+        salida = tmp_path / "unida.json"
+        assert trazas.unir(str(directorio_trazas), str(salida)) >= len(eventos)
+
+    def test_con_perfilado_se_desactivan_en_cualquier_orden(self, directorio_trazas, tmp_path):
+        """Perfilado y trazas se apilan; quitar uno deja las envolturas del otro"""
+        original = Actividad.generar_reporte
+        while hasattr(original, "__wrapped__"):
+            original = original.__wrapped__
+        perfilado.activar(str(tmp_path / "perfiles"))
+        try:
+            assert Actividad.generar_reporte.__wrapped__.__wrapped__ is original
+            trazas.desactivar()
+            assert Actividad.generar_reporte.__wrapped__ is original
+            trazas.activar(str(directorio_trazas))
+        finally:
+            perfilado.desactivar()
+        assert Actividad.generar_reporte.__wrapped__ is original
+        trazas.desactivar()
+        assert Actividad.generar_reporte is original
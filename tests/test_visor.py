@@ -0,0 +1,35 @@
+import pytest
+
+from src.model import reportes
+from src.model.errores import ReporteError
+from src.model.visor import VisorReporte
+
+FILA = {"fecha": "2025-03-05", "supervisor": "Juan Pérez", "descripcion": "Revisión <de> obra",
+        "anexos": "", "responsable": "Carlos", "clima": "Soleado", "estado": "", "tipo": ""}
+
+
+class TestVisorReporte:
+
+    def test_paginas_de_un_reporte_csv(self, tmp_path):
+        """Las páginas se leen del archivo mapeado, sin el BOM, y el índice completo da el total"""
+        archivo = str(tmp_path / "reporte.csv")
+        reportes.escribir_reporte((dict(FILA, descripcion=f"Tarea {i}") for i in range(120)), archivo)
+
+        with VisorReporte(archivo, lineas_por_pagina=50) as visor:
+            primera = visor.pagina(0).splitlines()
+            assert primera[0].startswith("Fecha") and len(primera) == 50
+            assert visor.total_paginas is None
+            visor.indexar()
+            assert visor.total_paginas == 3
+            assert visor.pagina(2).splitlines()[-1].split(",")[2] == "Tarea 119"
+            with pytest.raises(IndexError):
+                visor.pagina(3)
+
+    def test_html_sin_etiquetas_y_formato_no_visible(self, tmp_path):
+        archivo = str(tmp_path / "reporte.html")
+        reportes.escribir_reporte([FILA], archivo)
+        with VisorReporte(archivo) as visor:
+            assert "2025-03-05 | Juan Pérez | Revisión <de> obra" in visor.pagina(0)
+
+        with pytest.raises(ReporteError):
+            VisorReporte(str(tmp_path / "reporte.pdf"))